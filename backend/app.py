@@ -26,8 +26,17 @@ else:
 
 from flask import Flask, render_template, jsonify
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from backend.config import Config
 from backend.extensions import db, jwt
+from backend.utils import compression, conditional, db_pool, db_router, json_provider, metrics, query_stats
+from backend.utils.access_cache import access_cache
+from backend.utils.password_hasher import password_hasher
+from backend.utils.profiler import request_profiler
+from backend.utils.rate_limiter import family_member_throttle, login_throttle
+from backend.utils.reference_cache import reference_cache
+from backend.utils.response_cache import response_cache
+from backend.utils.token_revocation import revocation_list
 
 
 def create_app(config_class=Config):
@@ -37,9 +46,37 @@ def create_app(config_class=Config):
 
     print('>>> [create_app] Flask app created:', app.name)  # 加这一行
     
-    # 初始化扩展
+    # 部署在反向代理之后时按受信任的代理层数还原 remote_addr（登录、添加家庭成员限流按 IP 计数）
+    x_for = app.config.get('PROXY_FIX_X_FOR', 0)
+    x_proto = app.config.get('PROXY_FIX_X_PROTO', 0)
+    if x_for or x_proto:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=x_for, x_proto=x_proto)
+    
+    # JSON 序列化使用 orjson，原生支持日期类型（见 utils/json_provider.py）
+    json_provider.init_app(app)
+
+    # 初始化扩展（连接池参数与只读副本需在 db.init_app 之前写入配置）
+    db_pool.init_app(app)
+    db_router.init_app(app)
     db.init_app(app)
     jwt.init_app(app)
+    # 请求级 SQL 统计与 Server-Timing（最先注册：before_request 最先执行、after_request 最后执行）
+    query_stats.init_app(app)
+    # Prometheus 指标（GET /metrics）
+    metrics.init_app(app)
+    # 性能剖析（管理员通过 X-Profile 头或按 PROFILE_SAMPLE_RATE 采样）
+    request_profiler.init_app(app)
+    reference_cache.init_app(app)
+    response_cache.init_app(app)
+    access_cache.init_app(app)
+    password_hasher.init_app(app)
+    revocation_list.init_app(app)
+    login_throttle.init_app(app)
+    family_member_throttle.init_app(app)
+
+    # 响应压缩与 ETag（after_request 按注册的逆序执行：先计算 ETag，再压缩）
+    compression.init_app(app)
+    conditional.init_app(app)
     
     # 配置CORS - 允许Vue前端跨域访问
     CORS(app, resources={
@@ -97,15 +134,13 @@ def create_app(config_class=Config):
             'code': 'INTERNAL_ERROR'
         }), 500
     
-    # 创建数据库表
-    with app.app_context():
-        try:
-            db.create_all()
-            print("[INFO] 数据库表创建成功")
-        except Exception as e:
-            print(f"[WARN] 数据库表创建失败: {e}")
-            print("[WARN] 如果遇到外键类型不兼容错误，请运行: python reset_database.py")
-            # 不抛出异常，允许应用继续运行（假设表已存在）
+    # 数据库迁移命令（flask --app backend.app migrate upgrade）
+    # 应用启动时不执行任何 DDL，表结构由迁移显式创建/变更
+    from backend.migrations.runner import migrate_cli
+    app.cli.add_command(migrate_cli)
+    # 过期令牌撤销记录清理（flask --app backend.app purge-revoked-tokens，可配置为定时任务）
+    from backend.utils.token_revocation import purge_revoked_tokens_command
+    app.cli.add_command(purge_revoked_tokens_command)
 
     return app
 
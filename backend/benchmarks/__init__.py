@@ -0,0 +1,4 @@
+"""
+性能基准测试脚本
+Performance Benchmarks
+"""
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""需求预测基准测试
+Demand Forecast Benchmark
+
+模拟 10000 种药品 x 3 年日出库数据，测量需求矩阵展开、
+两种预测模型以及采购量计算的耗时（不依赖数据库）。
+运行方式（在项目根目录下）：
+    python -m backend.benchmarks.bench_forecast [--medicines 10000] [--days 1095]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.modules.pharmacy.forecast_services import (  # noqa: E402
+    compute_purchase_quantities,
+    densify_demand,
+    forecast_demand,
+)
+
+
+def _timed(label, fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<32} {elapsed * 1000:>10.1f} ms")
+    return result, elapsed
+
+
+def run(n_medicines: int, n_days: int, density: float, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    n_rows = int(n_medicines * n_days * density)
+
+    print("=" * 60)
+    print(f"药品数: {n_medicines}  天数: {n_days}  聚合行数: {n_rows}")
+    print("=" * 60)
+
+    # 模拟数据库按 (药品, 日期) 聚合后的结果
+    cells = rng.choice(n_medicines * n_days, size=n_rows, replace=False)
+    medicine_index = cells // n_days
+    day_index = cells % n_days
+    quantities = rng.poisson(5, size=n_rows).astype(np.float64) + 1
+
+    total = 0.0
+    demand, elapsed = _timed('densify_demand', densify_demand,
+                             medicine_index, day_index, quantities, n_medicines, n_days)
+    total += elapsed
+
+    (ma, ma_vol), elapsed = _timed('moving_average', forecast_demand, demand, method='moving_average')
+    total += elapsed
+    (es, es_vol), elapsed = _timed('exponential_smoothing', forecast_demand, demand,
+                                   method='exponential_smoothing')
+    total += elapsed
+
+    on_hand = rng.integers(0, 500, size=n_medicines).astype(np.float64)
+    on_order = np.zeros(n_medicines)
+    max_stock = np.full(n_medicines, np.nan)
+    (quantities_out, _), elapsed = _timed('compute_purchase_quantities', compute_purchase_quantities,
+                                          es, es_vol, on_hand, on_order, max_stock)
+    total += elapsed
+
+    print("-" * 60)
+    print(f"  {'total':<32} {total * 1000:>10.1f} ms")
+    print(f"  需补货药品数: {int((quantities_out > 0).sum())}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='需求预测基准测试')
+    parser.add_argument('--medicines', type=int, default=10000)
+    parser.add_argument('--days', type=int, default=365 * 3)
+    parser.add_argument('--density', type=float, default=0.3, help='有出库记录的(药品,日期)比例')
+    args = parser.parse_args()
+    run(args.medicines, args.days, args.density)
+
+
+if __name__ == '__main__':
+    main()
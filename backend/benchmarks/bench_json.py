@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""JSON 响应序列化基准测试
+JSON Response Benchmark
+
+构造含中文内容的病历列表（MedicalRecord.to_dict 每个字段输出两遍以兼容前端），
+对比生成一次列表响应的耗时与响应体大小：
+- 原实现：to_dict 逐字段调用 .isoformat()，Flask 默认 JSON provider（标准库 json，
+  按键排序、中文转义为 \\uXXXX）序列化整个信封字典
+- 当前实现：to_dict 直接返回日期对象，success_response 使用 orjson 序列化 data，
+  并拼接预先编码的信封前缀
+不依赖数据库（模型对象不加入会话）。
+运行方式（在项目根目录下）：
+    python -m backend.benchmarks.bench_json [--sizes 10 100 1000] [--repeat 200]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+from backend.app import create_app  # noqa: E402
+from backend.config import Config  # noqa: E402
+from backend.models import Doctor, MedicalRecord, Patient  # noqa: E402
+from backend.utils.responses import success_response  # noqa: E402
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    DEBUG = False
+
+
+def _build_records(count):
+    doctor = Doctor(id=1, doctor_no='D0001', name='王医生', department='内科', title='主治医师')
+    patient = Patient(id=1, patient_no='P0001', name='张三', gender='男', age=42)
+    now = datetime(2024, 5, 1, 9, 30, 12, 345678)
+    return [
+        MedicalRecord(
+            id=i + 1, patient_id=1, doctor_id=1, patient=patient, doctor=doctor,
+            visit_date=now - timedelta(days=i), created_at=now - timedelta(days=i, minutes=5),
+            diagnosis='上呼吸道感染，伴轻度发热', symptoms='咳嗽、咽痛三天，体温 37.8℃',
+            treatment='对症治疗，多饮水，注意休息', prescription='阿莫西林胶囊 0.5g tid x5d',
+            notes='三日后复诊'
+        )
+        for i in range(count)
+    ]
+
+
+def _legacy_to_dict(record):
+    """原实现：日期字段逐个转为字符串"""
+    data = record.to_dict()
+    for key, value in data.items():
+        if isinstance(value, (datetime, date)):
+            data[key] = value.isoformat()
+    return data
+
+
+def _timed(fn, repeat):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        response = fn()
+    return (time.perf_counter() - start) / repeat, len(response.get_data())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='JSON 响应序列化基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    app = create_app(BenchConfig)
+    legacy_provider = DefaultJSONProvider(app)
+
+    print("=" * 78)
+    print(f"{'记录数':>8} {'原实现':>14} {'当前实现':>14} {'加速':>8} {'原响应体':>12} {'当前响应体':>12}")
+    print("=" * 78)
+    with app.app_context():
+        for size in args.sizes:
+            records = _build_records(size)
+            repeat = max(5, args.repeat * 100 // size)
+
+            def legacy():
+                return legacy_provider.response({
+                    'success': True, 'message': '操作成功', 'code': 'SUCCESS',
+                    'data': {'list': [_legacy_to_dict(r) for r in records], 'total': size}
+                })
+
+            def current():
+                return success_response({'list': [r.to_dict() for r in records], 'total': size})
+
+            legacy_time, legacy_size = _timed(legacy, repeat)
+            current_time, current_size = _timed(current, repeat)
+            print(f"{size:>8} {legacy_time * 1000:>11.3f} ms {current_time * 1000:>11.3f} ms "
+                  f"{legacy_time / current_time:>7.1f}x {legacy_size:>10} B {current_size:>10} B")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""登录吞吐基准测试
+Login Throughput Benchmark
+
+模拟交接班时大量员工集中登录：在临时 SQLite 数据库中创建用户（含医生账号），
+分别以「每次登录同步写 last_login」与「节流 + 后台合并写入」两种配置
+通过测试客户端登录，统计吞吐量与登录期间执行的 UPDATE/SELECT 语句数。
+为突出数据库开销，测试用户使用低迭代次数的密码哈希。
+运行方式（在项目根目录下）：
+    python -m backend.benchmarks.bench_login [--users 500] [--rounds 3]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from sqlalchemy import event  # noqa: E402
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+from backend.app import create_app  # noqa: E402
+from backend.config import Config  # noqa: E402
+from backend.extensions import db  # noqa: E402
+from backend.models import Doctor, DoctorUserLink, User  # noqa: E402
+from backend.modules.auth.login_services import last_login_recorder  # noqa: E402
+
+PASSWORD = 'bench-password'
+HASH_METHOD = 'pbkdf2:sha256:1000'
+
+
+def _make_config(db_path, throttle, interval):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{db_path}'
+        SQLALCHEMY_ENGINE_OPTIONS = {}
+        TESTING = True
+        LAST_LOGIN_THROTTLE_SECONDS = throttle
+        LAST_LOGIN_FLUSH_INTERVAL = interval
+        PASSWORD_HASH_METHOD = HASH_METHOD
+    return BenchConfig
+
+
+def _seed(app, n_users):
+    with app.app_context():
+        tables = [User.__table__, Doctor.__table__, DoctorUserLink.__table__]
+        db.metadata.create_all(db.engine, tables=tables, checkfirst=True)
+        password_hash = generate_password_hash(PASSWORD, method=HASH_METHOD)
+        users = []
+        for i in range(n_users):
+            role = 'doctor' if i % 2 == 0 else 'user'
+            users.append(User(username=f'bench{i}', password_hash=password_hash, role=role))
+        db.session.add_all(users)
+        db.session.flush()
+        for i, user in enumerate(users):
+            if user.role == 'doctor':
+                doctor = Doctor(doctor_no=f'BD{i:05d}', name=f'医生{i}', department='内科')
+                db.session.add(doctor)
+                db.session.flush()
+                db.session.add(DoctorUserLink(user_id=user.id, doctor_id=doctor.id))
+        db.session.commit()
+
+
+def _run_mode(label, n_users, rounds, throttle, interval):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(_make_config(os.path.join(tmp, 'bench.db'), throttle, interval))
+        _seed(app, n_users)
+        client = app.test_client()
+
+        counts = {'select': 0, 'update': 0}
+        with app.app_context():
+            engine = db.engine
+
+        def _count(conn, cursor, statement, parameters, context, executemany):
+            verb = statement.lstrip().split(' ', 1)[0].lower()
+            if verb in counts:
+                counts[verb] += 1
+
+        event.listen(engine, 'before_cursor_execute', _count)
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for i in range(n_users):
+                resp = client.post('/api/auth/login', json={'username': f'bench{i}', 'password': PASSWORD})
+                assert resp.status_code == 200, resp.get_json()
+        elapsed = time.perf_counter() - start
+        flushed = last_login_recorder.flush()
+        event.remove(engine, 'before_cursor_execute', _count)
+
+        total = n_users * rounds
+        print(f"  {label:<22} {total / elapsed:>8.0f} 次/秒  "
+              f"SELECT {counts['select']:>6}  UPDATE {counts['update']:>6}  "
+              f"(收尾合并写入 {flushed} 个用户)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='登录吞吐基准测试')
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    print("=" * 72)
+    print(f"用户数: {args.users}  每用户登录次数: {args.rounds}")
+    print("=" * 72)
+    _run_mode('同步写入（原实现）', args.users, args.rounds, throttle=0, interval=0)
+    _run_mode('节流 + 合并写入', args.users, args.rounds, throttle=300, interval=5)
+
+
+if __name__ == '__main__':
+    main()
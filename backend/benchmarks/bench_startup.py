@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""应用启动耗时基准测试
+Worker Boot Benchmark
+
+对比两种启动方式创建应用的耗时：
+- 当前实现：create_app() 不执行任何 DDL
+- 原实现：create_app() 之后在应用上下文中执行 db.create_all()（逐表检查是否存在）
+每种方式分别在全新子进程中启动（模拟 Web 工作进程启动，含导入耗时），
+以及在同一进程内重复创建应用（模拟测试用例逐个创建应用），并统计启动时执行的 SQL 条数
+（连接远程 MySQL 时每条都是一次网络往返）。
+默认使用临时 SQLite 文件数据库（先执行迁移建表）；
+传入 --database-url 可对 MySQL 等实际数据库测试（需已执行迁移）。
+运行方式（在项目根目录下）：
+    python -m backend.benchmarks.bench_startup [--runs 5] [--database-url URL]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+BOOT_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+from backend.app import create_app
+from backend.extensions import db
+app = create_app()
+if sys.argv[1] == 'legacy':
+    with app.app_context():
+        db.create_all()
+print(time.perf_counter() - start)
+"""
+
+
+def _boot_once(mode, env):
+    output = subprocess.run(
+        [sys.executable, '-c', BOOT_SCRIPT, mode],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def _in_process(mode, runs):
+    import contextlib
+    import io
+
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    from backend.app import create_app
+    from backend.extensions import db
+
+    statements = [0]
+
+    def _count(*_):
+        statements[0] += 1
+
+    timings = []
+    event.listen(Engine, 'before_cursor_execute', _count)
+    try:
+        for _ in range(runs):
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                app = create_app()
+                if mode == 'legacy':
+                    with app.app_context():
+                        db.create_all()
+                timings.append(time.perf_counter() - start)
+            with app.app_context():
+                db.engine.dispose()
+    finally:
+        event.remove(Engine, 'before_cursor_execute', _count)
+    return timings, statements[0] // runs
+
+
+def _report(label, timings, statements=None):
+    extra = f"  启动时执行 SQL {statements} 条" if statements is not None else ''
+    print(f"  {label:<28} 中位数 {statistics.median(timings) * 1000:>8.1f} ms  "
+          f"平均 {statistics.mean(timings) * 1000:>8.1f} ms  (n={len(timings)}){extra}")
+
+
+def _prepare_database(database_url):
+    from backend.app import create_app
+    from backend.extensions import db
+    from backend.migrations.runner import MigrationRunner
+
+    app = create_app()
+    with app.app_context():
+        MigrationRunner(db.engine).upgrade(echo=lambda *_: None)
+        db.engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='应用启动耗时基准测试')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--database-url', default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        os.environ['DATABASE_URL'] = database_url
+        env = dict(os.environ, PYTHONPATH=PROJECT_ROOT)
+        _prepare_database(database_url)
+
+        print("=" * 72)
+        print(f"数据库: {database_url.split('@')[-1]}  重复次数: {args.runs}")
+        print("=" * 72)
+        print("新进程启动（含导入）:")
+        boots = {'legacy': [], 'current': []}
+        for _ in range(args.runs):
+            # 两种方式交替启动，减少系统负载波动的影响
+            for mode in boots:
+                boots[mode].append(_boot_once(mode, env))
+        for mode, label in (('legacy', '原实现（create_all）'), ('current', '当前实现（无 DDL）')):
+            _report(label, boots[mode])
+        print("同一进程内重复创建应用:")
+        for mode, label in (('legacy', '原实现（create_all）'), ('current', '当前实现（无 DDL）')):
+            _report(label, *_in_process(mode, args.runs * 4))
+
+
+if __name__ == '__main__':
+    main()
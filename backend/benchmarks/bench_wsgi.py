@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""WSGI 服务器吞吐基准测试
+WSGI Server Throughput Benchmark
+
+对比两种方式运行后端时的吞吐量与延迟：
+- 开发服务器：python backend/app.py 的 app.run(debug=True)（关闭自动重载）
+- 生产模式：python manage.py serve 使用的 gunicorn 配置（预加载应用，多进程 + 多线程）
+服务器在子进程中启动，负载由多个客户端进程并发发起（每个请求新建连接），
+统计每秒请求数、延迟中位数与 P99。默认使用临时 SQLite 数据库（先执行迁移建表）。
+运行方式（在项目根目录下，需 Linux/macOS 并已安装 gunicorn）：
+    python -m backend.benchmarks.bench_wsgi [--duration 10] [--concurrency 16] [--workers 4] [--threads 4] [--path /health]
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+HOST = '127.0.0.1'
+
+DEV_SCRIPT = """
+import sys
+from backend.app import create_app
+app = create_app()
+app.run(debug=True, use_reloader=False, host='127.0.0.1', port=int(sys.argv[1]))
+"""
+
+
+def _server_command(mode, port, args):
+    if mode == 'dev':
+        return [sys.executable, '-c', DEV_SCRIPT, str(port)]
+    executable = shutil.which('gunicorn', path=os.path.dirname(sys.executable)) or shutil.which('gunicorn')
+    return [
+        executable, '-c', os.path.join(PROJECT_ROOT, 'backend', 'gunicorn.conf.py'),
+        '--bind', f'{HOST}:{port}', '--workers', str(args.workers), '--threads', str(args.threads),
+        '--access-logfile', '/dev/null', 'backend.wsgi:app'
+    ]
+
+
+def _wait_ready(port, path, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            connection = http.client.HTTPConnection(HOST, port, timeout=1)
+            connection.request('GET', path)
+            connection.getresponse().read()
+            connection.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('服务器未能在规定时间内启动')
+
+
+def _client(port, path, threads, duration, queue):
+    """客户端进程：多个线程循环发送请求，返回延迟列表与错误数"""
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def _loop():
+        local = []
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            try:
+                connection = http.client.HTTPConnection(HOST, port, timeout=10)
+                connection.request('GET', path)
+                response = connection.getresponse()
+                response.read()
+                connection.close()
+                if response.status >= 500:
+                    raise OSError(response.status)
+                local.append(time.perf_counter() - start)
+            except OSError:
+                with lock:
+                    errors[0] += 1
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=_loop) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    queue.put((latencies, errors[0]))
+
+
+def _run_load(port, args):
+    queue = multiprocessing.Queue()
+    clients = max(1, min(args.clients, args.concurrency))
+    per_client = [args.concurrency // clients + (1 if i < args.concurrency % clients else 0) for i in range(clients)]
+    processes = [
+        multiprocessing.Process(target=_client, args=(port, args.path, n, args.duration, queue))
+        for n in per_client
+    ]
+    for p in processes:
+        p.start()
+    latencies, errors = [], 0
+    for _ in processes:
+        result, failed = queue.get()
+        latencies.extend(result)
+        errors += failed
+    for p in processes:
+        p.join()
+    return latencies, errors
+
+
+def _bench(mode, port, args, env):
+    server = subprocess.Popen(
+        _server_command(mode, port, args), cwd=PROJECT_ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        _wait_ready(port, args.path)
+        # 预热：建立连接池、加载缓存
+        _run_load(port, argparse.Namespace(**{**vars(args), 'duration': 1}))
+        latencies, errors = _run_load(port, args)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+    return latencies, errors
+
+
+def _report(label, latencies, errors, duration):
+    if not latencies:
+        print(f"  {label:<34} 无成功请求（错误 {errors}）")
+        return
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f"  {label:<34} {len(latencies) / duration:>8.0f} req/s  "
+          f"中位数 {statistics.median(ordered) * 1000:>7.1f} ms  P99 {p99 * 1000:>7.1f} ms  错误 {errors}")
+
+
+def _prepare_database(database_url):
+    from backend.app import create_app
+    from backend.extensions import db
+    from backend.migrations.runner import MigrationRunner
+
+    app = create_app()
+    with app.app_context():
+        MigrationRunner(db.engine).upgrade(echo=lambda *_: None)
+        db.engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='WSGI 服务器吞吐基准测试')
+    parser.add_argument('--duration', type=float, default=10, help='每种方式的压测秒数')
+    parser.add_argument('--concurrency', type=int, default=16, help='并发请求数')
+    parser.add_argument('--clients', type=int, default=4, help='客户端进程数')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn 工作进程数')
+    parser.add_argument('--threads', type=int, default=4, help='gunicorn 每个工作进程的线程数')
+    parser.add_argument('--path', default='/health', help='压测的接口路径')
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--database-url', default=None)
+    args = parser.parse_args()
+
+    if sys.platform == 'win32':
+        print("gunicorn 不支持 Windows，请在 Linux/macOS 上运行")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        os.environ['DATABASE_URL'] = database_url
+        _prepare_database(database_url)
+        env = dict(os.environ, PYTHONPATH=PROJECT_ROOT, FLASK_ENV='production',
+                   WEB_PIDFILE=os.path.join(tmp, 'gunicorn.pid'))
+
+        print("=" * 90)
+        print(f"接口: {args.path}  并发: {args.concurrency}  时长: {args.duration:g}s  "
+              f"CPU: {multiprocessing.cpu_count()}  数据库: {database_url.split('@')[-1]}")
+        print("=" * 90)
+        latencies, errors = _bench('dev', args.port, args, env)
+        _report('开发服务器（app.run debug）', latencies, errors, args.duration)
+        latencies, errors = _bench('gunicorn', args.port, args, env)
+        _report(f'gunicorn（{args.workers} 进程 x {args.threads} 线程）', latencies, errors, args.duration)
+
+
+if __name__ == '__main__':
+    main()
@@ -22,18 +22,38 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         f'mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}?charset=utf8mb4'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    SQLALCHEMY_POOL_SIZE = 10
-    SQLALCHEMY_POOL_RECYCLE = 3600
-    SQLALCHEMY_ENGINE_OPTIONS = {
-        'pool_pre_ping': True,
-        'pool_recycle': 3600,
-    }
+    # 额外的引擎参数；连接池参数由下方 DB_POOL_* 生成（见 utils/db_pool.py）
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    
+    # 数据库连接池（每个工作进程一个连接池）
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE') or 10)
+    DB_POOL_MAX_OVERFLOW = int(os.environ.get('DB_POOL_MAX_OVERFLOW') or 10)
+    # 连接池耗尽时等待空闲连接的秒数
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT') or 10)
+    # 连接最长使用时间（秒），需小于 MySQL wait_timeout
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE') or 1800)
+    # 每次取出连接时 ping 检测（多一次往返）；关闭时只依赖 DB_POOL_RECYCLE 回收
+    DB_POOL_PRE_PING = (os.environ.get('DB_POOL_PRE_PING') or 'true').lower() in ('1', 'true', 'yes')
+    
+    # 只读副本（不配置则全部读写走主库，见 utils/db_router.py）
+    SQLALCHEMY_REPLICA_URI = os.environ.get('DATABASE_REPLICA_URL')
+    # 发生写操作后同一客户端读主库的秒数（需大于副本复制延迟）
+    REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS') or 5)
     
     # JWT配置
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-key-2024'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
     
+    # 登录配置：最后登录时间的写入节流间隔与后台合并写入周期（秒，0 表示同步写入）
+    LAST_LOGIN_THROTTLE_SECONDS = 300
+    LAST_LOGIN_FLUSH_INTERVAL = 5
+    
+    # 密码哈希配置：哈希算法与参数、执行池并发数与排队上限
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'scrypt:32768:8:1'
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS') or 4)
+    PASSWORD_HASH_QUEUE_SIZE = int(os.environ.get('PASSWORD_HASH_QUEUE_SIZE') or 32)
+    
     # CORS配置
     CORS_HEADERS = 'Content-Type'
     
@@ -41,12 +61,69 @@ class Config:
     ITEMS_PER_PAGE = 10
     MAX_PAGE_SIZE = 100
     
+    # 参考数据缓存（科室、职称、药品分类、采购统计）过期时间（秒）
+    REFERENCE_CACHE_TTL = 300
+    # 接口响应缓存（医生列表等 reference_cache 未覆盖的 GET 接口，utils/response_cache.py）
+    RESPONSE_CACHE_ENABLED = True
+    RESPONSE_CACHE_TTL = 300
+    RESPONSE_CACHE_MAX_ENTRIES = 1024
+    # 门户权限缓存（用户可管理病人、医生接诊病人）过期时间（秒）与最大条目数
+    ACCESS_CACHE_TTL = 60
+    ACCESS_CACHE_MAX_ENTRIES = 20000
+    # 令牌撤销列表：布隆过滤器容量、误判率，以及从数据库增量同步的间隔（秒）
+    TOKEN_REVOCATION_BLOOM_CAPACITY = 100000
+    TOKEN_REVOCATION_BLOOM_ERROR_RATE = 0.001
+    TOKEN_REVOCATION_SYNC_INTERVAL = 10
+    # 登录限流：窗口（秒）内按 IP、按用户名允许的密码校验失败次数
+    LOGIN_RATE_LIMIT_ENABLED = True
+    LOGIN_RATE_LIMIT_WINDOW = 300
+    LOGIN_RATE_LIMIT_PER_IP = 30
+    LOGIN_RATE_LIMIT_PER_USERNAME = 5
+    # 添加家庭成员（校验家人密码）的限流
+    FAMILY_MEMBER_RATE_LIMIT_ENABLED = True
+    FAMILY_MEMBER_RATE_LIMIT_WINDOW = 300
+    FAMILY_MEMBER_RATE_LIMIT_PER_IP = 10
+    FAMILY_MEMBER_RATE_LIMIT_PER_USERNAME = 5
+    # 反向代理（nginx）层数：>0 时按 X-Forwarded-For / X-Forwarded-Proto 还原客户端地址，
+    # 限流才能按真实 IP 计数；未经代理直接对外时必须为 0，否则客户端可伪造该头
+    PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR') or 0)
+    PROXY_FIX_X_PROTO = int(os.environ.get('PROXY_FIX_X_PROTO') or 0)
+    
     # 系统配置
     SYSTEM_NAME = '医院综合管理系统'
     SYSTEM_VERSION = '2.0.0'
     
     # API配置
-    JSON_AS_ASCII = False  # 支持中文JSON
+    # 响应压缩（utils/compression.py）：超过 COMPRESS_MIN_SIZE 字节的文本响应按 br/gzip 压缩
+    COMPRESS_ENABLED = True
+    COMPRESS_MIN_SIZE = 1024
+    COMPRESS_LEVEL = 6
+    COMPRESS_BROTLI_QUALITY = 4
+    # GET 响应附带 ETag，数据未变化时返回 304（utils/conditional.py）
+    CONDITIONAL_GET_ENABLED = True
+    # 请求级 SQL 统计（utils/query_stats.py）：Server-Timing 头、慢请求日志与 N+1 检测
+    QUERY_STATS_ENABLED = True
+    SERVER_TIMING_ENABLED = True
+    SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS') or 1000)
+    # 同一条 SELECT 以不同参数执行超过该次数视为 N+1；N_PLUS_ONE_RAISE 为 None 时仅测试模式抛出异常
+    N_PLUS_ONE_THRESHOLD = 10
+    N_PLUS_ONE_RAISE = None
+    # Prometheus 指标（utils/metrics.py）：GET /metrics；设置 METRICS_TOKEN 后需携带 Bearer 令牌
+    METRICS_ENABLED = True
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or None
+    # 为 True 时未设置 METRICS_TOKEN 则不注册 /metrics（返回 404）
+    METRICS_REQUIRE_TOKEN = False
+    # 多进程部署时各进程写入计数快照的目录（gunicorn.conf.py 启动时自动创建）
+    METRICS_SHARED_DIR = os.environ.get('METRICS_SHARED_DIR') or None
+    METRICS_DUMP_INTERVAL = 5
+    METRICS_DB_GAUGE_TTL = 15
+    # 性能剖析（utils/profiler.py）：按比例随机剖析请求（0 为关闭），结果保存在 PROFILE_DIR
+    PROFILER_ENABLED = True
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE') or 0)
+    PROFILE_PATH_PREFIX = os.environ.get('PROFILE_PATH_PREFIX') or ''
+    PROFILE_DIR = os.environ.get('PROFILE_DIR') or None
+    PROFILE_KEEP = 50
+    # 中文 JSON 输出由 utils/json_provider.py 处理（Flask 3 不再读取 JSON_AS_ASCII）
     RESTFUL_JSON = {
         'ensure_ascii': False
     }
@@ -57,6 +134,11 @@ class DevelopmentConfig(Config):
     DEBUG = True
     # 开发环境可以使用SQLite（可选）
     # SQLALCHEMY_DATABASE_URI = 'sqlite:///hospital.db'
+    # 开发环境使用较低的哈希成本，加快本地登录与造数（needs_rehash 只升级，已有的 scrypt 哈希保持不变）
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'pbkdf2:sha256:100000'
+    # 本地数据库可能随时重启，保留 pre-ping；连接池不需要太大
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE') or 5)
+    DB_POOL_MAX_OVERFLOW = int(os.environ.get('DB_POOL_MAX_OVERFLOW') or 5)
 
 
 class ProductionConfig(Config):
@@ -64,6 +146,17 @@ class ProductionConfig(Config):
     DEBUG = False
     # 生产环境必须使用环境变量配置数据库
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE') or 20)
+    DB_POOL_MAX_OVERFLOW = int(os.environ.get('DB_POOL_MAX_OVERFLOW') or 10)
+    # 连接池耗尽时尽快失败，避免请求堆积
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT') or 5)
+    # 连接在 wait_timeout 之前由 DB_POOL_RECYCLE 回收，省去每次取连接的 ping 往返
+    DB_POOL_PRE_PING = (os.environ.get('DB_POOL_PRE_PING') or 'false').lower() in ('1', 'true', 'yes')
+    # 生产环境部署在 nginx 之后（见 frontend/nginx.conf）
+    PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR') or 1)
+    PROXY_FIX_X_PROTO = int(os.environ.get('PROXY_FIX_X_PROTO') or 1)
+    # 指标接口必须配置 METRICS_TOKEN 才会启用
+    METRICS_REQUIRE_TOKEN = True
 
 
 # 配置字典
@@ -6,7 +6,28 @@ Flask Extensions
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
 
+from backend.utils.db_router import RoutingSession
+
 # 创建扩展对象（但不初始化应用）
-db = SQLAlchemy()
+# 会话按请求在主库与只读副本之间路由（见 utils/db_router.py）
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 jwt = JWTManager()
 
+
+
+@jwt.token_in_blocklist_loader
+def check_if_token_revoked(jwt_header, jwt_payload):
+    """令牌撤销检查：布隆过滤器判定未撤销时不产生 I/O"""
+    from backend.utils.token_revocation import revocation_list
+    return revocation_list.is_revoked(jwt_payload['jti'])
+
+
+@jwt.revoked_token_loader
+def revoked_token_response(jwt_header, jwt_payload):
+    from flask import jsonify
+    return jsonify({
+        'success': False,
+        'message': '登录状态已失效，请重新登录',
+        'code': 'TOKEN_REVOKED',
+        'data': None
+    }), 401
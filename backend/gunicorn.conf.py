@@ -0,0 +1,62 @@
+"""
+Gunicorn 配置
+Gunicorn Configuration
+
+python manage.py serve 使用本配置启动生产服务（也可直接运行
+gunicorn -c backend/gunicorn.conf.py backend.wsgi:app）。参数均可通过环境变量调整：
+- WEB_BIND：监听地址，默认 0.0.0.0:5000
+- WEB_WORKERS：工作进程数，默认 CPU 核数 * 2 + 1（最多 8）
+- WEB_THREADS：每个工作进程的线程数，大于 1 时使用 gthread 工作模式
+- WEB_TIMEOUT / WEB_GRACEFUL_TIMEOUT：请求超时与平滑重启时等待请求完成的秒数
+- WEB_MAX_REQUESTS：工作进程处理该数量请求后自动重启（0 为不重启）
+- METRICS_SHARED_DIR：各工作进程写入指标快照的目录，默认每次启动新建临时目录
+  （平滑重启时新主进程继承该环境变量，计数不会清零）
+
+preload_app 在主进程中创建应用后再 fork 工作进程，导入的模块与应用对象
+以写时复制方式共享内存；因此 fork 之后每个工作进程需重建自己的数据库连接池。
+"""
+import multiprocessing
+import os
+import tempfile
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+bind = os.environ.get('WEB_BIND') or '0.0.0.0:5000'
+workers = int(os.environ.get('WEB_WORKERS') or min(multiprocessing.cpu_count() * 2 + 1, 8))
+threads = int(os.environ.get('WEB_THREADS') or 4)
+worker_class = 'gthread' if threads > 1 else 'sync'
+preload_app = True
+
+timeout = int(os.environ.get('WEB_TIMEOUT') or 30)
+graceful_timeout = int(os.environ.get('WEB_GRACEFUL_TIMEOUT') or 30)
+keepalive = 5
+max_requests = int(os.environ.get('WEB_MAX_REQUESTS') or 2000)
+max_requests_jitter = max_requests // 10
+
+pidfile = os.environ.get('WEB_PIDFILE') or os.path.join(PROJECT_ROOT, '.gunicorn.pid')
+accesslog = os.environ.get('WEB_ACCESS_LOG') or None
+errorlog = '-'
+loglevel = os.environ.get('WEB_LOG_LEVEL') or 'info'
+proc_name = 'hospital-api'
+
+# 在加载应用之前设置，Config 读取该环境变量（见 utils/metrics.py）
+os.environ.setdefault('METRICS_SHARED_DIR', tempfile.mkdtemp(prefix='hospital-api-metrics-'))
+
+
+def post_fork(server, worker):
+    """工作进程不能复用主进程中的数据库连接，丢弃继承的连接池（不关闭主进程的连接）"""
+    from backend.extensions import db
+
+    with worker.app.wsgi().app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def worker_exit(server, worker):
+    """工作进程退出前写入尚未落库的最后登录时间与最后一次指标快照"""
+    from backend.modules.auth.login_services import last_login_recorder
+    from backend.utils.metrics import registry
+
+    last_login_recorder.flush()
+    with worker.app.wsgi().app_context():
+        registry.dump()
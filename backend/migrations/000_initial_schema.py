@@ -0,0 +1,39 @@
+"""
+初始表结构：按当前模型创建尚不存在的表
+Initial Schema
+
+已有数据库（早期由应用启动时的 db.create_all() 建表）执行本迁移时只会补建缺失的表。
+SQLite 的索引名在整个数据库内唯一，而部分模型在不同表上使用了相同的索引名
+（如 idx_status），因此在 SQLite 上逐表建表，重名索引加表名前缀。
+"""
+from sqlalchemy import inspect
+from sqlalchemy.schema import CreateTable
+
+from backend.migrations.runner import sqlite_index_names
+
+
+def _load_models():
+    import backend.models  # noqa: F401
+    import backend.modules.doctor.models_extended  # noqa: F401
+    from backend.extensions import db
+    return db.metadata
+
+
+def upgrade(connection):
+    metadata = _load_models()
+    if connection.dialect.name != 'sqlite':
+        metadata.create_all(bind=connection, checkfirst=True)
+        return
+
+    existing = set(inspect(connection).get_table_names())
+    index_names = sqlite_index_names(metadata)
+    for table in metadata.sorted_tables:
+        if table.name in existing:
+            continue
+        connection.execute(CreateTable(table))
+        for index in table.indexes:
+            columns = ', '.join(f'"{c.name}"' for c in index.columns)
+            unique = 'UNIQUE ' if index.unique else ''
+            connection.exec_driver_sql(
+                f'CREATE {unique}INDEX "{index_names[index]}" ON "{table.name}" ({columns})'
+            )
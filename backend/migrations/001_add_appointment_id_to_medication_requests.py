@@ -0,0 +1,35 @@
+"""
+为 medication_requests 表添加 appointment_id 字段
+Add appointment_id to medication_requests
+
+用于关联用药申请和预约。
+"""
+from backend.migrations.runner import has_column, has_index
+
+
+def upgrade(connection):
+    if not has_column(connection, 'medication_requests', 'appointment_id'):
+        if connection.dialect.name == 'mysql':
+            connection.exec_driver_sql(
+                "ALTER TABLE medication_requests "
+                "ADD COLUMN appointment_id INT NULL COMMENT '关联的预约ID' AFTER medicine_id"
+            )
+            # 添加外键约束
+            connection.exec_driver_sql(
+                "ALTER TABLE medication_requests "
+                "ADD CONSTRAINT fk_medication_requests_appointment "
+                "FOREIGN KEY (appointment_id) REFERENCES appointments(id) "
+                "ON DELETE SET NULL"
+            )
+        else:
+            connection.exec_driver_sql(
+                "ALTER TABLE medication_requests ADD COLUMN appointment_id INTEGER NULL "
+                "REFERENCES appointments(id) ON DELETE SET NULL"
+            )
+
+    # 添加索引以提高查询性能
+    if not has_index(connection, 'medication_requests', 'idx_medication_requests_appointment_id'):
+        connection.exec_driver_sql(
+            "CREATE INDEX idx_medication_requests_appointment_id "
+            "ON medication_requests(appointment_id)"
+        )
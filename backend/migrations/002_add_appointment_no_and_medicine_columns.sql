@@ -75,19 +75,25 @@ WHERE appointment_no IS NULL;
 ALTER TABLE appointments
   MODIFY COLUMN appointment_no VARCHAR(20) NOT NULL COMMENT '预约编号';
 
--- 3.4 确保唯一索引存在
+-- 3.4 确保唯一索引存在：按模型建表（迁移 000）时 appointment_no 已有其他名称的唯一索引，
+--     因此检查该列上是否已有任意单列唯一索引，而不只是检查索引名
 SET @exists_appointments_no_idx := (
   SELECT COUNT(*)
-  FROM INFORMATION_SCHEMA.STATISTICS
-  WHERE TABLE_SCHEMA = @db_name
-    AND TABLE_NAME = 'appointments'
-    AND INDEX_NAME = 'uk_appointments_appointment_no'
+  FROM (
+    SELECT INDEX_NAME
+    FROM INFORMATION_SCHEMA.STATISTICS
+    WHERE TABLE_SCHEMA = @db_name
+      AND TABLE_NAME = 'appointments'
+      AND NON_UNIQUE = 0
+    GROUP BY INDEX_NAME
+    HAVING COUNT(*) = 1 AND MAX(COLUMN_NAME) = 'appointment_no'
+  ) AS appointment_no_unique_indexes
 );
 
 SET @sql := IF(
   @exists_appointments_no_idx = 0,
   'ALTER TABLE appointments ADD UNIQUE INDEX uk_appointments_appointment_no (appointment_no);',
-  'SELECT ''uk_appointments_appointment_no already exists'';'
+  'SELECT ''unique index on appointments.appointment_no already exists'';'
 );
 PREPARE stmt FROM @sql;
 EXECUTE stmt;
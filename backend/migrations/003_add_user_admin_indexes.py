@@ -0,0 +1,18 @@
+"""
+用户管理列表索引
+User Admin Listing Indexes
+
+管理员用户列表按 created_at 倒序做键集分页，可按角色过滤。
+"""
+from backend.migrations.runner import has_index
+
+INDEXES = {
+    'idx_users_created_at_id': ('created_at', 'id'),
+    'idx_users_role_created_at_id': ('role', 'created_at', 'id'),
+}
+
+
+def upgrade(connection):
+    for name, columns in INDEXES.items():
+        if not has_index(connection, 'users', name):
+            connection.exec_driver_sql(f"CREATE INDEX {name} ON users ({', '.join(columns)})")
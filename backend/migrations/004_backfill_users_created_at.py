@@ -0,0 +1,24 @@
+"""
+users.created_at 回填并设为非空
+Backfill users.created_at
+
+管理员用户列表按 (created_at, id) 做键集分页：列中存在 NULL 时翻页条件需要额外的
+「created_at IS NULL」分支，OR 条件无法使用 idx_users_created_at_id 做范围扫描。
+早期数据中缺失的创建时间按更新时间、最后登录时间或当前时间（UTC）回填。
+SQLite 不支持修改列的可空性，只做回填（新数据由模型默认值保证非空）。
+"""
+from sqlalchemy import inspect
+
+
+def upgrade(connection):
+    now = 'UTC_TIMESTAMP()' if connection.dialect.name == 'mysql' else 'CURRENT_TIMESTAMP'
+    connection.exec_driver_sql(
+        f"UPDATE users SET created_at = COALESCE(updated_at, last_login, {now}) WHERE created_at IS NULL"
+    )
+    if connection.dialect.name != 'mysql':
+        return
+    column = next(c for c in inspect(connection).get_columns('users') if c['name'] == 'created_at')
+    if column['nullable']:
+        connection.exec_driver_sql(
+            "ALTER TABLE users MODIFY created_at DATETIME NOT NULL COMMENT '创建时间'"
+        )
@@ -0,0 +1,6 @@
+"""
+数据库迁移
+Database Migrations
+
+版本化迁移脚本与执行器，见 runner.py
+"""
@@ -0,0 +1,289 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+数据库迁移执行器
+Database Migration Runner
+
+应用启动时不再执行任何 DDL（原先每个进程启动都要 db.create_all() 检查全部表），
+表结构变更统一由本执行器显式执行：
+- 迁移脚本放在 backend/migrations 目录，文件名为「三位版本号_说明」：
+  - .py：定义 upgrade(connection)，使用 SQLAlchemy 连接执行（需自行判断是否已执行过，保证幂等）
+  - .sql：MySQL 脚本，按分号逐条执行；其他数据库（如开发用 SQLite）跳过并记录
+- 已执行的版本记录在 schema_migrations 表中（含文件校验和），只执行未记录的版本
+- 每个版本在一个事务内执行并记录（MySQL 的 DDL 会隐式提交，脚本本身需可重复执行）
+
+运行方式（在项目根目录下）：
+    python -m backend.migrations.runner upgrade [--to 003]
+    python -m backend.migrations.runner status
+或通过 Flask CLI：
+    flask --app backend.app migrate upgrade
+"""
+import hashlib
+import importlib.util
+import os
+import re
+import sys
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import Column, DateTime, MetaData, String, Table, inspect, select
+
+MIGRATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+MIGRATION_FILE_RE = re.compile(r'^(\d{3})_(\w+)\.(py|sql)$')
+
+# 迁移记录表不属于 db.metadata，避免被 create_all/drop_all 处理
+_metadata = MetaData()
+schema_migrations = Table(
+    'schema_migrations', _metadata,
+    Column('version', String(20), primary_key=True),
+    Column('name', String(200), nullable=False),
+    Column('checksum', String(64), nullable=False),
+    Column('status', String(20), nullable=False, default='applied'),
+    Column('applied_at', DateTime, nullable=False, default=datetime.utcnow),
+)
+
+
+class Migration:
+    """一个版本的迁移脚本"""
+
+    def __init__(self, version: str, name: str, path: str):
+        self.version = version
+        self.name = name
+        self.path = path
+        self.kind = os.path.splitext(path)[1][1:]
+
+    def __repr__(self):
+        return f'<Migration {self.version} {self.name}>'
+
+    @property
+    def checksum(self) -> str:
+        with open(self.path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    def run(self, connection) -> str:
+        """
+        执行迁移
+
+        Returns:
+            str: applied / skipped
+        """
+        if self.kind == 'py':
+            spec = importlib.util.spec_from_file_location(f'_migration_{self.version}', self.path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            module.upgrade(connection)
+            return 'applied'
+
+        if connection.dialect.name != 'mysql':
+            return 'skipped'
+        with open(self.path, encoding='utf-8') as f:
+            for statement in split_sql(f.read()):
+                connection.exec_driver_sql(statement)
+        return 'applied'
+
+
+def split_sql(script: str) -> List[str]:
+    """按行尾分号拆分 SQL 脚本，去掉注释与 USE 语句（数据库由连接串决定）"""
+    statements, current = [], []
+    for line in script.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith('--'):
+            continue
+        current.append(line)
+        if stripped.endswith(';'):
+            statement = '\n'.join(current).strip().rstrip(';').strip()
+            current = []
+            if statement and not re.match(r'^USE\s', statement, re.IGNORECASE):
+                statements.append(statement)
+    if current:
+        statements.append('\n'.join(current).strip())
+    return statements
+
+
+def discover(directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    """按版本号列出迁移脚本"""
+    migrations: Dict[str, Migration] = {}
+    for filename in sorted(os.listdir(directory)):
+        match = MIGRATION_FILE_RE.match(filename)
+        if not match:
+            continue
+        version, name, _ = match.groups()
+        if version in migrations:
+            raise RuntimeError(f'迁移版本号重复: {version}（{migrations[version].path} 与 {filename}）')
+        migrations[version] = Migration(version, name, os.path.join(directory, filename))
+    return [migrations[v] for v in sorted(migrations)]
+
+
+class MigrationRunner:
+    """迁移执行器"""
+
+    def __init__(self, engine, directory: str = MIGRATIONS_DIR):
+        self.engine = engine
+        self.directory = directory
+
+    def _applied(self) -> Dict[str, Dict]:
+        with self.engine.begin() as connection:
+            schema_migrations.create(bind=connection, checkfirst=True)
+            rows = connection.execute(select(schema_migrations)).mappings().all()
+        return {row['version']: dict(row) for row in rows}
+
+    def status(self) -> List[Dict]:
+        """各版本的执行状态"""
+        applied = self._applied()
+        result = []
+        for migration in discover(self.directory):
+            row = applied.get(migration.version)
+            result.append({
+                'version': migration.version,
+                'name': migration.name,
+                'status': row['status'] if row else 'pending',
+                'applied_at': row['applied_at'] if row else None,
+                'modified': bool(row) and row['checksum'] != migration.checksum
+            })
+        return result
+
+    def pending(self, target: Optional[str] = None) -> List[Migration]:
+        """未执行的迁移（可指定执行到的目标版本）"""
+        applied = self._applied()
+        return [
+            m for m in discover(self.directory)
+            if m.version not in applied and (target is None or m.version <= target)
+        ]
+
+    def upgrade(self, target: Optional[str] = None, echo=print) -> List[Migration]:
+        """
+        依次执行未执行的迁移
+
+        Args:
+            target: 执行到的目标版本（含），默认全部
+            echo: 输出函数
+
+        Returns:
+            List[Migration]: 本次执行的迁移
+        """
+        executed = []
+        for migration in self.pending(target):
+            echo(f"  → {migration.version} {migration.name} ...")
+            with self.engine.begin() as connection:
+                status = migration.run(connection)
+                connection.execute(schema_migrations.insert().values(
+                    version=migration.version,
+                    name=migration.name,
+                    checksum=migration.checksum,
+                    status=status,
+                    applied_at=datetime.utcnow()
+                ))
+            echo(f"    ✓ {'已跳过（非 MySQL 数据库）' if status == 'skipped' else '完成'}")
+            executed.append(migration)
+        return executed
+
+    def reset(self):
+        """删除迁移记录表（重建数据库时使用）"""
+        with self.engine.begin() as connection:
+            schema_migrations.drop(bind=connection, checkfirst=True)
+
+
+def has_column(connection, table: str, column: str) -> bool:
+    """表中是否已有指定列（供迁移脚本判断是否需要执行）"""
+    inspector = inspect(connection)
+    if not inspector.has_table(table):
+        return False
+    return any(c['name'] == column for c in inspector.get_columns(table))
+
+
+def has_index(connection, table: str, index: str) -> bool:
+    """表中是否已有指定索引"""
+    inspector = inspect(connection)
+    if not inspector.has_table(table):
+        return False
+    return any(i['name'] == index for i in inspector.get_indexes(table))
+
+
+def sqlite_index_names(metadata) -> Dict:
+    """
+    SQLite 的索引名在整个数据库内唯一，而 MySQL 只要求表内唯一：
+    按建表顺序为与前面的表重名的索引加表名前缀
+
+    Returns:
+        Dict: {Index: 在 SQLite 中使用的索引名}
+    """
+    used, names = set(), {}
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            name = index.name if index.name not in used else f'{table.name}_{index.name}'
+            used.add(name)
+            names[index] = name
+    return names
+
+
+# ============= 命令行 =============
+
+migrate_cli = AppGroup('migrate', help='数据库迁移')
+
+
+def _runner():
+    from backend.extensions import db
+    return MigrationRunner(db.engine)
+
+
+def _print_status(runner: MigrationRunner):
+    rows = runner.status()
+    if not rows:
+        click.echo("  （没有迁移脚本）")
+    for row in rows:
+        applied_at = row['applied_at'].strftime('%Y-%m-%d %H:%M:%S') if row['applied_at'] else ''
+        flag = '  [脚本在执行后被修改]' if row['modified'] else ''
+        click.echo(f"  {row['version']}  {row['status']:<8} {applied_at:<19}  {row['name']}{flag}")
+
+
+@migrate_cli.command('upgrade')
+@click.option('--to', 'target', default=None, help='执行到的目标版本（如 003）')
+def upgrade_command(target):
+    """执行未执行的迁移"""
+    executed = _runner().upgrade(target, echo=click.echo)
+    click.echo(f"✅ 执行了 {len(executed)} 个迁移" if executed else "✅ 数据库已是最新版本")
+
+
+@migrate_cli.command('status')
+def status_command():
+    """查看迁移状态"""
+    _print_status(_runner())
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='数据库迁移')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    upgrade_parser = subparsers.add_parser('upgrade', help='执行未执行的迁移')
+    upgrade_parser.add_argument('--to', dest='target', default=None, help='执行到的目标版本（如 003）')
+    subparsers.add_parser('status', help='查看迁移状态')
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+    project_root = os.path.dirname(os.path.dirname(MIGRATIONS_DIR))
+    env_path = os.path.join(project_root, '.env')
+    if os.path.exists(env_path):
+        load_dotenv(env_path)
+
+    from backend.app import create_app
+    app = create_app()
+    with app.app_context():
+        runner = _runner()
+        if args.command == 'upgrade':
+            print("=" * 70)
+            print("数据库迁移")
+            print("=" * 70)
+            executed = runner.upgrade(args.target)
+            print(f"✅ 执行了 {len(executed)} 个迁移" if executed else "✅ 数据库已是最新版本")
+        else:
+            _print_status(runner)
+
+
+if __name__ == '__main__':
+    PROJECT_ROOT = os.path.dirname(os.path.dirname(MIGRATIONS_DIR))
+    if PROJECT_ROOT not in sys.path:
+        sys.path.insert(0, PROJECT_ROOT)
+    main()
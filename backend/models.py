@@ -4,8 +4,8 @@ Database Models
 """
 from datetime import datetime
 from backend.extensions import db
-from typing import Dict
-from werkzeug.security import generate_password_hash, check_password_hash
+from typing import Dict, Iterable, Optional
+from backend.utils.password_hasher import password_hasher
 from sqlalchemy import func
 
 
@@ -14,7 +14,12 @@ from sqlalchemy import func
 class User(db.Model):
     """用户表"""
     __tablename__ = 'users'
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        # 用户管理列表按创建时间倒序做键集分页，可按角色过滤
+        db.Index('idx_users_created_at_id', 'created_at', 'id'),
+        db.Index('idx_users_role_created_at_id', 'role', 'created_at', 'id'),
+        {'extend_existing': True}
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(50), unique=True, nullable=False, comment='用户名')
@@ -26,16 +31,21 @@ class User(db.Model):
     department = db.Column(db.String(50), comment='所属科室')
     is_active = db.Column(db.Boolean, default=True, comment='是否激活')
     last_login = db.Column(db.DateTime, comment='最后登录时间')
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, comment='创建时间')
+    # 非空：用户列表按 (created_at, id) 键集分页（见 migrations/004）
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, comment='创建时间')
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, comment='更新时间')
     
     def set_password(self, password: str):
-        """设置密码"""
-        self.password_hash = generate_password_hash(password)
+        """设置密码（在密码哈希执行池中计算）"""
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password: str) -> bool:
-        """验证密码"""
-        return check_password_hash(self.password_hash, password)
+        """验证密码（在密码哈希执行池中计算）"""
+        return password_hasher.verify(self.password_hash, password)
+    
+    def password_needs_rehash(self) -> bool:
+        """密码哈希参数是否与当前配置不一致"""
+        return password_hasher.needs_rehash(self.password_hash)
     
     def __repr__(self):
         return f'<User {self.username}>'
@@ -51,9 +61,9 @@ class User(db.Model):
             'role': self.role,
             'department': self.department,
             'is_active': self.is_active,
-            'last_login': self.last_login.isoformat() if self.last_login else None,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'last_login': self.last_login,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
         
         # 敏感信息仅在需要时包含
@@ -72,8 +82,11 @@ class PatientUserLink(db.Model):
     __tablename__ = 'patient_user_link'
     __table_args__ = {'extend_existing': True}
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), unique=True, nullable=False, comment='用户ID')
-    patient_id = db.Column(db.Integer, db.ForeignKey('patients.id'), unique=True, nullable=False, comment='病人ID')
+    # 改挂到其他用户或档案时需要修改前的值来递增原用户的令牌版本（active_history：赋值前先加载旧值）
+    user_id = db.column_property(db.Column(db.Integer, db.ForeignKey('users.id'), unique=True, nullable=False, comment='用户ID'),
+                                 active_history=True)
+    patient_id = db.column_property(db.Column(db.Integer, db.ForeignKey('patients.id'), unique=True, nullable=False, comment='病人ID'),
+                                    active_history=True)
 
     # 使用模块限定名，避免 registry 中出现多重定义时的歧义
     user = db.relationship('backend.models.User', backref=db.backref('patient_link', uselist=False, cascade='all, delete-orphan'))
@@ -86,8 +99,11 @@ class PatientUserLink(db.Model):
 class DoctorUserLink(db.Model):
     __tablename__ = 'doctor_user_link'
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), unique=True, nullable=False)
-    doctor_id = db.Column(db.Integer, db.ForeignKey('doctors.id'), unique=True, nullable=False)
+    # 同 PatientUserLink：保留修改前的值
+    user_id = db.column_property(db.Column(db.Integer, db.ForeignKey('users.id'), unique=True, nullable=False),
+                                 active_history=True)
+    doctor_id = db.column_property(db.Column(db.Integer, db.ForeignKey('doctors.id'), unique=True, nullable=False),
+                                   active_history=True)
 
     user = db.relationship('backend.models.User', backref=db.backref('doctor_link', uselist=False, cascade='all, delete-orphan'))
     doctor = db.relationship('backend.models.Doctor', backref=db.backref('user_link', uselist=False, cascade='all, delete-orphan'))
@@ -95,6 +111,39 @@ class DoctorUserLink(db.Model):
     def __repr__(self):
         return f'<DoctorUserLink user_id={self.user_id} doctor_id={self.doctor_id}>'
 
+class UserTokenVersion(db.Model):
+    """
+    用户令牌版本：角色、启用状态、科室或医生/病人关联变化时递增，
+    签发时写入 JWT 的版本号与当前版本不一致的令牌视为失效。
+    不设外键，用户删除后保留记录，保证其旧令牌仍被拒绝。
+    """
+    __tablename__ = 'user_token_versions'
+    __table_args__ = {'extend_existing': True}
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False, comment='用户ID')
+    version = db.Column(db.Integer, nullable=False, default=0, comment='令牌版本')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<UserTokenVersion user_id={self.user_id} version={self.version}>'
+
+class RevokedToken(db.Model):
+    """已撤销的JWT（登出、管理员强制下线），过期后可清理"""
+    __tablename__ = 'revoked_tokens'
+    __table_args__ = (
+        db.Index('idx_revoked_tokens_revoked_at', 'revoked_at'),
+        db.Index('idx_revoked_tokens_expires_at', 'expires_at'),
+        {'extend_existing': True}
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(64), unique=True, nullable=False, comment='令牌唯一标识')
+    user_id = db.Column(db.Integer, comment='用户ID')
+    token_type = db.Column(db.String(10), comment='access/refresh')
+    expires_at = db.Column(db.DateTime, nullable=False, comment='令牌过期时间')
+    revoked_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, comment='撤销时间')
+
+    def __repr__(self):
+        return f'<RevokedToken {self.jti}>'
+
 # 多对多关联表：定义一个用户可以管理哪些病人档案（自己和家人）
 patient_relations = db.Table('patient_relations',
     db.Column('user_id', db.Integer, db.ForeignKey('users.id'), primary_key=True),
@@ -151,8 +200,8 @@ class Patient(db.Model):
             'address': self.address,
             'emergency_contact': self.emergency_contact,
             'emergency_phone': self.emergency_phone,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
 
 
@@ -163,7 +212,9 @@ class MedicalRecord(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('patients.id'), nullable=False)
-    doctor_id = db.Column(db.Integer, db.ForeignKey('doctors.id'), nullable=False)
+    # 修改前的值在提交时用于使原医生的访问控制缓存失效（active_history：赋值前先加载旧值）
+    doctor_id = db.column_property(db.Column(db.Integer, db.ForeignKey('doctors.id'), nullable=False),
+                                   active_history=True)
     visit_date = db.Column(db.DateTime, default=datetime.now, comment='就诊日期')
     diagnosis = db.Column(db.Text, comment='诊断结果')
     symptoms = db.Column(db.Text, comment='症状描述')
@@ -185,16 +236,16 @@ class MedicalRecord(db.Model):
             'doctor_id': self.doctor_id,
             'doctor_name': self.doctor.name if self.doctor else None,
             'doctorName': self.doctor.name if self.doctor else None,  # 兼容前端
-            'visit_date': self.visit_date.isoformat() if self.visit_date else None,
-            'visitDate': self.visit_date.isoformat() if self.visit_date else None,  # 兼容前端
-            'diagnosis_date': self.visit_date.isoformat() if self.visit_date else None,  # 兼容前端
+            'visit_date': self.visit_date,
+            'visitDate': self.visit_date,  # 兼容前端
+            'diagnosis_date': self.visit_date,  # 兼容前端
             'diagnosis': self.diagnosis or '',  # 确保不为None
             'symptoms': self.symptoms or '',
             'treatment': self.treatment or '',
             'prescription': self.prescription or '',
             'notes': self.notes or '',
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'createdAt': self.created_at.isoformat() if self.created_at else None,  # 兼容前端
+            'created_at': self.created_at,
+            'createdAt': self.created_at,  # 兼容前端
             'record_no': f"MR{self.id:06d}" if self.id else None,  # 生成病历号
             'recordNo': f"MR{self.id:06d}" if self.id else None  # 兼容前端
         }
@@ -208,7 +259,9 @@ class Appointment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     appointment_no = db.Column(db.String(20), unique=True, nullable=False, comment='预约编号')
     patient_id = db.Column(db.Integer, db.ForeignKey('patients.id'), nullable=False)
-    doctor_id = db.Column(db.Integer, db.ForeignKey('doctors.id'), nullable=False)
+    # 修改前的值在提交时用于使原医生的访问控制缓存失效（active_history：赋值前先加载旧值）
+    doctor_id = db.column_property(db.Column(db.Integer, db.ForeignKey('doctors.id'), nullable=False),
+                                   active_history=True)
     appointment_date = db.Column(db.DateTime, nullable=False, comment='预约日期')
     appointment_time = db.Column(db.String(20), comment='预约时段')
     department = db.Column(db.String(50), comment='科室')
@@ -228,12 +281,12 @@ class Appointment(db.Model):
             'patient_name': self.patient.name if self.patient else None,
             'doctor_id': self.doctor_id,
             'doctor_name': self.doctor.name if self.doctor else None,
-            'appointment_date': self.appointment_date.isoformat() if self.appointment_date else None,
+            'appointment_date': self.appointment_date,
             'appointment_time': self.appointment_time,
             'department': self.department,
             'status': self.status,
             'notes': self.notes,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at
         }
 
 
@@ -277,11 +330,39 @@ class Doctor(db.Model):
         {'extend_existing': True}
     )
     
-    def to_dict(self, include_stats=False) -> Dict:
+    @staticmethod
+    def load_stats(doctor_ids: Iterable[int]) -> Dict[int, Dict[str, int]]:
+        """
+        批量统计医生的患者数与排班数（两次分组查询，避免列表中逐个医生查询）
+
+        Args:
+            doctor_ids: 医生ID列表
+
+        Returns:
+            Dict[int, Dict[str, int]]: {医生ID: {'patientCount': ..., 'scheduleCount': ...}}
+        """
+        doctor_ids = list(doctor_ids)
+        stats = {doctor_id: {'patientCount': 0, 'scheduleCount': 0} for doctor_id in doctor_ids}
+        if not doctor_ids:
+            return stats
+        patient_counts = db.session.query(
+            MedicalRecord.doctor_id, func.count(func.distinct(MedicalRecord.patient_id))
+        ).filter(MedicalRecord.doctor_id.in_(doctor_ids)).group_by(MedicalRecord.doctor_id)
+        for doctor_id, count in patient_counts:
+            stats[doctor_id]['patientCount'] = count
+        schedule_counts = db.session.query(
+            DoctorSchedule.doctor_id, func.count(DoctorSchedule.id)
+        ).filter(DoctorSchedule.doctor_id.in_(doctor_ids)).group_by(DoctorSchedule.doctor_id)
+        for doctor_id, count in schedule_counts:
+            stats[doctor_id]['scheduleCount'] = count
+        return stats
+
+    def to_dict(self, include_stats=False, stats: Optional[Dict[str, int]] = None) -> Dict:
         """转换为字典（用于JSON序列化）
         
         Args:
             include_stats: 是否包含统计信息（患者数、排班数），默认False以提高性能
+            stats: 预先批量查询的统计信息（见 load_stats），提供时不再单独查询
         """
         result = {
             'id': self.id,
@@ -295,14 +376,17 @@ class Doctor(db.Model):
             'title': self.title,
             'specialty': self.specialty,
             'education': self.education,
-            'hire_date': self.hire_date.isoformat() if self.hire_date else None,
+            'hire_date': self.hire_date,
             'status': self.status,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
         
         # 只有在需要时才查询统计信息
-        if include_stats:
+        if stats is not None:
+            result['patientCount'] = stats.get('patientCount', 0)
+            result['scheduleCount'] = stats.get('scheduleCount', 0)
+        elif include_stats:
             try:
                 # 统计关联的唯一患者数（通过病历记录）
                 patient_count = db.session.query(func.count(func.distinct(MedicalRecord.patient_id))).filter(
@@ -347,14 +431,14 @@ class DoctorSchedule(db.Model):
             'id': self.id,
             'doctor_id': self.doctor_id,
             'doctor_name': self.doctor.name if self.doctor else None,
-            'date': self.date.isoformat() if self.date else None,
+            'date': self.date,
             'shift': self.shift,
             'start_time': self.start_time,
             'end_time': self.end_time,
             'max_patients': self.max_patients,
             'status': self.status,
             'notes': self.notes,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'created_at': self.created_at,
             # 预留字段：已预约人数，当前尚未与挂号系统联动，默认返回0
             'booked_count': 0
         }
@@ -396,7 +480,7 @@ class DoctorPerformance(db.Model):
             'total_score': self.total_score,
             'bonus': self.bonus,
             'notes': self.notes,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at
         }
 
 
@@ -433,30 +517,44 @@ class Medicine(db.Model):
     def __repr__(self):
         return f'<Medicine {self.name}>'
     
-    def to_dict(self) -> Dict:
-        """转换为字典（用于JSON序列化）"""
-        return {
-            'id': self.id,
-            'medicine_no': self.medicine_no,
-            'name': self.name,
-            'generic_name': self.generic_name,
-            'category': self.category,
-            'specification': self.specification,
-            'unit': self.unit,
-            'manufacturer': self.manufacturer,
-            'price': float(self.price) if self.price else 0,
-            'prescription_required': self.prescription_required,
-            'usage': self.usage,
-            'indications': self.indications,
-            'contraindications': self.contraindications,
-            'side_effects': self.side_effects,
-            'storage_conditions': self.storage_conditions,
-            'status': self.status,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            # 包含库存信息
-            'inventory': self.inventory.to_dict() if self.inventory else None
-        }
+    # 可序列化字段（按输出顺序），inventory 为嵌套的库存信息
+    SERIALIZABLE_FIELDS = (
+        'id', 'medicine_no', 'name', 'generic_name', 'category', 'specification', 'unit',
+        'manufacturer', 'price', 'prescription_required', 'usage', 'indications',
+        'contraindications', 'side_effects', 'storage_conditions', 'status',
+        'created_at', 'updated_at', 'inventory'
+    )
+    # 长文本字段：列表页不需要，列表模式下不加载也不输出
+    HEAVY_FIELDS = ('usage', 'indications', 'contraindications', 'side_effects')
+    LIST_FIELDS = (
+        'id', 'medicine_no', 'name', 'generic_name', 'category', 'specification', 'unit',
+        'manufacturer', 'price', 'prescription_required', 'storage_conditions', 'status',
+        'created_at', 'updated_at', 'inventory'
+    )
+
+    def to_dict(self, fields: Optional[Iterable[str]] = None) -> Dict:
+        """转换为字典（用于JSON序列化）
+
+        Args:
+            fields: 需要输出的字段，默认输出全部字段（包含库存信息）。
+                只会访问所选字段，配合查询端的 defer/joinedload 可避免额外的延迟加载。
+        """
+        if fields is None:
+            selected = self.SERIALIZABLE_FIELDS
+        else:
+            requested = set(fields)
+            selected = [f for f in self.SERIALIZABLE_FIELDS if f in requested]
+
+        data = {}
+        for field in selected:
+            if field == 'inventory':
+                # 包含库存信息
+                data['inventory'] = self.inventory.to_dict(medicine_name=self.name) if self.inventory else None
+            elif field == 'price':
+                data['price'] = float(self.price) if self.price else 0
+            else:
+                data[field] = getattr(self, field)
+        return data
 
 
 class MedicineInventory(db.Model):
@@ -479,25 +577,32 @@ class MedicineInventory(db.Model):
     def __repr__(self):
         return f'<MedicineInventory {self.medicine_id}>'
     
-    def to_dict(self) -> Dict:
-        """转换为字典（用于JSON序列化）"""
+    def to_dict(self, medicine_name: Optional[str] = None) -> Dict:
+        """转换为字典（用于JSON序列化）
+
+        Args:
+            medicine_name: 调用方已知的药品名称（如从 Medicine.to_dict 嵌套调用），传入后不再访问 self.medicine
+        """
         # 判断是否低库存
         is_low_stock = self.quantity <= self.min_stock if self.min_stock else False
         
+        if medicine_name is None and self.medicine:
+            medicine_name = self.medicine.name
+
         return {
             'id': self.id,
             'medicine_id': self.medicine_id,
-            'medicine_name': self.medicine.name if self.medicine else None,
+            'medicine_name': medicine_name,
             'quantity': self.quantity,
             'min_stock': self.min_stock,
             'max_stock': self.max_stock,
             'is_low_stock': is_low_stock,
             'location': self.location,
             'batch_no': self.batch_no,
-            'production_date': self.production_date.isoformat() if self.production_date else None,
-            'expiry_date': self.expiry_date.isoformat() if self.expiry_date else None,
-            'last_restock_date': self.last_restock_date.isoformat() if self.last_restock_date else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'production_date': self.production_date,
+            'expiry_date': self.expiry_date,
+            'last_restock_date': self.last_restock_date,
+            'updated_at': self.updated_at
         }
 
 
@@ -539,20 +644,35 @@ class MedicinePurchase(db.Model):
             'quantity': self.quantity,
             'unit_price': float(self.unit_price) if self.unit_price else 0,
             'total_price': float(self.total_price) if self.total_price else 0,
-            'purchase_date': self.purchase_date.isoformat() if self.purchase_date else None,
-            'expected_delivery_date': self.expected_delivery_date.isoformat() if self.expected_delivery_date else None,
-            'actual_delivery_date': self.actual_delivery_date.isoformat() if self.actual_delivery_date else None,
+            'purchase_date': self.purchase_date,
+            'expected_delivery_date': self.expected_delivery_date,
+            'actual_delivery_date': self.actual_delivery_date,
             'status': self.status,
             'priority': self.priority,
             'batch_no': self.batch_no,
-            'production_date': self.production_date.isoformat() if self.production_date else None,
-            'expiry_date': self.expiry_date.isoformat() if self.expiry_date else None,
+            'production_date': self.production_date,
+            'expiry_date': self.expiry_date,
             'purchaser': self.purchaser,
             'notes': self.notes,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at
         }
 
 
+class PurchaseReceipt(db.Model):
+    """采购收货记录（按客户端提供的幂等键去重，重试时直接返回首次结果）"""
+    __tablename__ = 'purchase_receipts'
+    __table_args__ = {'extend_existing': True}
+
+    id = db.Column(db.Integer, primary_key=True)
+    idempotency_key = db.Column(db.String(64), unique=True, nullable=False, comment='幂等键')
+    request_fingerprint = db.Column(db.String(64), nullable=False, comment='请求内容摘要')
+    result = db.Column(db.Text, nullable=False, comment='收货结果（JSON）')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<PurchaseReceipt {self.idempotency_key}>'
+
+
 class MedicationRequest(db.Model):
     __tablename__ = 'medication_requests'
     __table_args__ = {'extend_existing': True}
@@ -595,8 +715,8 @@ class MedicationRequest(db.Model):
             'quantity': self.quantity,
             'status': self.status,
             'reason': self.reason,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'approved_at': self.approved_at.isoformat() if self.approved_at else None,
-            'dispensed_at': self.dispensed_at.isoformat() if self.dispensed_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'created_at': self.created_at,
+            'approved_at': self.approved_at,
+            'dispensed_at': self.dispensed_at,
+            'updated_at': self.updated_at
         }
@@ -0,0 +1,138 @@
+"""
+登录服务
+Login Services
+
+登录时间（last_login）写入的节流与合并：
+- 节流：距上次记录不足 LAST_LOGIN_THROTTLE_SECONDS 的登录不再写库
+- 合并：需要写入的登录时间先放入内存队列，由后台线程每 LAST_LOGIN_FLUSH_INTERVAL 秒
+  用一条批量 UPDATE 写入；同一用户在一个周期内多次登录只保留最新时间
+LAST_LOGIN_FLUSH_INTERVAL 为 0 时退化为同步写入（仍然节流）。
+"""
+import atexit
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import bindparam, update
+
+from backend.extensions import db
+from backend.models import Doctor, DoctorUserLink, PatientUserLink, User
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THROTTLE_SECONDS = 300
+DEFAULT_FLUSH_INTERVAL = 5
+
+
+def load_login_user(username: str) -> Tuple[Optional[User], Optional[Doctor], Optional[int]]:
+    """
+    一次查询取出用户、关联的医生档案及关联的病人档案ID
+
+    Args:
+        username: 用户名
+
+    Returns:
+        Tuple[Optional[User], Optional[Doctor], Optional[int]]: 无关联时对应项为 None
+    """
+    row = db.session.query(User, Doctor, PatientUserLink.patient_id).outerjoin(
+        DoctorUserLink, DoctorUserLink.user_id == User.id
+    ).outerjoin(
+        Doctor, Doctor.id == DoctorUserLink.doctor_id
+    ).outerjoin(
+        PatientUserLink, PatientUserLink.user_id == User.id
+    ).filter(User.username == username).first()
+    if row is None:
+        return None, None, None
+    return row[0], row[1], row[2]
+
+
+class LastLoginRecorder:
+    """last_login 合并写入器（每个进程一个实例）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Dict[int, datetime] = {}
+        self._app = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def record(self, user: User, when: Optional[datetime] = None) -> datetime:
+        """
+        记录一次登录
+
+        Args:
+            user: 已登录的用户（只读取 id 与已持久化的 last_login，不修改对象）
+            when: 登录时间，默认当前 UTC 时间
+
+        Returns:
+            datetime: 本次登录时间
+        """
+        when = when or datetime.utcnow()
+        config = current_app.config
+        throttle = config.get('LAST_LOGIN_THROTTLE_SECONDS', DEFAULT_THROTTLE_SECONDS)
+        if user.last_login and when - user.last_login < timedelta(seconds=throttle):
+            return when
+
+        if config.get('LAST_LOGIN_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL) <= 0:
+            self._write({user.id: when})
+            return when
+
+        with self._lock:
+            self._pending[user.id] = when
+            if self._thread is None:
+                self._start(current_app._get_current_object())
+        return when
+
+    def flush(self) -> int:
+        """立即写入所有待处理的登录时间，返回写入的用户数"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        if self._app is not None:
+            with self._app.app_context():
+                self._write(pending)
+        else:
+            self._write(pending)
+        return len(pending)
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def _write(self, pending: Dict[int, datetime]):
+        # 使用表级 UPDATE：登录不属于资料修改，保持 updated_at 不变
+        table = User.__table__
+        stmt = update(table).where(
+            table.c.id == bindparam('b_id')
+        ).values(
+            last_login=bindparam('b_last_login'),
+            updated_at=table.c.updated_at
+        )
+        try:
+            db.session.execute(stmt, [
+                {'b_id': user_id, 'b_last_login': when} for user_id, when in pending.items()
+            ])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            logger.exception('写入最后登录时间失败（%d 个用户）', len(pending))
+
+    def _start(self, app):
+        self._app = app
+        interval = app.config.get('LAST_LOGIN_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+        self._thread = threading.Thread(
+            target=self._run, args=(interval,), name='last-login-flusher', daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def _run(self, interval: float):
+        while not self._stop.wait(interval):
+            self.flush()
+
+
+last_login_recorder = LastLoginRecorder()
@@ -2,41 +2,61 @@
 认证模块 - 路由
 Authentication - Routes
 """
-from flask import request, jsonify
+from flask import current_app, request, send_file
 from flask_jwt_extended import (
     create_access_token,
     create_refresh_token,
+    decode_token,
     jwt_required,
     get_jwt_identity,
     get_jwt
 )
-from . import auth_bp
+from . import auth_bp, user_admin_services
+from .login_services import last_login_recorder, load_login_user
 from backend.models import User
 from backend.extensions import db
+from backend.utils import db_pool, db_router, metrics
+from backend.utils.password_hasher import PasswordHasherBusy, password_hasher
+from backend.utils.principal import get_current_principal
+from backend.utils.profiler import SamplerBusy, request_profiler, sample
+from backend.utils.rate_limiter import RateLimitExceeded, login_throttle
+from backend.utils.responses import error_response, success_response, too_many_attempts_response
+from backend.utils.token_revocation import revocation_list
+from backend.utils.token_versions import (
+    build_identity_claims,
+    build_refresh_claims,
+    bump_token_versions
+)
 from datetime import datetime
 from functools import wraps
 
-
-# ============= 统一响应格式 =============
-
-def success_response(data=None, message='操作成功', code='SUCCESS'):
-    """成功响应"""
-    return jsonify({
-        'success': True,
-        'message': message,
-        'code': code,
-        'data': data
-    })
-
-
-def error_response(message='操作失败', code='ERROR', status_code=400):
-    """错误响应"""
-    return jsonify({
-        'success': False,
-        'message': message,
-        'code': code,
-        'data': None
-    }), status_code
+# ============= 令牌签发 =============
+
+def _issue_tokens(user, doctor_id=None, patient_id=None):
+    """
+    签发访问令牌与刷新令牌
+
+    Args:
+        user: 用户对象
+        doctor_id: 关联的医生ID
+        patient_id: 关联的病人档案ID
+
+    Returns:
+        Dict: access_token、refresh_token
+    """
+    # 注意：根据最新JWT规范，sub(Subject)必须为字符串
+    # 因此在创建Token时将用户ID转换为字符串，避免"Subject must be a string"错误
+    identity = str(user.id)
+    return {
+        'access_token': create_access_token(
+            identity=identity,
+            additional_claims=build_identity_claims(user, doctor_id=doctor_id, patient_id=patient_id)
+        ),
+        'refresh_token': create_refresh_token(
+            identity=identity,
+            additional_claims=build_refresh_claims(user)
+        )
+    }
 
 
 # ============= 权限装饰器 =============
@@ -50,7 +70,8 @@ def role_required(*roles):
             claims = get_jwt()
             user_role = claims.get('role', 'user')
             
-            if user_role not in roles and 'admin' not in roles:
+            # 管理员可访问所有角色的接口
+            if user_role not in roles and user_role != 'admin':
                 return error_response('权限不足', 'FORBIDDEN', 403)
             
             return fn(*args, **kwargs)
@@ -179,6 +200,9 @@ def register():
             'REGISTER_SUCCESS'
         )
     
+    except PasswordHasherBusy as e:
+        db.session.rollback()
+        return error_response(str(e), 'SERVER_BUSY', 503)
     except Exception as e:
         db.session.rollback()
         import traceback
@@ -204,10 +228,15 @@ def login():
         if not username or not password:
             return error_response('用户名和密码不能为空', 'MISSING_CREDENTIALS')
         
-        # 查找用户
-        user = User.query.filter_by(username=username).first()
+        # 失败次数超限时直接拒绝，不再查询用户与计算密码哈希
+        login_throttle.check(request.remote_addr, username)
+        
+        # 查找用户（同时取出关联的医生档案与病人档案ID）
+        user, doctor, patient_id = load_login_user(username)
         
         if not user:
+            login_throttle.record_failure(request.remote_addr, username)
+            metrics.login_attempts.inc(('failure',))
             return error_response('用户名或密码错误', 'INVALID_CREDENTIALS', 401)
         
         # 验证密码（兼容早期明文密码存储的用户数据）
@@ -217,48 +246,44 @@ def login():
                 user.set_password(password)
                 db.session.commit()
             else:
+                login_throttle.record_failure(request.remote_addr, username)
+                metrics.login_attempts.inc(('failure',))
                 return error_response('用户名或密码错误', 'INVALID_CREDENTIALS', 401)
+        elif user.password_needs_rehash():
+            # 哈希参数已调整：用本次提交的明文密码按新参数重新哈希
+            user.set_password(password)
+            db.session.commit()
+        login_throttle.record_success(username)
         
         # 检查用户是否激活
         if not user.is_active:
             return error_response('账号已被禁用', 'ACCOUNT_DISABLED', 403)
         
-        # 更新最后登录时间
-        user.last_login = datetime.utcnow()
-        db.session.commit()
-        
-        # 生成JWT Token
-        additional_claims = {
-            'role': user.role,
-            'department': user.department
-        }
-        
-        # 注意：根据最新JWT规范，sub(Subject)必须为字符串
-        # 因此在创建Token时将用户ID转换为字符串，避免"Subject must be a string"错误
-        identity = str(user.id)
+        # 记录最后登录时间（节流 + 后台合并写入，不在登录请求内提交事务）
+        login_time = last_login_recorder.record(user)
         
-        access_token = create_access_token(
-            identity=identity,
-            additional_claims=additional_claims
-        )
-        refresh_token = create_refresh_token(identity=identity)
+        # 生成JWT Token（携带关联的医生/病人ID与令牌版本，后续请求无需再查关联表）
+        tokens = _issue_tokens(user, doctor_id=doctor.id if doctor else None, patient_id=patient_id)
         
         user_data = user.to_dict()
+        user_data['last_login'] = login_time.isoformat()
+        metrics.login_attempts.inc(('success',))
 
-        if user.role == 'doctor':
-            from backend.models import DoctorUserLink
-
-            link = DoctorUserLink.query.filter_by(user_id=user.id).first()
-            if link and link.doctor:
-                user_data['doctor'] = link.doctor.to_dict()
+        if user.role == 'doctor' and doctor:
+            user_data['doctor'] = doctor.to_dict()
 
         return success_response({
             'user': user_data,
-            'access_token': access_token,
-            'refresh_token': refresh_token,
+            'access_token': tokens['access_token'],
+            'refresh_token': tokens['refresh_token'],
             'token_type': 'Bearer'
         }, '登录成功', 'LOGIN_SUCCESS')
     
+    except RateLimitExceeded as e:
+        metrics.login_attempts.inc(('throttled',))
+        return too_many_attempts_response(e)
+    except PasswordHasherBusy as e:
+        return error_response(str(e), 'SERVER_BUSY', 503)
     except Exception as e:
         return error_response(f'登录失败：{str(e)}', 'LOGIN_ERROR', 500)
 
@@ -268,8 +293,8 @@ def login():
 def refresh():
     """刷新Token"""
     try:
-        identity = get_jwt_identity()
-        user = User.query.get(identity)
+        principal = get_current_principal()
+        user = principal.user if principal else None
         
         if not user:
             return error_response('用户不存在', 'USER_NOT_FOUND', 404)
@@ -277,10 +302,11 @@ def refresh():
         if not user.is_active:
             return error_response('账号已被禁用', 'ACCOUNT_DISABLED', 403)
         
-        additional_claims = {
-            'role': user.role,
-            'department': user.department
-        }
+        additional_claims = build_identity_claims(
+            user,
+            doctor_id=principal.doctor_id,
+            patient_id=principal.patient_id
+        )
         
         # 刷新Token时也确保JWT Subject为字符串类型，避免"Subject must be a string"错误
         new_identity = str(user.id)
@@ -298,25 +324,65 @@ def refresh():
         return error_response(f'刷新Token失败：{str(e)}', 'REFRESH_ERROR', 500)
 
 
+def _revoke_claims(claims):
+    """按令牌声明撤销令牌"""
+    revocation_list.revoke(
+        claims['jti'],
+        datetime.utcfromtimestamp(claims['exp']),
+        user_id=int(claims['sub']),
+        token_type=claims.get('type')
+    )
+
+
+@auth_bp.route('/logout', methods=['POST'])
+@jwt_required(verify_type=False)
+def logout():
+    """
+    退出登录
+    撤销当前令牌；请求体携带 refresh_token 时一并撤销刷新令牌
+    """
+    try:
+        claims = get_jwt()
+        _revoke_claims(claims)
+        
+        data = request.get_json(silent=True) or {}
+        refresh_token = data.get('refresh_token')
+        if refresh_token:
+            try:
+                refresh_claims = decode_token(refresh_token, allow_expired=True)
+            except Exception:
+                return error_response('refresh_token无效', 'INVALID_TOKEN')
+            if refresh_claims.get('sub') != claims.get('sub'):
+                return error_response('refresh_token不属于当前用户', 'INVALID_TOKEN')
+            _revoke_claims(refresh_claims)
+        
+        db.session.commit()
+        return success_response(None, '已退出登录', 'LOGOUT_SUCCESS')
+    
+    except Exception as e:
+        db.session.rollback()
+        return error_response(f'退出登录失败：{str(e)}', 'LOGOUT_ERROR', 500)
+
+
 @auth_bp.route('/me', methods=['GET'])
 @jwt_required()
 def get_current_user():
     """获取当前登录用户信息"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        principal = get_current_principal()
+        user = principal.user if principal else None
         
         if not user:
             return error_response('用户不存在', 'USER_NOT_FOUND', 404)
 
         data = user.to_dict()
 
-        if user.role == 'doctor':
-            from backend.models import DoctorUserLink
+        if user.role == 'doctor' and principal.doctor_id:
+            from backend.models import Doctor
 
-            link = DoctorUserLink.query.filter_by(user_id=user.id).first()
-            if link and link.doctor:
-                data['doctor'] = link.doctor.to_dict()
+            doctor = Doctor.query.get(principal.doctor_id)
+            if doctor:
+                data['doctor'] = doctor.to_dict()
         
         return success_response(data)
     
@@ -329,8 +395,8 @@ def get_current_user():
 def update_profile():
     """更新个人信息"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        principal = get_current_principal()
+        user = principal.user if principal else None
         
         if not user:
             return error_response('用户不存在', 'USER_NOT_FOUND', 404)
@@ -356,7 +422,10 @@ def update_profile():
         
         db.session.commit()
         
-        return success_response(user.to_dict(), '个人信息更新成功', 'PROFILE_UPDATED')
+        # 令牌中携带科室声明：按更新后的信息重新签发，客户端替换后无需重新登录
+        result = user.to_dict()
+        result.update(_issue_tokens(user, doctor_id=principal.doctor_id, patient_id=principal.patient_id))
+        return success_response(result, '个人信息更新成功', 'PROFILE_UPDATED')
     
     except Exception as e:
         db.session.rollback()
@@ -368,8 +437,8 @@ def update_profile():
 def change_password():
     """修改密码"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        principal = get_current_principal()
+        user = principal.user if principal else None
         
         if not user:
             return error_response('用户不存在', 'USER_NOT_FOUND', 404)
@@ -398,6 +467,8 @@ def change_password():
         
         return success_response(None, '密码修改成功', 'PASSWORD_CHANGED')
     
+    except PasswordHasherBusy as e:
+        return error_response(str(e), 'SERVER_BUSY', 503)
     except Exception as e:
         db.session.rollback()
         return error_response(f'修改密码失败：{str(e)}', 'CHANGE_PASSWORD_ERROR', 500)
@@ -405,49 +476,160 @@ def change_password():
 
 # ============= 用户管理（仅管理员） =============
 
+@auth_bp.route('/password-hasher/stats', methods=['GET'])
+@role_required('admin')
+def get_password_hasher_stats():
+    """密码哈希执行池指标（管理员）"""
+    return success_response(password_hasher.stats())
+
+
+@auth_bp.route('/db-pool/stats', methods=['GET'])
+@role_required('admin')
+def get_db_pool_stats():
+    """数据库连接池状态与取连接耗时指标（管理员）；配置了只读副本时一并返回副本连接池"""
+    data = db_pool.pool_status(db.engine)
+    replica = db.engines.get(db_router.REPLICA_BIND_KEY)
+    if replica is not None:
+        data['replica'] = db_pool.pool_status(replica)
+    return success_response(data)
+
+
+@auth_bp.route('/profiler/requests', methods=['GET'])
+@role_required('admin')
+def get_profiled_requests():
+    """最近被剖析的请求列表（管理员）"""
+    return success_response(request_profiler.list())
+
+
+@auth_bp.route('/profiler/requests/<profile_id>', methods=['GET'])
+@role_required('admin')
+def get_profiled_request(profile_id):
+    """
+    单个请求的剖析结果（管理员）
+    默认返回按 sort（默认 cumulative）排序的前 limit 个函数的文本报告；
+    format=pstats 时下载 pstats 文件
+    """
+    path = request_profiler.path(profile_id)
+    if path is None:
+        return error_response('剖析结果不存在', 'PROFILE_NOT_FOUND', 404)
+    if request.args.get('format') == 'pstats':
+        return send_file(path, mimetype='application/octet-stream', as_attachment=True,
+                         download_name=f'{profile_id}.prof')
+    sort = request.args.get('sort', 'cumulative')
+    if sort not in ('cumulative', 'tottime', 'ncalls', 'time', 'calls'):
+        return error_response('不支持的排序字段', 'INVALID_SORT')
+    limit = min(max(request.args.get('limit', 40, type=int), 1), 500)
+    report = request_profiler.report(profile_id, sort, limit)
+    return current_app.response_class(report, mimetype='text/plain')
+
+
+@auth_bp.route('/profiler/sample', methods=['GET'])
+@role_required('admin')
+def sample_stacks():
+    """
+    统计采样（管理员）：采集本工作进程各线程的调用栈 seconds 秒，返回折叠栈文本，
+    可直接交给 flamegraph.pl 或 speedscope 生成火焰图
+    """
+    seconds = request.args.get('seconds', 10, type=float)
+    interval_ms = min(max(request.args.get('interval_ms', 10, type=float), 1), 1000)
+    all_threads = request.args.get('all_threads', '').lower() in ('1', 'true')
+    try:
+        result = sample(seconds, interval_ms / 1000, all_threads)
+    except SamplerBusy as e:
+        return error_response(str(e), 'SAMPLER_BUSY', 409)
+    response = current_app.response_class(result['folded'], mimetype='text/plain')
+    response.headers['X-Sample-Count'] = str(result['samples'])
+    response.headers['X-Sample-Duration'] = f"{result['duration']:.3f}"
+    return response
+
+
 @auth_bp.route('/users', methods=['GET'])
 @role_required('admin')
 def get_users():
-    """获取用户列表（管理员）"""
+    """
+    获取用户列表（管理员）
+    传入 cursor 参数（首页传空字符串）时使用键集分页，返回 next_cursor，不统计总数；
+    否则按 page/per_page 分页
+    """
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
+        per_page = min(max(request.args.get('per_page', 10, type=int), 1), 100)
         search = request.args.get('search', '')
         role = request.args.get('role', '')
+        is_active = request.args.get('is_active')
+        if is_active is not None and is_active != '':
+            is_active = is_active.lower() in ('1', 'true', 'yes')
+        else:
+            is_active = None
         
-        query = User.query
-        
-        # 搜索
-        if search:
-            query = query.filter(
-                (User.username.like(f'%{search}%')) |
-                (User.real_name.like(f'%{search}%')) |
-                (User.email.like(f'%{search}%'))
-            )
-        
-        # 角色过滤
-        if role:
-            query = query.filter_by(role=role)
+        cursor = request.args.get('cursor')
+        if cursor is not None:
+            result = user_admin_services.list_users_keyset(cursor, per_page, search, role, is_active)
+            result['per_page'] = per_page
+            return success_response(result)
         
-        # 分页
-        pagination = query.order_by(User.created_at.desc()).paginate(
+        page = request.args.get('page', 1, type=int)
+        query = user_admin_services.build_user_query(search, role, is_active)
+        pagination = query.order_by(User.created_at.desc(), User.id.desc()).paginate(
             page=page, per_page=per_page, error_out=False
         )
         
-        users_data = [user.to_dict() for user in pagination.items]
-        
         return success_response({
-            'list': users_data,
+            'list': [user_admin_services.user_summary(row) for row in pagination.items],
             'total': pagination.total,
             'page': page,
             'per_page': per_page,
             'pages': pagination.pages
         })
     
+    except ValueError as e:
+        return error_response(str(e), 'INVALID_CURSOR')
     except Exception as e:
         return error_response(f'获取用户列表失败：{str(e)}', 'GET_USERS_ERROR', 500)
 
 
+def _bulk_update(values, message, code):
+    """批量更新用户的公共处理"""
+    try:
+        data = request.get_json(silent=True) or {}
+        result = user_admin_services.bulk_update_users(
+            data.get('user_ids'), values, operator_id=get_jwt_identity()
+        )
+        return success_response(result, message, code)
+    
+    except ValueError as e:
+        db.session.rollback()
+        return error_response(str(e), 'INVALID_DATA')
+    except Exception as e:
+        db.session.rollback()
+        return error_response(f'批量更新用户失败：{str(e)}', 'BULK_UPDATE_USERS_ERROR', 500)
+
+
+@auth_bp.route('/users/bulk/activate', methods=['POST'])
+@role_required('admin')
+def bulk_activate_users():
+    """批量启用用户（管理员），请求体：{"user_ids": [...]}"""
+    return _bulk_update({'is_active': True}, '用户已批量启用', 'USERS_ACTIVATED')
+
+
+@auth_bp.route('/users/bulk/deactivate', methods=['POST'])
+@role_required('admin')
+def bulk_deactivate_users():
+    """批量禁用用户（管理员），已签发的令牌随即失效"""
+    return _bulk_update({'is_active': False}, '用户已批量禁用', 'USERS_DEACTIVATED')
+
+
+@auth_bp.route('/users/bulk/role', methods=['POST'])
+@role_required('admin')
+def bulk_change_user_role():
+    """批量修改用户角色（管理员），请求体：{"user_ids": [...], "role": "nurse"}"""
+    role = (request.get_json(silent=True) or {}).get('role')
+    if role not in user_admin_services.USER_ROLES:
+        return error_response(
+            f"角色必须是 {'/'.join(user_admin_services.USER_ROLES)} 之一", 'INVALID_ROLE'
+        )
+    return _bulk_update({'role': role}, '用户角色已批量修改', 'USERS_ROLE_CHANGED')
+
+
 @auth_bp.route('/users/<int:user_id>', methods=['PUT'])
 @role_required('admin')
 def update_user(user_id):
@@ -478,6 +660,25 @@ def update_user(user_id):
         return error_response(f'更新用户信息失败：{str(e)}', 'UPDATE_USER_ERROR', 500)
 
 
+@auth_bp.route('/users/<int:user_id>/revoke-tokens', methods=['POST'])
+@role_required('admin')
+def revoke_user_tokens(user_id):
+    """强制下线：使该用户已签发的全部令牌失效（管理员）"""
+    try:
+        user = User.query.get(user_id)
+        if not user:
+            return error_response('用户不存在', 'USER_NOT_FOUND', 404)
+        
+        bump_token_versions(db.session, [user.id])
+        db.session.commit()
+        
+        return success_response(None, '用户已被强制下线', 'TOKENS_REVOKED')
+    
+    except Exception as e:
+        db.session.rollback()
+        return error_response(f'强制下线失败：{str(e)}', 'REVOKE_TOKENS_ERROR', 500)
+
+
 @auth_bp.route('/users/<int:user_id>', methods=['DELETE'])
 @role_required('admin')
 def delete_user(user_id):
@@ -508,8 +709,8 @@ def delete_user(user_id):
 def check_patient_info():
     """检查当前用户的病人信息是否完整"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        principal = get_current_principal()
+        user = principal.user if principal else None
 
         if not user:
             return error_response('用户不存在', 'USER_NOT_FOUND', 404)
@@ -523,18 +724,16 @@ def check_patient_info():
             }, '非普通用户，无需病人信息')
 
         # 查找关联的病人记录
-        from backend.models import PatientUserLink, Patient
-        link = PatientUserLink.query.filter_by(user_id=user.id).first()
+        from backend.models import Patient
+        patient = Patient.query.get(principal.patient_id) if principal.patient_id else None
 
-        if not link:
+        if not patient:
             return success_response({
                 'has_patient_info': False,
                 'is_complete': False,
                 'patient': None
             }, '未找到病人信息')
 
-        patient = link.patient
-
         # 检查信息是否完整
         is_complete = all([
             patient.name and patient.name != user.username,
@@ -559,8 +758,8 @@ def check_patient_info():
 def complete_patient_info():
     """完善病人信息"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        principal = get_current_principal()
+        user = principal.user if principal else None
 
         if not user:
             return error_response('用户不存在', 'USER_NOT_FOUND', 404)
@@ -624,8 +823,8 @@ def complete_patient_info():
 def check_doctor_info():
     """检查当前用户的医生信息是否完整"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        principal = get_current_principal()
+        user = principal.user if principal else None
 
         if not user:
             return error_response('用户不存在', 'USER_NOT_FOUND', 404)
@@ -639,18 +838,16 @@ def check_doctor_info():
             }, '非医生用户，无需医生信息')
 
         # 查找关联的医生记录
-        from backend.models import DoctorUserLink
-        link = DoctorUserLink.query.filter_by(user_id=user.id).first()
+        from backend.models import Doctor
+        doctor = Doctor.query.get(principal.doctor_id) if principal.doctor_id else None
 
-        if not link or not link.doctor:
+        if not doctor:
             return success_response({
                 'has_doctor_info': False,
                 'is_complete': False,
                 'doctor': None
             }, '未找到医生信息')
 
-        doctor = link.doctor
-
         # 检查信息是否完整（必填字段：doctor_no, name, gender, department, title, phone）
         # 这些是医生执业必须的基本信息
         is_complete = all([
@@ -677,8 +874,8 @@ def check_doctor_info():
 def complete_doctor_info():
     """完善医生信息"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        principal = get_current_principal()
+        user = principal.user if principal else None
 
         if not user:
             return error_response('用户不存在', 'USER_NOT_FOUND', 404)
@@ -773,11 +970,10 @@ def complete_doctor_info():
 
         db.session.commit()
 
-        return success_response(
-            doctor.to_dict(),
-            '医生信息完善成功',
-            'DOCTOR_INFO_COMPLETED'
-        )
+        # 新建的医生关联需写入令牌声明：重新签发令牌，客户端替换后无需重新登录
+        result = doctor.to_dict()
+        result.update(_issue_tokens(user, doctor_id=doctor.id, patient_id=principal.patient_id))
+        return success_response(result, '医生信息完善成功', 'DOCTOR_INFO_COMPLETED')
 
     except Exception as e:
         db.session.rollback()
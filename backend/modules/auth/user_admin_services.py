@@ -0,0 +1,184 @@
+"""
+用户管理服务
+User Administration Services
+
+管理员用户列表与批量操作：
+- 列表只查询所需列（不含密码哈希、不加载关联），按 (created_at, id) 倒序排序，
+  支持键集分页（游标），翻页代价与页码无关；索引见 idx_users_created_at_id、
+  idx_users_role_created_at_id（created_at 非空，翻页条件是可走索引的范围条件，见 migrations/004）
+- 批量启用/禁用/修改角色用一条 UPDATE 完成，并在同一事务内递增受影响用户的令牌版本，
+  使其已签发的令牌失效
+"""
+import base64
+import binascii
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, or_, update
+
+from backend.extensions import db
+from backend.models import User
+from backend.utils.token_versions import bump_token_versions
+
+
+USER_ROLES = ('admin', 'doctor', 'nurse', 'user')
+MAX_BULK_USERS = 1000
+
+# 列表投影：不含密码哈希与关联关系
+USER_SUMMARY_COLUMNS = (
+    User.id,
+    User.username,
+    User.email,
+    User.phone,
+    User.real_name,
+    User.role,
+    User.department,
+    User.is_active,
+    User.last_login,
+    User.created_at,
+)
+
+
+def user_summary(row) -> Dict:
+    """将投影行转换为字典"""
+    return {
+        'id': row.id,
+        'username': row.username,
+        'email': row.email,
+        'phone': row.phone,
+        'real_name': row.real_name,
+        'role': row.role,
+        'department': row.department,
+        'is_active': row.is_active,
+        'last_login': row.last_login,
+        'created_at': row.created_at
+    }
+
+
+def encode_cursor(created_at: datetime, user_id: int) -> str:
+    """生成翻页游标（最后一条记录的 created_at 与 id）"""
+    raw = f"{created_at.isoformat()}|{user_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    解析翻页游标
+
+    Raises:
+        ValueError: 游标格式无效
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        created_at, user_id = raw.split('|', 1)
+        return datetime.fromisoformat(created_at), int(user_id)
+    except (binascii.Error, UnicodeError, ValueError) as e:
+        raise ValueError('无效的分页游标') from e
+
+
+def build_user_query(search: str = '', role: str = '', is_active: Optional[bool] = None):
+    """用户列表投影查询（含过滤条件，不含排序）"""
+    query = db.session.query(*USER_SUMMARY_COLUMNS)
+    if search:
+        query = query.filter(
+            (User.username.like(f'%{search}%')) |
+            (User.real_name.like(f'%{search}%')) |
+            (User.email.like(f'%{search}%'))
+        )
+    if role:
+        query = query.filter(User.role == role)
+    if is_active is not None:
+        query = query.filter(User.is_active == is_active)
+    return query
+
+
+def list_users_keyset(cursor: Optional[str], limit: int, search: str = '', role: str = '',
+                      is_active: Optional[bool] = None) -> Dict:
+    """
+    键集分页查询用户列表
+
+    Args:
+        cursor: 上一页返回的 next_cursor，为空时从第一页开始
+        limit: 每页条数
+        search: 用户名/姓名/邮箱模糊搜索
+        role: 角色过滤
+        is_active: 启用状态过滤
+
+    Returns:
+        Dict: list、next_cursor、has_more
+    """
+    query = build_user_query(search, role, is_active)
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            User.created_at < created_at,
+            and_(User.created_at == created_at, User.id < last_id)
+        ))
+    rows = query.order_by(User.created_at.desc(), User.id.desc()).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+    return {
+        'list': [user_summary(row) for row in rows],
+        'next_cursor': next_cursor,
+        'has_more': has_more
+    }
+
+
+def _normalize_user_ids(user_ids) -> List[int]:
+    if not isinstance(user_ids, list) or not user_ids:
+        raise ValueError('user_ids 必须是非空数组')
+    try:
+        ids = sorted({int(i) for i in user_ids})
+    except (TypeError, ValueError) as e:
+        raise ValueError('user_ids 中包含无效的用户ID') from e
+    if len(ids) > MAX_BULK_USERS:
+        raise ValueError(f'单次最多操作 {MAX_BULK_USERS} 个用户')
+    return ids
+
+
+def bulk_update_users(user_ids: Iterable, values: Dict, operator_id: Optional[int] = None) -> Dict:
+    """
+    批量更新用户字段（一条 UPDATE），只更新值确实变化的用户
+
+    Args:
+        user_ids: 用户ID列表
+        values: 要更新的字段，如 {'is_active': False} 或 {'role': 'nurse'}
+        operator_id: 当前管理员ID，不允许修改自己的角色与启用状态
+
+    Returns:
+        Dict: requested、updated、not_found、updated_ids
+
+    Raises:
+        ValueError: 参数无效
+    """
+    ids = _normalize_user_ids(user_ids)
+    if operator_id is not None and int(operator_id) in ids:
+        raise ValueError('不能批量修改自己的账号')
+
+    existing = db.session.query(User.id).filter(User.id.in_(ids))
+    changed = existing.filter(or_(*[
+        or_(getattr(User, field) != value, getattr(User, field).is_(None))
+        for field, value in values.items()
+    ]))
+    existing_ids = {row[0] for row in existing.all()}
+    changed_ids = sorted(row[0] for row in changed.all())
+
+    if changed_ids:
+        db.session.execute(
+            update(User)
+            .where(User.id.in_(changed_ids))
+            .values(updated_at=datetime.utcnow(), **values)
+            .execution_options(synchronize_session='fetch')
+        )
+        # 批量 UPDATE 不经过 ORM 的 before_flush，需显式递增令牌版本
+        bump_token_versions(db.session, changed_ids)
+    db.session.commit()
+
+    return {
+        'requested': len(ids),
+        'updated': len(changed_ids),
+        'not_found': sorted(set(ids) - existing_ids),
+        'updated_ids': changed_ids
+    }
@@ -64,16 +64,16 @@ class DoctorQualification(db.Model):
             'qualification_type': self.qualification_type,
             'certificate_no': self.certificate_no,
             'certificate_name': self.certificate_name,
-            'issue_date': self.issue_date.isoformat() if self.issue_date else None,
-            'expiry_date': self.expiry_date.isoformat() if self.expiry_date else None,
+            'issue_date': self.issue_date,
+            'expiry_date': self.expiry_date,
             'issuing_authority': self.issuing_authority,
             'scope_of_practice': self.scope_of_practice,
             'attachment_url': self.attachment_url,
             'status': self.status,
             'is_expiring_soon': is_expiring_soon,
             'notes': self.notes,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
 
 
@@ -119,18 +119,18 @@ class DoctorLeave(db.Model):
             'doctor_id': self.doctor_id,
             'doctor_name': self.doctor.name if self.doctor else None,
             'leave_type': self.leave_type,
-            'start_date': self.start_date.isoformat() if self.start_date else None,
-            'end_date': self.end_date.isoformat() if self.end_date else None,
+            'start_date': self.start_date,
+            'end_date': self.end_date,
             'days': self.days,
             'reason': self.reason,
             'status': self.status,
             'approver_id': self.approver_id,
-            'approval_date': self.approval_date.isoformat() if self.approval_date else None,
+            'approval_date': self.approval_date,
             'approval_notes': self.approval_notes,
             'substitute_doctor_id': self.substitute_doctor_id,
             'substitute_doctor_name': self.substitute_doctor.name if self.substitute_doctor else None,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
 
 
@@ -165,8 +165,8 @@ class DoctorScheduleTemplate(db.Model):
             'description': self.description,
             'is_active': self.is_active,
             'created_by': self.created_by,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
             'details': [detail.to_dict() for detail in self.template_details.all()]
         }
 
@@ -247,7 +247,7 @@ class OperationLog(db.Model):
             'user_agent': self.user_agent,
             'status': self.status,
             'error_message': self.error_message,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at
         }
 
 
@@ -291,6 +291,6 @@ class Notification(db.Model):
             'related_resource': self.related_resource,
             'related_id': self.related_id,
             'is_read': self.is_read,
-            'read_at': self.read_at.isoformat() if self.read_at else None,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'read_at': self.read_at,
+            'created_at': self.created_at
         }
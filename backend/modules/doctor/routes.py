@@ -2,7 +2,7 @@
 医生管理子系统 - 路由
 Doctor Management - Routes
 """
-from flask import render_template, request, redirect, url_for, flash, jsonify
+from flask import render_template, request, redirect, url_for, flash
 from . import doctor_bp
 from backend.models import Doctor, DoctorSchedule, DoctorPerformance, Appointment, MedicalRecord, Patient, Medicine, MedicationRequest
 from backend.extensions import db
@@ -10,33 +10,15 @@ from datetime import datetime, date
 from sqlalchemy import func, extract
 from backend.modules.doctor.models_extended import DoctorLeave
 from backend.modules.doctor.utils import calculate_leave_days
-
-
-# ============= 统一响应格式 =============
-
-def success_response(data=None, message='操作成功', code='SUCCESS'):
-    """成功响应"""
-    return jsonify({
-        'success': True,
-        'message': message,
-        'code': code,
-        'data': data
-    })
-
-
-def error_response(message='操作失败', code='ERROR', status_code=400):
-    """错误响应"""
-    return jsonify({
-        'success': False,
-        'message': message,
-        'code': code,
-        'data': None
-    }), status_code
+from backend.utils.reference_cache import get_doctor_departments, get_doctor_titles
+from backend.utils.response_cache import DOCTORS, response_cache
+from backend.utils.responses import error_response, success_response
 
 
 # ============= RESTful API - 医生信息管理 =============
 
 @doctor_bp.route('/doctors', methods=['GET'])
+@response_cache.cached(DOCTORS)
 def get_doctors():
     """获取医生列表（API）"""
     try:
@@ -76,8 +58,9 @@ def get_doctors():
             page=page, per_page=per_page, error_out=False
         )
         
-        # 序列化数据 - 包含统计信息
-        doctors_data = [doctor.to_dict(include_stats=True) for doctor in pagination.items]
+        # 序列化数据 - 包含统计信息（整页一次批量统计）
+        stats = Doctor.load_stats(doctor.id for doctor in pagination.items)
+        doctors_data = [doctor.to_dict(stats=stats[doctor.id]) for doctor in pagination.items]
         
         return success_response({
             'items': doctors_data,
@@ -332,16 +315,10 @@ def get_doctors_statistics():
         ]
         
         # 获取所有科室列表
-        departments = db.session.query(Doctor.department).filter(
-            Doctor.department.isnot(None)
-        ).distinct().all()
-        department_list = [d[0] for d in departments]
+        department_list = list(get_doctor_departments())
         
         # 获取所有职称列表
-        titles = db.session.query(Doctor.title).filter(
-            Doctor.title.isnot(None)
-        ).distinct().all()
-        title_list = [t[0] for t in titles]
+        title_list = list(get_doctor_titles())
         
         return success_response({
             'total_doctors': total_doctors,
@@ -387,8 +364,7 @@ def doctor_list():
     doctors = pagination.items
     
     # 获取所有科室用于筛选
-    departments = db.session.query(Doctor.department).distinct().all()
-    departments = [d[0] for d in departments if d[0]]
+    departments = get_doctor_departments()
     
     return render_template('doctor/doctor_list.html', 
                          doctors=doctors, 
@@ -1721,10 +1697,7 @@ def get_departments():
     """获取科室列表（API）"""
     try:
         # 从医生表中获取所有科室（去重）
-        departments_query = db.session.query(Doctor.department).filter(
-            Doctor.department.isnot(None),
-            Doctor.department != ''
-        ).distinct().all()
+        departments_query = get_doctor_departments()
         
         default_departments = [
             {'id': '内科', 'name': '内科'},
@@ -1742,8 +1715,7 @@ def get_departments():
         ]
 
         existing_ids = {item['id'] for item in default_departments}
-        for dept in departments_query:
-            name = dept[0]
+        for name in departments_query:
             if name and name not in existing_ids:
                 default_departments.append({'id': name, 'name': name})
                 existing_ids.add(name)
@@ -1769,6 +1741,11 @@ def get_titles():
             '医师'
         ]
 
+        # 追加医生表中已使用的非标准职称
+        for title in get_doctor_titles():
+            if title not in titles:
+                titles.append(title)
+
         return success_response(titles)
 
     except Exception as e:
@@ -9,11 +9,18 @@ Patient Portal Services
  - 病历查看功能
  - 权限验证等
 """
-from backend.models import User, Patient, PatientUserLink, Appointment, MedicalRecord
+from sqlalchemy.orm import joinedload
+
+from backend.models import User, Patient, PatientUserLink, Appointment, MedicalRecord, Doctor, patient_relations
 from backend.extensions import db
+from backend.utils.principal import get_principal
 from . import patient_services, appointment_services
 
 
+class InvalidCredentials(ValueError):
+    """家人用户名或密码错误（用于限流统计失败次数）"""
+
+
 # ============= 用户档案管理 =============
 
 def get_user_patient_profile(user_id):
@@ -26,9 +33,9 @@ def get_user_patient_profile(user_id):
     Returns:
         Patient对象，如果不存在则返回None
     """
-    link = PatientUserLink.query.filter_by(user_id=user_id).first()
-    if link:
-        return link.patient
+    principal = get_principal(user_id)
+    if principal and principal.patient_id:
+        return Patient.query.get(principal.patient_id)
     return None
 
 
@@ -47,8 +54,8 @@ def create_user_patient_profile(user_id, patient_data):
         ValueError: 如果用户已有关联的档案或数据无效
     """
     # 检查用户是否已有关联档案
-    existing_link = PatientUserLink.query.filter_by(user_id=user_id).first()
-    if existing_link:
+    principal = get_principal(user_id)
+    if principal and principal.patient_id:
         raise ValueError('用户已有关联的病人档案')
 
     # 创建病人档案
@@ -59,11 +66,13 @@ def create_user_patient_profile(user_id, patient_data):
     db.session.add(link)
 
     # 同时添加到可管理列表
-    user = User.query.get(user_id)
-    if user:
-        user.managed_patients.append(patient)
+    principal = get_principal(user_id)
+    if principal:
+        principal.user.managed_patients.append(patient)
 
     db.session.commit()
+    if principal:
+        principal.patient_id = patient.id
     return patient
 
 
@@ -79,11 +88,11 @@ def get_managed_patients(user_id):
     Returns:
         Patient对象列表
     """
-    user = User.query.get(user_id)
-    if not user:
+    principal = get_principal(user_id)
+    if not principal:
         raise ValueError('用户不存在')
 
-    return user.managed_patients.all()
+    return principal.user.managed_patients.all()
 
 
 def add_family_member(user_id, family_username, family_password):
@@ -99,20 +108,21 @@ def add_family_member(user_id, family_username, family_password):
         家人的Patient对象
 
     Raises:
+        InvalidCredentials: 家人用户名或密码错误
         ValueError: 如果验证失败或家人无病人档案
     """
     # 验证当前用户
-    user = User.query.get(user_id)
-    if not user:
+    principal = get_principal(user_id)
+    if not principal:
         raise ValueError('用户不存在')
 
     # 验证家人的用户名和密码
     family_user = User.query.filter_by(username=family_username).first()
     if not family_user:
-        raise ValueError('家人用户不存在')
+        raise InvalidCredentials('家人用户不存在')
 
     if not family_user.check_password(family_password):
-        raise ValueError('家人密码错误')
+        raise InvalidCredentials('家人密码错误')
 
     # 获取家人的病人档案
     family_link = PatientUserLink.query.filter_by(user_id=family_user.id).first()
@@ -122,11 +132,11 @@ def add_family_member(user_id, family_username, family_password):
     family_patient = family_link.patient
 
     # 检查是否已经在管理列表中
-    if family_patient in user.managed_patients:
+    if principal.can_manage(family_patient.id):
         raise ValueError('该家人已在您的管理列表中')
 
     # 添加到管理列表
-    user.managed_patients.append(family_patient)
+    principal.user.managed_patients.append(family_patient)
     db.session.commit()
 
     return family_patient
@@ -143,23 +153,22 @@ def remove_family_member(user_id, patient_id):
     Raises:
         ValueError: 如果是自己的档案或不在管理列表中
     """
-    user = User.query.get(user_id)
-    if not user:
+    principal = get_principal(user_id)
+    if not principal:
         raise ValueError('用户不存在')
 
     # 不能移除自己的档案
-    own_link = PatientUserLink.query.filter_by(user_id=user_id).first()
-    if own_link and own_link.patient_id == patient_id:
+    if principal.patient_id == patient_id:
         raise ValueError('不能移除自己的病人档案')
 
     patient = Patient.query.get(patient_id)
     if not patient:
         raise ValueError('病人不存在')
 
-    if patient not in user.managed_patients:
+    if not principal.can_manage(patient.id):
         raise ValueError('该病人不在您的管理列表中')
 
-    user.managed_patients.remove(patient)
+    principal.user.managed_patients.remove(patient)
     db.session.commit()
 
 
@@ -200,15 +209,15 @@ def update_patient_info_by_user(user_id, patient_id, data):
         ValueError: 如果无权限或病人不存在
     """
     # 验证权限
-    user = User.query.get(user_id)
-    if not user:
+    principal = get_principal(user_id)
+    if not principal:
         raise ValueError('用户不存在')
 
     patient = Patient.query.get(patient_id)
     if not patient:
         raise ValueError('病人不存在')
 
-    if patient not in user.managed_patients:
+    if not principal.can_manage(patient.id):
         raise ValueError('您没有权限修改此病人信息')
 
     # 更新信息
@@ -236,9 +245,31 @@ def get_patient_appointments(patient_id, status=None):
     return query.order_by(Appointment.appointment_date.desc()).all()
 
 
+def _managed_appointments_query(user_id, status=None):
+    """
+    用户所有可管理病人的预约查询：从 patient_relations 直接联表到预约，
+    病人、医生姓名随同一条查询一起加载
+    """
+    query = Appointment.query.join(
+        patient_relations, patient_relations.c.patient_id == Appointment.patient_id
+    ).filter(
+        patient_relations.c.user_id == int(user_id)
+    ).options(
+        joinedload(Appointment.patient).load_only(Patient.id, Patient.name),
+        joinedload(Appointment.doctor).load_only(Doctor.id, Doctor.name)
+    )
+
+    if status:
+        query = query.filter(Appointment.status == status)
+
+    return query.order_by(
+        Appointment.appointment_date.desc(), Appointment.appointment_time.desc(), Appointment.id.desc()
+    )
+
+
 def get_all_managed_appointments(user_id, status=None):
     """
-    获取用户所有可管理病人的预约列表
+    获取用户所有可管理病人的预约列表（一条查询）
 
     Args:
         user_id: 用户ID
@@ -247,18 +278,25 @@ def get_all_managed_appointments(user_id, status=None):
     Returns:
         Appointment对象列表
     """
-    # 获取所有可管理的病人ID
-    patient_ids = get_user_managed_patient_ids(user_id)
-    
-    if not patient_ids:
-        return []
-    
-    query = Appointment.query.filter(Appointment.patient_id.in_(patient_ids))
-    
-    if status:
-        query = query.filter_by(status=status)
-    
-    return query.order_by(Appointment.appointment_date.desc(), Appointment.appointment_time.desc()).all()
+    return _managed_appointments_query(user_id, status).all()
+
+
+def paginate_managed_appointments(user_id, page=1, per_page=20, status=None):
+    """
+    分页获取用户所有可管理病人的预约（计数与当前页各一条查询）
+
+    Args:
+        user_id: 用户ID
+        page: 页码
+        per_page: 每页条数
+        status: 预约状态过滤（可选）
+
+    Returns:
+        Pagination对象
+    """
+    return _managed_appointments_query(user_id, status).paginate(
+        page=page, per_page=per_page, error_out=False
+    )
 
 
 def create_appointment_for_patient(patient_id, data):
@@ -306,12 +344,11 @@ def cancel_patient_appointment(user_id, appointment_id):
         raise ValueError('预约不存在')
 
     # 验证权限：检查该预约的病人是否在用户的管理列表中
-    user = User.query.get(user_id)
-    if not user:
+    principal = get_principal(user_id)
+    if not principal:
         raise ValueError('用户不存在')
 
-    patient = appointment.patient
-    if patient not in user.managed_patients:
+    if not principal.can_manage(appointment.patient_id):
         raise ValueError('您没有权限取消此预约')
 
     # 检查预约状态
@@ -360,12 +397,11 @@ def get_medical_record_detail(user_id, record_id):
         raise ValueError('病历不存在')
 
     # 验证权限
-    user = User.query.get(user_id)
-    if not user:
+    principal = get_principal(user_id)
+    if not principal:
         raise ValueError('用户不存在')
 
-    patient = record.patient
-    if patient not in user.managed_patients:
+    if not principal.can_manage(record.patient_id):
         raise ValueError('您没有权限查看此病历')
 
     return record
@@ -384,15 +420,11 @@ def verify_patient_access(user_id, patient_id):
     Returns:
         bool: True表示有权限，False表示无权限
     """
-    user = User.query.get(user_id)
-    if not user:
-        return False
-
-    patient = Patient.query.get(patient_id)
-    if not patient:
+    principal = get_principal(user_id)
+    if not principal:
         return False
 
-    return patient in user.managed_patients
+    return principal.can_manage(patient_id)
 
 
 def get_user_managed_patient_ids(user_id):
@@ -405,8 +437,8 @@ def get_user_managed_patient_ids(user_id):
     Returns:
         病人ID列表
     """
-    user = User.query.get(user_id)
-    if not user:
+    principal = get_principal(user_id)
+    if not principal:
         return []
 
-    return [p.id for p in user.managed_patients.all()]
+    return list(principal.managed_patient_ids)
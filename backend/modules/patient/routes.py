@@ -2,36 +2,18 @@
 病人管理子系统 - 路由
 Patient Management - Routes
 """
-from flask import render_template, request, redirect, url_for, flash, jsonify, session
+from flask import render_template, request, redirect, url_for, flash, session
 from . import patient_bp
 from backend.extensions import db
+from backend.utils.password_hasher import PasswordHasherBusy
+from backend.utils.principal import get_current_principal
+from backend.utils.rate_limiter import RateLimitExceeded, family_member_throttle
+from backend.utils.responses import error_response, success_response, too_many_attempts_response
 from . import patient_services, record_services, appointment_services
 from . import portal_services  # 病人端门户服务
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
 
-# ============= 统一响应格式 =============
-
-def success_response(data=None, message='操作成功', code='SUCCESS'):
-    """成功响应"""
-    return jsonify({
-        'success': True,
-        'message': message,
-        'code': code,
-        'data': data
-    })
-
-
-def error_response(message='操作失败', code='ERROR', status_code=400):
-    """错误响应"""
-    return jsonify({
-        'success': False,
-        'message': message,
-        'code': code,
-        'data': None
-    }), status_code
-
-
 # ============= 传统视图路由 (HTML) =============
 
 @patient_bp.route('/')
@@ -460,7 +442,14 @@ def portal_add_family_member():
         if not username or not password:
             return error_response('请提供家人的用户名和密码', 'INVALID_DATA')
 
-        family_patient = portal_services.add_family_member(user_id, username, password)
+        # 失败次数超限时直接拒绝，不再计算密码哈希
+        family_member_throttle.check(request.remote_addr, username)
+        try:
+            family_patient = portal_services.add_family_member(user_id, username, password)
+        except portal_services.InvalidCredentials:
+            family_member_throttle.record_failure(request.remote_addr, username)
+            raise
+        family_member_throttle.record_success(username)
 
         return success_response(
             family_patient.to_dict(),
@@ -469,6 +458,10 @@ def portal_add_family_member():
         )
     except ValueError as e:
         return error_response(str(e), 'ADD_FAMILY_MEMBER_FAILED', 400)
+    except RateLimitExceeded as e:
+        return too_many_attempts_response(e)
+    except PasswordHasherBusy as e:
+        return error_response(str(e), 'SERVER_BUSY', 503)
     except Exception as e:
         db.session.rollback()
         return error_response(f'添加家庭成员失败: {str(e)}', 'ADD_FAMILY_MEMBER_ERROR', 500)
@@ -479,31 +472,21 @@ def portal_add_family_member():
 def portal_get_patient_appointments(patient_id):
     """获取指定病人的预约列表"""
     try:
-        from backend.models import User, DoctorUserLink, Appointment
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        principal = get_current_principal()
         
-        if not user:
+        if not principal:
             return error_response('用户不存在', 'USER_NOT_FOUND', 404)
 
         # 权限验证：普通用户检查 managed_patients，医生检查是否有该病人的预约记录
         has_permission = False
         
-        if user.role == 'user':
+        if principal.role == 'user':
             # 普通用户：检查是否在可管理列表中
-            managed_patients = portal_services.get_managed_patients(user_id)
-            has_permission = patient_id in [p.id for p in managed_patients]
-        elif user.role == 'doctor':
+            has_permission = principal.can_manage(patient_id)
+        elif principal.role == 'doctor':
             # 医生：检查是否有该病人的预约记录
-            doctor_link = DoctorUserLink.query.filter_by(user_id=user_id).first()
-            if doctor_link and doctor_link.doctor:
-                doctor_id = doctor_link.doctor.id
-                has_appointment = Appointment.query.filter_by(
-                    patient_id=patient_id,
-                    doctor_id=doctor_id
-                ).first() is not None
-                has_permission = has_appointment
-        elif user.role == 'admin':
+            has_permission = principal.has_appointment_with(patient_id)
+        elif principal.role == 'admin':
             # 管理员：有所有权限
             has_permission = True
         
@@ -524,38 +507,22 @@ def portal_get_patient_appointments(patient_id):
 def portal_get_patient_medical_records(patient_id):
     """获取指定病人的病历记录"""
     try:
-        from backend.models import User, DoctorUserLink
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        principal = get_current_principal()
         
-        if not user:
+        if not principal:
             return error_response('用户不存在', 'USER_NOT_FOUND', 404)
 
         # 权限验证：普通用户检查 managed_patients，医生检查是否有该病人的病历记录
         has_permission = False
         
-        if user.role == 'user':
+        if principal.role == 'user':
             # 普通用户：检查是否在可管理列表中
-            managed_patients = portal_services.get_managed_patients(user_id)
-            has_permission = patient_id in [p.id for p in managed_patients]
-        elif user.role == 'doctor':
+            has_permission = principal.can_manage(patient_id)
+        elif principal.role == 'doctor':
             # 医生：检查是否有该病人的病历记录或预约记录
-            from backend.models import MedicalRecord, Appointment
-            doctor_link = DoctorUserLink.query.filter_by(user_id=user_id).first()
-            if doctor_link and doctor_link.doctor:
-                doctor_id = doctor_link.doctor.id
-                # 检查是否有病历记录
-                has_medical_record = MedicalRecord.query.filter_by(
-                    patient_id=patient_id,
-                    doctor_id=doctor_id
-                ).first() is not None
-                # 检查是否有预约记录
-                has_appointment = Appointment.query.filter_by(
-                    patient_id=patient_id,
-                    doctor_id=doctor_id
-                ).first() is not None
-                has_permission = has_medical_record or has_appointment
-        elif user.role == 'admin':
+            has_permission = (principal.has_record_with(patient_id)
+                              or principal.has_appointment_with(patient_id))
+        elif principal.role == 'admin':
             # 管理员：有所有权限
             has_permission = True
         
@@ -573,10 +540,25 @@ def portal_get_patient_medical_records(patient_id):
 @patient_bp.route('/portal/appointments', methods=['GET'])
 @jwt_required()
 def portal_get_all_appointments():
-    """获取所有可管理病人的预约列表"""
+    """
+    获取所有可管理病人的预约列表
+    传入 page 参数时分页返回 {items, total, page, per_page, pages}，否则返回全部预约
+    """
     try:
         user_id = get_jwt_identity()
         status = request.args.get('status', None)
+        page = request.args.get('page', type=int)
+        
+        if page is not None:
+            per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+            pagination = portal_services.paginate_managed_appointments(user_id, page, per_page, status)
+            return success_response({
+                'items': [a.to_dict() for a in pagination.items],
+                'total': pagination.total,
+                'page': page,
+                'per_page': per_page,
+                'pages': pagination.pages
+            })
         
         appointments = portal_services.get_all_managed_appointments(user_id, status)
         appointments_data = [a.to_dict() for a in appointments]
@@ -591,7 +573,6 @@ def portal_get_all_appointments():
 def portal_create_appointment():
     """创建预约（病人端自助挂号）"""
     try:
-        user_id = get_jwt_identity()
         data = request.get_json()
 
         if not data:
@@ -602,8 +583,8 @@ def portal_create_appointment():
             return error_response('请指定病人ID', 'INVALID_DATA')
 
         # 验证权限
-        managed_patients = portal_services.get_managed_patients(user_id)
-        if patient_id not in [p.id for p in managed_patients]:
+        principal = get_current_principal()
+        if not principal or not principal.can_manage(patient_id):
             return error_response('您没有权限为此病人预约', 'FORBIDDEN', 403)
 
         appointment = portal_services.create_appointment_for_patient(patient_id, data)
@@ -645,11 +626,9 @@ def portal_cancel_appointment(appointment_id):
 def portal_get_patient_detail(patient_id):
     """获取病人详细信息"""
     try:
-        user_id = get_jwt_identity()
-
         # 验证权限
-        managed_patients = portal_services.get_managed_patients(user_id)
-        if patient_id not in [p.id for p in managed_patients]:
+        principal = get_current_principal()
+        if not principal or not principal.can_manage(patient_id):
             return error_response('您没有权限查看此病人信息', 'FORBIDDEN', 403)
 
         patient = portal_services.get_patient_info(patient_id)
@@ -0,0 +1,371 @@
+"""
+药品需求预测服务
+Medicine Demand Forecasting Services
+
+基于 MedicationRequest.dispensed_at 构建每种药品的日出库需求序列，
+使用 NumPy 对所有药品同时进行向量化拟合（移动平均 / 指数平滑），
+再结合当前库存与在途采购单生成采购建议。
+"""
+import math
+import secrets
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from backend.extensions import db
+from backend.models import Medicine, MedicineInventory, MedicinePurchase, MedicationRequest
+
+
+FORECAST_METHODS = ('moving_average', 'exponential_smoothing')
+
+DEFAULT_HISTORY_DAYS = 365 * 3
+DEFAULT_WINDOW = 28
+DEFAULT_ALPHA = 0.3
+DEFAULT_LEAD_TIME_DAYS = 7
+DEFAULT_REVIEW_DAYS = 14
+DEFAULT_SERVICE_Z = 1.65  # 约95%服务水平
+# 采购单号冲突（唯一约束）时的最大尝试次数
+PURCHASE_NO_ATTEMPTS = 3
+
+
+# ============= 需求序列构建 =============
+
+def densify_demand(medicine_index: np.ndarray, day_index: np.ndarray, quantities: np.ndarray,
+                   n_medicines: int, n_days: int) -> np.ndarray:
+    """
+    将稀疏的 (药品, 日期, 数量) 三元组展开为 药品 x 日期 的稠密需求矩阵
+
+    Args:
+        medicine_index: 每行对应的药品行号
+        day_index: 每行对应的日期列号
+        quantities: 每行的出库数量
+        n_medicines: 药品数量（矩阵行数）
+        n_days: 天数（矩阵列数）
+
+    Returns:
+        np.ndarray: 形状为 (n_medicines, n_days) 的 float64 需求矩阵
+    """
+    flat = np.zeros(n_medicines * n_days, dtype=np.float64)
+    if len(quantities):
+        positions = medicine_index.astype(np.int64) * n_days + day_index.astype(np.int64)
+        flat += np.bincount(positions, weights=quantities, minlength=n_medicines * n_days)
+    return flat.reshape(n_medicines, n_days)
+
+
+def build_demand_matrix(medicine_ids: Sequence[int], end_date: Optional[date] = None,
+                        history_days: int = DEFAULT_HISTORY_DAYS) -> Tuple[np.ndarray, date]:
+    """
+    从已发药的用药申请构建日需求矩阵
+
+    数据库端按 (药品, 日期) 聚合，Python 端只做一次向量化展开，
+    不会逐条加载 MedicationRequest 对象。
+
+    Args:
+        medicine_ids: 需要预测的药品ID列表（决定矩阵行顺序）
+        end_date: 序列最后一天（包含），默认今天
+        history_days: 历史天数
+
+    Returns:
+        (需求矩阵, 序列起始日期)
+    """
+    end_date = end_date or date.today()
+    start_date = end_date - timedelta(days=history_days - 1)
+    ids = np.asarray(medicine_ids, dtype=np.int64)
+    if not len(ids):
+        return np.zeros((0, history_days)), start_date
+
+    dispensed_day = func.date(MedicationRequest.dispensed_at)
+    rows = db.session.query(
+        MedicationRequest.medicine_id,
+        dispensed_day,
+        func.sum(MedicationRequest.quantity)
+    ).filter(
+        MedicationRequest.dispensed_at.isnot(None),
+        MedicationRequest.dispensed_at >= datetime.combine(start_date, datetime.min.time()),
+        MedicationRequest.dispensed_at < datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+    ).group_by(
+        MedicationRequest.medicine_id,
+        dispensed_day
+    ).all()
+
+    if not rows:
+        return np.zeros((len(ids), history_days)), start_date
+
+    row_medicine_ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    # MySQL 返回 date，SQLite 返回 'YYYY-MM-DD' 字符串，统一按 ISO 字符串解析
+    row_days = np.array([str(r[1])[:10] for r in rows], dtype='datetime64[D]')
+    row_quantities = np.fromiter((r[2] or 0 for r in rows), dtype=np.float64, count=len(rows))
+
+    order = np.argsort(ids)
+    sorted_ids = ids[order]
+    positions = np.searchsorted(sorted_ids, row_medicine_ids)
+    positions = np.clip(positions, 0, len(sorted_ids) - 1)
+    known = sorted_ids[positions] == row_medicine_ids
+
+    medicine_index = order[positions[known]]
+    day_index = (row_days[known] - np.datetime64(start_date, 'D')).astype(np.int64)
+    return densify_demand(medicine_index, day_index, row_quantities[known], len(ids), history_days), start_date
+
+
+# ============= 向量化预测模型 =============
+
+def moving_average_forecast(demand: np.ndarray, window: int = DEFAULT_WINDOW) -> np.ndarray:
+    """
+    移动平均：以最近 window 天的日均出库量作为未来日需求
+
+    Args:
+        demand: 需求矩阵 (药品 x 日期)
+        window: 窗口天数
+
+    Returns:
+        np.ndarray: 每种药品的日需求预测值
+    """
+    window = max(1, min(window, demand.shape[1]))
+    return demand[:, -window:].mean(axis=1)
+
+
+def exponential_smoothing_forecast(demand: np.ndarray, alpha: float = DEFAULT_ALPHA) -> np.ndarray:
+    """
+    简单指数平滑：level_t = alpha * x_t + (1 - alpha) * level_{t-1}
+
+    以第一天观测值作为初始水平，将递推展开为权重向量，
+    所有药品通过一次矩阵-向量乘法同时求出最终水平。
+
+    Args:
+        demand: 需求矩阵 (药品 x 日期)
+        alpha: 平滑系数 (0, 1]
+
+    Returns:
+        np.ndarray: 每种药品的日需求预测值
+    """
+    n_days = demand.shape[1]
+    if n_days == 0:
+        return np.zeros(demand.shape[0])
+    alpha = min(max(alpha, 1e-6), 1.0)
+    exponents = np.arange(n_days - 1, -1, -1, dtype=np.float64)
+    weights = alpha * np.power(1.0 - alpha, exponents)
+    weights[0] += (1.0 - alpha) ** n_days
+    return demand @ weights
+
+
+def forecast_demand(demand: np.ndarray, method: str = 'moving_average',
+                    window: int = DEFAULT_WINDOW, alpha: float = DEFAULT_ALPHA) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    对需求矩阵进行预测
+
+    Args:
+        demand: 需求矩阵 (药品 x 日期)
+        method: 预测方法 moving_average / exponential_smoothing
+        window: 移动平均窗口，同时用于估计需求波动
+        alpha: 指数平滑系数
+
+    Returns:
+        (日需求预测值, 最近窗口内的日需求标准差)
+
+    Raises:
+        ValueError: 不支持的预测方法
+    """
+    if method == 'moving_average':
+        forecast = moving_average_forecast(demand, window)
+    elif method == 'exponential_smoothing':
+        forecast = exponential_smoothing_forecast(demand, alpha)
+    else:
+        raise ValueError(f'不支持的预测方法：{method}')
+
+    window = max(1, min(window, demand.shape[1]))
+    volatility = demand[:, -window:].std(axis=1) if demand.shape[1] else np.zeros(demand.shape[0])
+    return forecast, volatility
+
+
+def compute_purchase_quantities(forecast: np.ndarray, volatility: np.ndarray,
+                                on_hand: np.ndarray, on_order: np.ndarray,
+                                max_stock: Optional[np.ndarray] = None,
+                                lead_time_days: int = DEFAULT_LEAD_TIME_DAYS,
+                                review_days: int = DEFAULT_REVIEW_DAYS,
+                                service_z: float = DEFAULT_SERVICE_Z) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    计算建议采购量（订货点 + 安全库存）
+
+    目标库存 = 日需求 * (到货周期 + 复核周期) + z * 波动 * sqrt(到货周期)
+    建议采购量 = 目标库存 - 当前库存 - 在途数量，向上取整且不小于0，
+    若设置了最大库存则不超过可容纳量。
+
+    Returns:
+        (建议采购量, 安全库存)
+    """
+    safety_stock = service_z * volatility * math.sqrt(max(lead_time_days, 0))
+    target = forecast * (lead_time_days + review_days) + safety_stock
+    quantities = np.ceil(target - on_hand - on_order)
+    if max_stock is not None:
+        capacity = np.where(np.isnan(max_stock), np.inf, max_stock - on_hand - on_order)
+        quantities = np.minimum(quantities, capacity)
+    return np.clip(quantities, 0, None).astype(np.int64), safety_stock
+
+
+# ============= 采购建议 =============
+
+def propose_purchase_orders(method: str = 'moving_average', window: int = DEFAULT_WINDOW,
+                            alpha: float = DEFAULT_ALPHA, history_days: int = DEFAULT_HISTORY_DAYS,
+                            lead_time_days: int = DEFAULT_LEAD_TIME_DAYS,
+                            review_days: int = DEFAULT_REVIEW_DAYS,
+                            category: Optional[str] = None,
+                            medicine_ids: Optional[Sequence[int]] = None,
+                            end_date: Optional[date] = None) -> List[Dict]:
+    """
+    生成采购建议列表（只返回建议采购量大于0的药品）
+
+    Args:
+        method: 预测方法
+        window: 移动平均窗口
+        alpha: 指数平滑系数
+        history_days: 使用的历史天数
+        lead_time_days: 采购到货周期（天）
+        review_days: 采购复核周期（天）
+        category: 仅预测指定分类的药品（可选）
+        medicine_ids: 仅预测指定药品（可选）
+        end_date: 历史序列截止日期，默认今天
+
+    Returns:
+        List[Dict]: 采购建议，按优先级和建议金额排序
+
+    Raises:
+        ValueError: 参数无效
+    """
+    if method not in FORECAST_METHODS:
+        raise ValueError(f'不支持的预测方法：{method}')
+    if history_days <= 0 or window <= 0:
+        raise ValueError('历史天数和窗口天数必须大于0')
+
+    query = db.session.query(
+        Medicine.id,
+        Medicine.medicine_no,
+        Medicine.name,
+        Medicine.price,
+        MedicineInventory.quantity,
+        MedicineInventory.min_stock,
+        MedicineInventory.max_stock
+    ).outerjoin(
+        MedicineInventory, MedicineInventory.medicine_id == Medicine.id
+    ).filter(Medicine.status == 'active')
+
+    if category:
+        query = query.filter(Medicine.category == category)
+    if medicine_ids:
+        query = query.filter(Medicine.id.in_(list(medicine_ids)))
+
+    medicines = query.order_by(Medicine.id.asc()).all()
+    if not medicines:
+        return []
+
+    ids = [m[0] for m in medicines]
+    demand, _ = build_demand_matrix(ids, end_date=end_date, history_days=history_days)
+    forecast, volatility = forecast_demand(demand, method=method, window=window, alpha=alpha)
+
+    pending_rows = db.session.query(
+        MedicinePurchase.medicine_id,
+        func.sum(MedicinePurchase.quantity)
+    ).filter(
+        MedicinePurchase.status == 'pending',
+        MedicinePurchase.medicine_id.in_(ids)
+    ).group_by(MedicinePurchase.medicine_id).all()
+    pending_map = {medicine_id: quantity or 0 for medicine_id, quantity in pending_rows}
+
+    on_hand = np.array([m[4] or 0 for m in medicines], dtype=np.float64)
+    on_order = np.array([pending_map.get(m[0], 0) for m in medicines], dtype=np.float64)
+    max_stock = np.array([m[6] if m[6] is not None else np.nan for m in medicines], dtype=np.float64)
+
+    quantities, safety_stock = compute_purchase_quantities(
+        forecast, volatility, on_hand, on_order, max_stock,
+        lead_time_days=lead_time_days, review_days=review_days
+    )
+
+    proposals = []
+    for i in np.flatnonzero(quantities > 0):
+        medicine_id, medicine_no, name, price, stock, min_stock, _ = medicines[i]
+        daily = float(forecast[i])
+        stock = stock or 0
+        days_of_supply = stock / daily if daily > 0 else None
+
+        if days_of_supply is not None and days_of_supply < lead_time_days:
+            priority = 'high'
+        elif min_stock and stock <= min_stock:
+            priority = 'medium'
+        else:
+            priority = 'low'
+
+        quantity = int(quantities[i])
+        unit_price = float(price) if price else 0
+        proposals.append({
+            'medicine_id': medicine_id,
+            'medicine_no': medicine_no,
+            'medicine_name': name,
+            'current_stock': stock,
+            'on_order': int(on_order[i]),
+            'daily_forecast': round(daily, 3),
+            'safety_stock': round(float(safety_stock[i]), 1),
+            'days_of_supply': round(days_of_supply, 1) if days_of_supply is not None else None,
+            'suggested_quantity': quantity,
+            'unit_price': unit_price,
+            'estimated_cost': round(quantity * unit_price, 2),
+            'priority': priority
+        })
+
+    priority_rank = {'high': 0, 'medium': 1, 'low': 2}
+    proposals.sort(key=lambda p: (priority_rank[p['priority']], -p['estimated_cost']))
+    return proposals
+
+
+def create_purchase_orders_from_proposals(proposals: List[Dict], supplier: Optional[str] = None,
+                                          purchaser: Optional[str] = None,
+                                          lead_time_days: int = DEFAULT_LEAD_TIME_DAYS) -> List[MedicinePurchase]:
+    """
+    根据采购建议批量创建待处理采购单（单个事务提交）
+
+    单号为 PO + 时间戳 + 随机后缀 + 序号，唯一约束冲突时换一个后缀重试。
+
+    Args:
+        proposals: propose_purchase_orders 返回的建议列表
+        supplier: 供应商
+        purchaser: 采购员
+        lead_time_days: 用于计算预计到货日期
+
+    Returns:
+        List[MedicinePurchase]: 新建的采购单
+    """
+    now = datetime.now()
+    expected_delivery_date = (now + timedelta(days=lead_time_days)).date()
+
+    for attempt in range(PURCHASE_NO_ATTEMPTS):
+        # 时间戳精确到秒，加随机后缀避免同一秒内的多次调用（或并发请求）生成重复单号
+        prefix = f"PO{now.strftime('%Y%m%d%H%M%S')}{secrets.token_hex(3).upper()}"
+        purchases = []
+        for seq, proposal in enumerate(proposals, start=1):
+            quantity = proposal['suggested_quantity']
+            unit_price = proposal['unit_price']
+            purchases.append(MedicinePurchase(
+                purchase_no=f'{prefix}{seq:04d}',
+                medicine_id=proposal['medicine_id'],
+                supplier=supplier,
+                quantity=quantity,
+                unit_price=unit_price,
+                total_price=quantity * unit_price,
+                priority=proposal['priority'],
+                expected_delivery_date=expected_delivery_date,
+                purchaser=purchaser,
+                notes=f"需求预测生成：日均需求 {proposal['daily_forecast']}"
+            ))
+
+        db.session.add_all(purchases)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            if attempt == PURCHASE_NO_ATTEMPTS - 1:
+                raise
+            continue
+        break
+
+    return purchases
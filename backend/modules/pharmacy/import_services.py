@@ -0,0 +1,496 @@
+"""
+药品目录批量导入服务
+Medicine Catalogue Bulk Import Services
+
+支持流式读取 CSV / XLSX 药品目录，逐行校验后按批次：
+- 一次批量查询解析已存在的 medicine_no
+- 使用批量 INSERT / UPDATE 语句写入 Medicine 与 MedicineInventory
+- 每个批次一个事务，单行校验错误不影响其他行
+"""
+import codecs
+import csv
+import io
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import insert, update
+
+from backend.extensions import db
+from backend.models import Medicine, MedicineInventory
+from backend.utils.reference_cache import MEDICINE_CATEGORIES, reference_cache
+
+
+DEFAULT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+# 依次尝试的CSV编码
+CSV_ENCODINGS = ('utf-8-sig', 'gb18030')
+
+# 表头别名（支持英文字段名和中文表头）
+HEADER_ALIASES = {
+    '药品编号': 'medicine_no',
+    '药品名称': 'name',
+    '通用名称': 'generic_name',
+    '药品分类': 'category',
+    '分类': 'category',
+    '规格': 'specification',
+    '单位': 'unit',
+    '生产厂家': 'manufacturer',
+    '单价': 'price',
+    '价格': 'price',
+    '是否需要处方': 'prescription_required',
+    '用法用量': 'usage',
+    '适应症': 'indications',
+    '禁忌症': 'contraindications',
+    '副作用': 'side_effects',
+    '储存条件': 'storage_conditions',
+    '状态': 'status',
+    '库存数量': 'quantity',
+    '最小库存': 'min_stock',
+    '最大库存': 'max_stock',
+    '存放位置': 'location',
+    '批次号': 'batch_no',
+    '生产日期': 'production_date',
+    '过期日期': 'expiry_date',
+}
+
+MEDICINE_TEXT_FIELDS = {
+    'name': 100,
+    'generic_name': 100,
+    'category': 50,
+    'specification': 50,
+    'unit': 20,
+    'manufacturer': 100,
+    'storage_conditions': 200,
+}
+MEDICINE_LONG_TEXT_FIELDS = ('usage', 'indications', 'contraindications', 'side_effects')
+INVENTORY_INT_FIELDS = ('quantity', 'min_stock', 'max_stock')
+INVENTORY_TEXT_FIELDS = {'location': 50, 'batch_no': 50}
+INVENTORY_DATE_FIELDS = ('production_date', 'expiry_date')
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y', '是', '需要'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', '否', '不需要'}
+
+
+# ============= 文件读取 =============
+
+def _normalize_header(header) -> str:
+    key = str(header or '').strip()
+    return HEADER_ALIASES.get(key, key.lower())
+
+
+def _decodes_as(stream, encoding: str, block_size: int = 64 * 1024) -> bool:
+    """按块完整解码一遍，判断文件能否以指定编码读取（读取后回到起始位置）"""
+    start = stream.tell()
+    decoder = codecs.getincrementaldecoder(encoding)()
+    try:
+        while True:
+            block = stream.read(block_size)
+            decoder.decode(block, final=not block)
+            if not block:
+                return True
+    except UnicodeDecodeError:
+        return False
+    finally:
+        stream.seek(start)
+
+
+def detect_csv_encoding(stream) -> str:
+    """
+    识别CSV编码：先按UTF-8（含BOM）解码，失败时按GB18030（兼容GBK，Excel中文版另存CSV的默认编码）
+
+    Raises:
+        ValueError: 两种编码都无法解码
+    """
+    for encoding in CSV_ENCODINGS:
+        if _decodes_as(stream, encoding):
+            return encoding
+    raise ValueError('无法识别CSV文件编码，请另存为UTF-8或GBK编码后重新上传')
+
+
+def iter_csv_rows(stream) -> Iterator[Tuple[int, Dict]]:
+    """
+    流式读取CSV（UTF-8 / 带BOM的UTF-8 / GBK）
+
+    编码在返回生成器之前识别（完整扫描一遍文件），读取过程中不会再出现解码错误，
+    不会出现前面批次已写入、后面才因编码失败的情况。
+
+    Yields:
+        (行号, 行数据字典)，行号与文件中的行号一致（表头为第1行）
+
+    Raises:
+        ValueError: 无法识别文件编码
+    """
+    if isinstance(stream, (bytes, bytearray)):
+        stream = io.BytesIO(stream)
+    if isinstance(stream, io.TextIOBase):
+        return _iter_csv_text(stream)
+    if not stream.seekable():
+        stream = io.BytesIO(stream.read())
+    encoding = detect_csv_encoding(stream)
+    return _iter_csv_text(io.TextIOWrapper(stream, encoding=encoding, newline=''))
+
+
+def _iter_csv_text(text) -> Iterator[Tuple[int, Dict]]:
+    reader = csv.reader(text)
+    headers = next(reader, None)
+    if not headers:
+        return
+    headers = [_normalize_header(h) for h in headers]
+    for line_no, values in enumerate(reader, start=2):
+        if not any(v.strip() for v in values):
+            continue
+        yield line_no, dict(zip(headers, values))
+
+
+def iter_xlsx_rows(stream) -> Iterator[Tuple[int, Dict]]:
+    """
+    以只读模式流式读取XLSX第一个工作表
+
+    依赖检查与打开工作簿在返回生成器之前完成，调用方可立即得到 ValueError。
+
+    Raises:
+        ValueError: 未安装 openpyxl，或文件不是有效的XLSX
+    """
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError('导入XLSX需要安装 openpyxl')
+    try:
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+    except Exception:
+        raise ValueError('无法读取XLSX文件，请确认文件格式')
+    return _iter_workbook_rows(workbook)
+
+
+def _iter_workbook_rows(workbook) -> Iterator[Tuple[int, Dict]]:
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        headers = next(rows, None)
+        if not headers:
+            return
+        headers = [_normalize_header(h) for h in headers]
+        for line_no, values in enumerate(rows, start=2):
+            if not any(v not in (None, '') for v in values):
+                continue
+            yield line_no, dict(zip(headers, values))
+    finally:
+        workbook.close()
+
+
+def iter_file_rows(stream, filename: str) -> Iterator[Tuple[int, Dict]]:
+    """
+    根据文件扩展名选择读取方式
+
+    Raises:
+        ValueError: 不支持的文件类型、CSV编码无法识别，或导入XLSX时未安装 openpyxl
+    """
+    lower = (filename or '').lower()
+    if lower.endswith('.csv'):
+        return iter_csv_rows(stream)
+    if lower.endswith('.xlsx'):
+        return iter_xlsx_rows(stream)
+    raise ValueError('仅支持 .csv 或 .xlsx 文件')
+
+
+# ============= 行校验 =============
+
+def _clean(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+
+def _parse_date(value, field: str) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return datetime.strptime(str(value), '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f'{field} 日期格式错误，应为YYYY-MM-DD')
+
+
+def _parse_int(value, field: str) -> int:
+    # XLSX 中的整数单元格可能读成 10.0，允许；10.5 等非整数值拒绝而不是截断
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{field} 必须为整数')
+    if not number.is_integer():
+        raise ValueError(f'{field} 必须为整数')
+    number = int(number)
+    if number < 0:
+        raise ValueError(f'{field} 不能为负数')
+    return number
+
+
+def validate_row(row: Dict) -> Tuple[Dict, Dict]:
+    """
+    校验并转换一行导入数据
+
+    只返回该行实际提供（非空）的字段，便于更新时保留未提供字段的原值。
+
+    Args:
+        row: 原始行数据（表头已规范化）
+
+    Returns:
+        (药品字段字典, 库存字段字典)
+
+    Raises:
+        ValueError: 数据无效
+    """
+    medicine = {}
+    inventory = {}
+
+    medicine_no = _clean(row.get('medicine_no'))
+    if medicine_no is None:
+        raise ValueError('缺少必填字段：medicine_no')
+    medicine_no = str(medicine_no)
+    if len(medicine_no) > 20:
+        raise ValueError('medicine_no 长度不能超过20')
+    medicine['medicine_no'] = medicine_no
+
+    for field, max_length in MEDICINE_TEXT_FIELDS.items():
+        value = _clean(row.get(field))
+        if value is not None:
+            value = str(value)
+            if len(value) > max_length:
+                raise ValueError(f'{field} 长度不能超过{max_length}')
+            medicine[field] = value
+
+    for field in MEDICINE_LONG_TEXT_FIELDS:
+        value = _clean(row.get(field))
+        if value is not None:
+            medicine[field] = str(value)
+
+    price = _clean(row.get('price'))
+    if price is not None:
+        try:
+            price = float(price)
+        except (TypeError, ValueError):
+            raise ValueError('价格格式错误')
+        if price < 0:
+            raise ValueError('价格不能为负数')
+        medicine['price'] = price
+
+    prescription = _clean(row.get('prescription_required'))
+    if prescription is not None:
+        if isinstance(prescription, bool):
+            medicine['prescription_required'] = prescription
+        elif str(prescription).lower() in TRUE_VALUES:
+            medicine['prescription_required'] = True
+        elif str(prescription).lower() in FALSE_VALUES:
+            medicine['prescription_required'] = False
+        else:
+            raise ValueError('prescription_required 取值无效')
+
+    status = _clean(row.get('status'))
+    if status is not None:
+        if status not in ('active', 'inactive'):
+            raise ValueError('status 只能为 active 或 inactive')
+        medicine['status'] = status
+
+    for field in INVENTORY_INT_FIELDS:
+        value = _clean(row.get(field))
+        if value is not None:
+            inventory[field] = _parse_int(value, field)
+
+    for field, max_length in INVENTORY_TEXT_FIELDS.items():
+        value = _clean(row.get(field))
+        if value is not None:
+            value = str(value)
+            if len(value) > max_length:
+                raise ValueError(f'{field} 长度不能超过{max_length}')
+            inventory[field] = value
+
+    for field in INVENTORY_DATE_FIELDS:
+        value = _clean(row.get(field))
+        if value is not None:
+            inventory[field] = _parse_date(value, field)
+
+    return medicine, inventory
+
+
+# ============= 批量写入 =============
+
+def _chunks(rows: Iterable, size: int) -> Iterator[List]:
+    chunk = []
+    for item in rows:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _upsert_chunk(entries: List[Tuple[int, Dict, Dict]], update_existing: bool) -> Dict:
+    """
+    在一个事务内写入一个批次（entries 已通过校验且 medicine_no 不重复）
+
+    Returns:
+        Dict: 本批次统计 {created, updated, skipped, rejected}
+    """
+    now = datetime.utcnow()
+    numbers = [medicine['medicine_no'] for _, medicine, _ in entries]
+
+    # 一次批量查询解析已存在的药品编号
+    existing = dict(db.session.query(Medicine.medicine_no, Medicine.id).filter(
+        Medicine.medicine_no.in_(numbers)
+    ).all())
+
+    to_insert = []
+    to_update = []
+    rejected = []
+    skipped = 0
+    for line_no, medicine, inventory in entries:
+        medicine_id = existing.get(medicine['medicine_no'])
+        if medicine_id is None:
+            if 'name' not in medicine or 'price' not in medicine:
+                rejected.append((line_no, medicine['medicine_no'], '新药品必须提供 name 和 price'))
+                continue
+            to_insert.append((line_no, medicine, inventory))
+        elif update_existing:
+            to_update.append((medicine_id, medicine, inventory))
+        else:
+            skipped += 1
+
+    if to_insert:
+        db.session.execute(insert(Medicine), [
+            dict(medicine, status=medicine.get('status', 'active'), created_at=now, updated_at=now)
+            for _, medicine, _ in to_insert
+        ])
+        inserted_ids = dict(db.session.query(Medicine.medicine_no, Medicine.id).filter(
+            Medicine.medicine_no.in_([m['medicine_no'] for _, m, _ in to_insert])
+        ).all())
+        db.session.execute(insert(MedicineInventory), [
+            {
+                'medicine_id': inserted_ids[medicine['medicine_no']],
+                'quantity': inventory.get('quantity', 0),
+                'min_stock': inventory.get('min_stock', 0),
+                'max_stock': inventory.get('max_stock'),
+                'location': inventory.get('location'),
+                'batch_no': inventory.get('batch_no'),
+                'production_date': inventory.get('production_date'),
+                'expiry_date': inventory.get('expiry_date'),
+                'updated_at': now,
+            }
+            for _, medicine, inventory in to_insert
+        ])
+
+    if to_update:
+        medicine_updates = []
+        for medicine_id, medicine, _ in to_update:
+            values = {k: v for k, v in medicine.items() if k != 'medicine_no'}
+            if values:
+                medicine_updates.append(dict(values, id=medicine_id, updated_at=now))
+        if medicine_updates:
+            db.session.execute(update(Medicine), medicine_updates)
+
+        inventory_ids = dict(db.session.query(MedicineInventory.medicine_id, MedicineInventory.id).filter(
+            MedicineInventory.medicine_id.in_([medicine_id for medicine_id, _, _ in to_update])
+        ).all())
+        inventory_updates = []
+        inventory_inserts = []
+        for medicine_id, _, inventory in to_update:
+            inventory_id = inventory_ids.get(medicine_id)
+            if inventory_id is None:
+                inventory_inserts.append(dict(
+                    {'quantity': 0, 'min_stock': 0}, **inventory, medicine_id=medicine_id, updated_at=now
+                ))
+            elif inventory:
+                inventory_updates.append(dict(inventory, id=inventory_id, updated_at=now))
+        if inventory_updates:
+            db.session.execute(update(MedicineInventory), inventory_updates)
+        if inventory_inserts:
+            db.session.execute(insert(MedicineInventory), inventory_inserts)
+
+    db.session.commit()
+    return {
+        'created': len(to_insert),
+        'updated': len(to_update),
+        'skipped': skipped,
+        'rejected': rejected
+    }
+
+
+def _add_error(report: Dict, line_no: int, medicine_no: Optional[str], message: str):
+    report['error_count'] += 1
+    if len(report['errors']) < MAX_REPORTED_ERRORS:
+        report['errors'].append({'row': line_no, 'medicine_no': medicine_no, 'message': message})
+
+
+def import_medicines(rows: Iterable[Tuple[int, Dict]], update_existing: bool = True,
+                     chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict:
+    """
+    批量导入（新增或更新）药品及库存
+
+    Args:
+        rows: (行号, 行数据) 迭代器，通常来自 iter_file_rows
+        update_existing: 已存在的 medicine_no 是否更新（否则跳过）
+        chunk_size: 每个事务处理的行数
+
+    Returns:
+        Dict: 导入报告 {total, created, updated, skipped, failed, error_count, errors}
+    """
+    report = {
+        'total': 0,
+        'created': 0,
+        'updated': 0,
+        'skipped': 0,
+        'failed': 0,
+        'error_count': 0,
+        'errors': []
+    }
+
+    for chunk in _chunks(rows, max(1, chunk_size)):
+        entries = []
+        positions = {}
+        for line_no, row in chunk:
+            report['total'] += 1
+            try:
+                medicine, inventory = validate_row(row)
+            except ValueError as e:
+                report['failed'] += 1
+                _add_error(report, line_no, _clean(row.get('medicine_no')), str(e))
+                continue
+
+            # 同一批次内重复的编号以最后一行为准
+            previous = positions.get(medicine['medicine_no'])
+            if previous is not None:
+                report['skipped'] += 1
+                _add_error(report, entries[previous][0], medicine['medicine_no'],
+                           f'与第{line_no}行药品编号重复，已被覆盖')
+                entries[previous] = (line_no, medicine, inventory)
+            else:
+                positions[medicine['medicine_no']] = len(entries)
+                entries.append((line_no, medicine, inventory))
+
+        if not entries:
+            continue
+
+        try:
+            result = _upsert_chunk(entries, update_existing)
+        except Exception as e:
+            db.session.rollback()
+            for line_no, medicine, _ in entries:
+                report['failed'] += 1
+                _add_error(report, line_no, medicine['medicine_no'], f'批次写入失败：{str(e)}')
+            continue
+
+        report['created'] += result['created']
+        report['updated'] += result['updated']
+        report['skipped'] += result['skipped']
+        for line_no, medicine_no, message in result['rejected']:
+            report['failed'] += 1
+            _add_error(report, line_no, medicine_no, message)
+
+    # 批量语句不经过会话单元，需显式使分类缓存失效
+    if report['created'] or report['updated']:
+        reference_cache.invalidate(MEDICINE_CATEGORIES)
+
+    return report
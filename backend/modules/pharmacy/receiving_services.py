@@ -0,0 +1,247 @@
+"""
+采购收货服务
+Purchase Receiving Services
+
+表单收货、单笔 API 收货与整批到货共用同一实现：
+- 一个事务内锁定并更新所有采购单，库存按药品汇总后批量增加
+- 客户端提供幂等键时记录首次收货结果，重试直接返回该结果，不会重复入库
+"""
+import hashlib
+import json
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
+
+from backend.extensions import db
+from backend.models import MedicineInventory, MedicinePurchase, PurchaseReceipt
+from backend.utils.reference_cache import PURCHASE_STATS, reference_cache
+
+
+MAX_IDEMPOTENCY_KEY_LENGTH = 64
+MAX_ITEMS_PER_RECEIPT = 500
+MAX_BATCH_NO_LENGTH = 50
+
+
+class ReceivingError(ValueError):
+    """收货失败（携带错误码与HTTP状态码，供路由层直接返回）"""
+
+    def __init__(self, message: str, code: str = 'RECEIVE_PURCHASE_ERROR', status_code: int = 400):
+        super().__init__(message)
+        self.code = code
+        self.status_code = status_code
+
+
+def _parse_date(value, label: str) -> Optional[date]:
+    if value in (None, ''):
+        return None
+    if isinstance(value, date):
+        return value
+    try:
+        return datetime.strptime(str(value), '%Y-%m-%d').date()
+    except ValueError:
+        raise ReceivingError(f'{label}格式错误，应为YYYY-MM-DD', 'INVALID_DATE_FORMAT')
+
+
+def _parse_batch_no(value) -> Optional[str]:
+    if value is None:
+        return None
+    # JSON 中的纯数字批次号按字符串处理
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise ReceivingError('批次号格式错误', 'INVALID_BATCH_NO')
+    batch_no = str(value).strip()
+    if len(batch_no) > MAX_BATCH_NO_LENGTH:
+        raise ReceivingError(f'批次号最多 {MAX_BATCH_NO_LENGTH} 个字符', 'INVALID_BATCH_NO')
+    return batch_no or None
+
+
+def normalize_items(items: Iterable[Dict], require_dates: bool = False) -> List[Dict]:
+    """
+    校验并规范化收货明细
+
+    Args:
+        items: [{purchase_id, batch_no?, production_date?, expiry_date?}, ...]
+        require_dates: 是否要求每条明细提供生产日期和过期日期
+
+    Returns:
+        List[Dict]: 规范化后的明细（日期已解析为 date）
+    """
+    if not isinstance(items, (list, tuple)) or not items:
+        raise ReceivingError('收货明细不能为空', 'EMPTY_RECEIPT')
+    if len(items) > MAX_ITEMS_PER_RECEIPT:
+        raise ReceivingError(f'单次收货最多 {MAX_ITEMS_PER_RECEIPT} 个采购单', 'TOO_MANY_ITEMS')
+
+    normalized = []
+    seen = set()
+    for raw in items:
+        if not isinstance(raw, dict):
+            raise ReceivingError('收货明细格式错误', 'INVALID_RECEIPT_ITEM')
+        try:
+            purchase_id = int(raw.get('purchase_id'))
+        except (TypeError, ValueError):
+            raise ReceivingError('采购单ID无效', 'INVALID_PURCHASE_ID')
+        if purchase_id in seen:
+            raise ReceivingError(f'采购单 {purchase_id} 重复出现在收货明细中', 'DUPLICATE_PURCHASE_ID')
+        seen.add(purchase_id)
+
+        production_date = _parse_date(raw.get('production_date'), '生产日期')
+        expiry_date = _parse_date(raw.get('expiry_date'), '过期日期')
+        if require_dates and (production_date is None or expiry_date is None):
+            raise ReceivingError('收货时必须提供生产日期和过期日期', 'MISSING_DATE_FIELD')
+
+        normalized.append({
+            'purchase_id': purchase_id,
+            'batch_no': _parse_batch_no(raw.get('batch_no')),
+            'production_date': production_date,
+            'expiry_date': expiry_date
+        })
+    return normalized
+
+
+def _fingerprint(items: List[Dict]) -> str:
+    payload = json.dumps([
+        [i['purchase_id'], i['batch_no'],
+         i['production_date'].isoformat() if i['production_date'] else None,
+         i['expiry_date'].isoformat() if i['expiry_date'] else None]
+        for i in sorted(items, key=lambda i: i['purchase_id'])
+    ])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _replay(idempotency_key: str, fingerprint: str) -> Optional[Dict]:
+    receipt = PurchaseReceipt.query.filter_by(idempotency_key=idempotency_key).first()
+    if receipt is None:
+        return None
+    if receipt.request_fingerprint != fingerprint:
+        raise ReceivingError('幂等键已被用于内容不同的收货请求', 'IDEMPOTENCY_KEY_CONFLICT', 409)
+    result = json.loads(receipt.result)
+    result['replayed'] = True
+    return result
+
+
+def receive_purchases(items: Iterable[Dict], idempotency_key: Optional[str] = None,
+                      require_dates: bool = False) -> Dict:
+    """
+    批量确认收货
+
+    所有采购单在同一事务内加行锁更新：任一采购单不存在或状态不是 pending 时整批失败。
+    同一药品的多个采购单先汇总数量，再对库存做一次批量更新。
+
+    Args:
+        items: 收货明细，见 normalize_items
+        idempotency_key: 客户端幂等键；相同键的重试返回首次结果（replayed=True）
+        require_dates: 是否要求提供生产日期和过期日期
+
+    Returns:
+        Dict: {received, purchase_ids, inventory, idempotency_key, replayed}
+    """
+    items = normalize_items(items, require_dates)
+    if idempotency_key is not None:
+        idempotency_key = str(idempotency_key).strip()
+        if not idempotency_key or len(idempotency_key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+            raise ReceivingError(f'幂等键长度应为 1-{MAX_IDEMPOTENCY_KEY_LENGTH} 个字符', 'INVALID_IDEMPOTENCY_KEY')
+
+    fingerprint = _fingerprint(items)
+    if idempotency_key:
+        replayed = _replay(idempotency_key, fingerprint)
+        if replayed is not None:
+            return replayed
+
+    purchase_ids = [i['purchase_id'] for i in items]
+    purchases = db.session.query(
+        MedicinePurchase.id, MedicinePurchase.medicine_id,
+        MedicinePurchase.quantity, MedicinePurchase.status
+    ).filter(
+        MedicinePurchase.id.in_(purchase_ids)
+    ).order_by(MedicinePurchase.id).with_for_update().all()
+    by_id = {p.id: p for p in purchases}
+
+    missing = [pid for pid in purchase_ids if pid not in by_id]
+    if missing:
+        db.session.rollback()
+        raise ReceivingError(f'采购单不存在：{missing}', 'PURCHASE_NOT_FOUND', 404)
+    not_pending = [p.id for p in purchases if p.status != 'pending']
+    if not_pending:
+        db.session.rollback()
+        # 并发的相同请求可能刚刚提交：等待行锁后再确认一次
+        if idempotency_key:
+            replayed = _replay(idempotency_key, fingerprint)
+            if replayed is not None:
+                return replayed
+        raise ReceivingError(f'采购单 {not_pending} 当前状态不允许重复收货处理', 'INVALID_PURCHASE_STATUS')
+
+    today = datetime.now().date()
+    now = datetime.now()
+
+    # 按药品汇总入库数量；同一药品多个批次时库存批次信息以明细中最后一条为准
+    deltas: Dict[int, int] = {}
+    batch_info: Dict[int, Dict] = {}
+    purchase_updates = []
+    for item in items:
+        purchase = by_id[item['purchase_id']]
+        deltas[purchase.medicine_id] = deltas.get(purchase.medicine_id, 0) + (purchase.quantity or 0)
+
+        row = {'id': purchase.id, 'status': 'completed', 'actual_delivery_date': today}
+        info = {}
+        for field in ('batch_no', 'production_date', 'expiry_date'):
+            if item[field] is not None:
+                row[field] = item[field]
+                info[field] = item[field]
+        purchase_updates.append(row)
+        batch_info.setdefault(purchase.medicine_id, {}).update(info)
+
+    inventories = db.session.query(
+        MedicineInventory.id, MedicineInventory.medicine_id, MedicineInventory.quantity
+    ).filter(
+        MedicineInventory.medicine_id.in_(list(deltas))
+    ).order_by(MedicineInventory.id).with_for_update().all()
+    existing = {inv.medicine_id: inv for inv in inventories}
+
+    inventory_updates = []
+    inventory_inserts = []
+    summary = []
+    for medicine_id, delta in deltas.items():
+        inv = existing.get(medicine_id)
+        quantity = (inv.quantity or 0) + delta if inv else delta
+        row = {'quantity': quantity, 'last_restock_date': now, **batch_info.get(medicine_id, {})}
+        if inv:
+            inventory_updates.append({'id': inv.id, **row})
+        else:
+            # 若库存中不存在该药品的记录，则视为新药入库
+            inventory_inserts.append({'medicine_id': medicine_id, **row})
+        summary.append({'medicine_id': medicine_id, 'quantity_added': delta, 'quantity': quantity})
+
+    result = {
+        'received': len(purchase_ids),
+        'purchase_ids': purchase_ids,
+        'inventory': summary,
+        'idempotency_key': idempotency_key,
+        'replayed': False
+    }
+
+    try:
+        db.session.execute(update(MedicinePurchase), purchase_updates)
+        if inventory_updates:
+            db.session.execute(update(MedicineInventory), inventory_updates)
+        if inventory_inserts:
+            db.session.execute(insert(MedicineInventory), inventory_inserts)
+        if idempotency_key:
+            db.session.add(PurchaseReceipt(
+                idempotency_key=idempotency_key,
+                request_fingerprint=fingerprint,
+                result=json.dumps(result, ensure_ascii=False)
+            ))
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        # 并发的相同请求已先提交：返回其结果
+        if idempotency_key:
+            replayed = _replay(idempotency_key, fingerprint)
+            if replayed is not None:
+                return replayed
+        raise
+
+    # 批量语句不经过会话单元，需显式使采购统计缓存失效
+    reference_cache.invalidate(PURCHASE_STATS)
+    return result
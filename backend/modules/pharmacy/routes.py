@@ -2,29 +2,15 @@
 药品管理子系统 - 路由
 Pharmacy Management - Routes
 """
-from flask import render_template, request, redirect, url_for, flash, jsonify
+from flask import render_template, request, redirect, url_for, flash
 from . import pharmacy_bp
-from backend.models import Medicine, MedicineInventory, MedicinePurchase, MedicationRequest
+from backend.models import Doctor, Medicine, MedicineInventory, MedicinePurchase, MedicationRequest, Patient
 from backend.extensions import db
 from datetime import datetime
-
-
-def success_response(data=None, message='操作成功', code='SUCCESS'):
-    return jsonify({
-        'success': True,
-        'message': message,
-        'code': code,
-        'data': data
-    })
-
-
-def error_response(message='操作失败', code='ERROR', status_code=400):
-    return jsonify({
-        'success': False,
-        'message': message,
-        'code': code,
-        'data': None
-    }), status_code
+from sqlalchemy.orm import defer, joinedload
+from backend.utils import conditional
+from backend.utils.reference_cache import get_medicine_categories, get_purchase_stats
+from backend.utils.responses import error_response, success_response
 
 
 # ============= 药品信息管理 =============
@@ -42,7 +28,7 @@ def medicine_list():
     search = request.args.get('search', '')
     category = request.args.get('category', '')
     
-    query = Medicine.query
+    query = Medicine.query.options(joinedload(Medicine.inventory))
     if search:
         query = query.filter(
             (Medicine.name.like(f'%{search}%')) | 
@@ -58,8 +44,7 @@ def medicine_list():
     medicines = pagination.items
     
     # 获取所有分类用于筛选
-    categories = db.session.query(Medicine.category).distinct().all()
-    categories = [c[0] for c in categories if c[0]]
+    categories = get_medicine_categories()
     
     return render_template('medicine_list.html', 
                          medicines=medicines, 
@@ -270,16 +255,15 @@ def purchase_list():
     purchases = pagination.items
     
     # 统计信息
-    total_purchases = MedicinePurchase.query.count()
-    pending_count = MedicinePurchase.query.filter_by(status='pending').count()
+    stats = get_purchase_stats()
     
     return render_template('purchase_list.html', 
                          purchases=purchases, 
                          pagination=pagination,
                          status=status,
                          priority=priority,
-                         total_purchases=total_purchases,
-                         pending_count=pending_count)
+                         total_purchases=stats['total_purchases'],
+                         pending_count=stats['pending_count'])
 
 
 @pharmacy_bp.route('/purchase/add', methods=['GET', 'POST'])
@@ -333,58 +317,18 @@ def purchase_detail(id):
 @pharmacy_bp.route('/purchase/receive/<int:id>', methods=['POST'])
 def purchase_receive(id):
     """确认收货"""
-    try:
-        purchase = MedicinePurchase.query.get_or_404(id)
-        
-        # 仅允许对待处理的采购单进行收货操作，防止重复入库
-        if purchase.status != 'pending':
-            flash('当前采购单状态不允许重复收货处理', 'warning')
-            return redirect(url_for('pharmacy.purchase_list'))
-
-        # 更新采购状态
-        purchase.status = 'completed'
-        purchase.actual_delivery_date = datetime.now().date()
-        
-        # 获取批次和日期信息
-        batch_no = request.form.get('batch_no')
-        prod_date_str = request.form.get('production_date')
-        exp_date_str = request.form.get('expiry_date')
-        
-        if batch_no:
-            purchase.batch_no = batch_no
-        if prod_date_str:
-            purchase.production_date = datetime.strptime(prod_date_str, '%Y-%m-%d').date()
-        if exp_date_str:
-            purchase.expiry_date = datetime.strptime(exp_date_str, '%Y-%m-%d').date()
-        
-        # 更新库存
-        inventory = MedicineInventory.query.filter_by(medicine_id=purchase.medicine_id).first()
-        if inventory:
-            inventory.quantity += purchase.quantity
-            inventory.last_restock_date = datetime.now()
-            if batch_no:
-                inventory.batch_no = batch_no
-            if prod_date_str:
-                inventory.production_date = datetime.strptime(prod_date_str, '%Y-%m-%d').date()
-            if exp_date_str:
-                inventory.expiry_date = datetime.strptime(exp_date_str, '%Y-%m-%d').date()
-        else:
-            # 若库存中不存在该药品的记录，则视为新药入库
-            inventory = MedicineInventory(
-                medicine_id=purchase.medicine_id,
-                quantity=purchase.quantity
-            )
-            inventory.last_restock_date = datetime.now()
-            if batch_no:
-                inventory.batch_no = batch_no
-            if prod_date_str:
-                inventory.production_date = datetime.strptime(prod_date_str, '%Y-%m-%d').date()
-            if exp_date_str:
-                inventory.expiry_date = datetime.strptime(exp_date_str, '%Y-%m-%d').date()
-            db.session.add(inventory)
+    from .receiving_services import ReceivingError, receive_purchases
 
-        db.session.commit()
+    try:
+        receive_purchases([{
+            'purchase_id': id,
+            'batch_no': request.form.get('batch_no'),
+            'production_date': request.form.get('production_date'),
+            'expiry_date': request.form.get('expiry_date')
+        }])
         flash('收货成功，库存已更新！', 'success')
+    except ReceivingError as e:
+        flash(str(e), 'warning')
     except Exception as e:
         db.session.rollback()
         flash(f'收货失败：{str(e)}', 'error')
@@ -413,8 +357,7 @@ def get_purchase_orders():
         items = [p.to_dict() for p in pagination.items]
 
         # 统计信息
-        total_purchases = MedicinePurchase.query.count()
-        pending_count = MedicinePurchase.query.filter_by(status='pending').count()
+        stats = get_purchase_stats()
 
         return success_response({
             'items': items,
@@ -423,8 +366,8 @@ def get_purchase_orders():
             'per_page': per_page,
             'pages': pagination.pages,
             'stats': {
-                'total_purchases': total_purchases,
-                'pending_count': pending_count
+                'total_purchases': stats['total_purchases'],
+                'pending_count': stats['pending_count']
             }
         })
     except Exception as e:
@@ -526,80 +469,159 @@ def get_purchase_order_detail(purchase_id):
         return error_response(f'获取采购单详情失败：{str(e)}', 'GET_PURCHASE_ORDER_ERROR', 500)
 
 
+def _idempotency_key(data):
+    """幂等键：优先取请求头 Idempotency-Key，其次取 JSON 中的 idempotency_key"""
+    return request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+
+
 @pharmacy_bp.route('/purchase-orders/<int:purchase_id>/receive', methods=['POST'])
 def receive_purchase_order(purchase_id):
     """确认收货（API）"""
+    from .receiving_services import ReceivingError, receive_purchases
+
     try:
+        data = request.get_json() or {}
+        receive_purchases([{
+            'purchase_id': purchase_id,
+            'batch_no': data.get('batch_no'),
+            'production_date': data.get('production_date'),
+            'expiry_date': data.get('expiry_date')
+        }], idempotency_key=_idempotency_key(data), require_dates=True)
+
         purchase = MedicinePurchase.query.get(purchase_id)
-        if not purchase:
-            return error_response('采购单不存在', 'PURCHASE_NOT_FOUND', 404)
+        return success_response(purchase.to_dict(), '收货成功，库存已更新', 'PURCHASE_RECEIVED')
+    except ReceivingError as e:
+        return error_response(str(e), e.code, e.status_code)
+    except Exception as e:
+        db.session.rollback()
+        return error_response(f'收货失败：{str(e)}', 'RECEIVE_PURCHASE_ORDER_ERROR', 500)
+
+
+@pharmacy_bp.route('/purchase-orders/receive', methods=['POST'])
+def receive_purchase_orders():
+    """整批到货确认收货（API）
 
-        if purchase.status != 'pending':
-            return error_response('当前采购单状态不允许重复收货处理', 'INVALID_PURCHASE_STATUS')
+    请求体：{"items": [{"purchase_id", "batch_no", "production_date", "expiry_date"}, ...],
+            "idempotency_key": "..."}，幂等键也可通过请求头 Idempotency-Key 传入。
+    整批在同一事务内处理，任一采购单不可收货时全部不入库。
+    """
+    from .receiving_services import ReceivingError, receive_purchases
 
+    try:
         data = request.get_json() or {}
-        batch_no = data.get('batch_no')
-        prod_date_str = data.get('production_date')
-        exp_date_str = data.get('expiry_date')
+        result = receive_purchases(
+            data.get('items'),
+            idempotency_key=_idempotency_key(data),
+            require_dates=bool(data.get('require_dates', True))
+        )
+        message = '重复请求，已返回首次收货结果' if result['replayed'] else '收货成功，库存已更新'
+        return success_response(result, message, 'PURCHASES_RECEIVED')
+    except ReceivingError as e:
+        return error_response(str(e), e.code, e.status_code)
+    except Exception as e:
+        db.session.rollback()
+        return error_response(f'批量收货失败：{str(e)}', 'RECEIVE_PURCHASE_ORDERS_ERROR', 500)
+
+
+# ============= 需求预测与采购建议 =============
+
+def _forecast_params(source):
+    """从查询参数或JSON中解析预测参数"""
+    from . import forecast_services
+
+    def _get(name, default, cast):
+        value = source.get(name)
+        if value in (None, ''):
+            return default
+        return cast(value)
+
+    return {
+        'method': _get('method', 'moving_average', str),
+        'window': _get('window', forecast_services.DEFAULT_WINDOW, int),
+        'alpha': _get('alpha', forecast_services.DEFAULT_ALPHA, float),
+        'history_days': _get('history_days', forecast_services.DEFAULT_HISTORY_DAYS, int),
+        'lead_time_days': _get('lead_time_days', forecast_services.DEFAULT_LEAD_TIME_DAYS, int),
+        'review_days': _get('review_days', forecast_services.DEFAULT_REVIEW_DAYS, int),
+        'category': _get('category', None, str),
+    }
 
-        if not prod_date_str or not exp_date_str:
-            return error_response('收货时必须提供生产日期和过期日期', 'MISSING_DATE_FIELD')
+
+@pharmacy_bp.route('/purchase-forecast', methods=['GET'])
+def get_purchase_forecast():
+    """获取基于出库需求预测的采购建议（API）"""
+    try:
+        from . import forecast_services
 
         try:
-            prod_date = datetime.strptime(prod_date_str, '%Y-%m-%d').date()
-        except ValueError:
-            return error_response('生产日期格式错误，应为YYYY-MM-DD', 'INVALID_DATE_FORMAT')
+            params = _forecast_params(request.args)
+        except (TypeError, ValueError):
+            return error_response('预测参数格式错误', 'INVALID_FORECAST_PARAMS')
+
+        proposals = forecast_services.propose_purchase_orders(**params)
+
+        return success_response({
+            'items': proposals,
+            'total': len(proposals),
+            'total_cost': round(sum(p['estimated_cost'] for p in proposals), 2),
+            'params': params
+        })
+    except ValueError as e:
+        return error_response(str(e), 'INVALID_FORECAST_PARAMS')
+    except Exception as e:
+        return error_response(f'生成采购建议失败：{str(e)}', 'GET_PURCHASE_FORECAST_ERROR', 500)
+
 
+@pharmacy_bp.route('/purchase-forecast/orders', methods=['POST'])
+def create_forecast_purchase_orders():
+    """按采购建议批量生成采购单（API）"""
+    try:
+        from . import forecast_services
+
+        data = request.get_json() or {}
         try:
-            exp_date = datetime.strptime(exp_date_str, '%Y-%m-%d').date()
-        except ValueError:
-            return error_response('过期日期格式错误，应为YYYY-MM-DD', 'INVALID_DATE_FORMAT')
-
-        # 更新采购状态
-        purchase.status = 'completed'
-        purchase.actual_delivery_date = datetime.now().date()
-
-        if batch_no:
-            purchase.batch_no = batch_no
-        purchase.production_date = prod_date
-        purchase.expiry_date = exp_date
-
-        # 更新库存（逻辑与表单版保持一致）
-        inventory = MedicineInventory.query.filter_by(medicine_id=purchase.medicine_id).first()
-        if inventory:
-            inventory.quantity += purchase.quantity
-            inventory.last_restock_date = datetime.now()
-            if batch_no:
-                inventory.batch_no = batch_no
-            inventory.production_date = prod_date
-            inventory.expiry_date = exp_date
-        else:
-            inventory = MedicineInventory(
-                medicine_id=purchase.medicine_id,
-                quantity=purchase.quantity
-            )
-            inventory.last_restock_date = datetime.now()
-            if batch_no:
-                inventory.batch_no = batch_no
-            inventory.production_date = prod_date
-            inventory.expiry_date = exp_date
-            db.session.add(inventory)
+            params = _forecast_params(data)
+        except (TypeError, ValueError):
+            return error_response('预测参数格式错误', 'INVALID_FORECAST_PARAMS')
 
-        db.session.commit()
-        return success_response(purchase.to_dict(), '收货成功，库存已更新', 'PURCHASE_RECEIVED')
+        medicine_ids = data.get('medicine_ids') or None
+        proposals = forecast_services.propose_purchase_orders(medicine_ids=medicine_ids, **params)
+        if not proposals:
+            return success_response([], '当前无需补货', 'NO_PURCHASE_NEEDED')
+
+        purchases = forecast_services.create_purchase_orders_from_proposals(
+            proposals,
+            supplier=data.get('supplier'),
+            purchaser=data.get('purchaser'),
+            lead_time_days=params['lead_time_days']
+        )
+
+        return success_response(
+            [p.to_dict() for p in purchases],
+            f'已生成 {len(purchases)} 张采购单',
+            'FORECAST_PURCHASES_CREATED'
+        )
+    except ValueError as e:
+        db.session.rollback()
+        return error_response(str(e), 'INVALID_FORECAST_PARAMS')
     except Exception as e:
         db.session.rollback()
-        return error_response(f'收货失败：{str(e)}', 'RECEIVE_PURCHASE_ORDER_ERROR', 500)
+        return error_response(f'生成采购单失败：{str(e)}', 'CREATE_FORECAST_PURCHASES_ERROR', 500)
 
 
 @pharmacy_bp.route('/medication-requests', methods=['GET'])
+@conditional.row_versions(MedicationRequest, Medicine, Doctor, Patient)
 def get_medication_requests():
     try:
         status = request.args.get('status', 'PENDING')
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
 
-        query = MedicationRequest.query
+        # 列表需要患者、医生、药品名称：多对一关系随列表一次联表加载，避免逐行查询
+        query = MedicationRequest.query.options(
+            joinedload(MedicationRequest.patient),
+            joinedload(MedicationRequest.doctor),
+            joinedload(MedicationRequest.medicine)
+        )
         if status:
             query = query.filter_by(status=status)
 
@@ -691,7 +713,34 @@ def reject_medication_request(request_id):
         return error_response(f'拒绝用药申请失败：{str(e)}', 'REJECT_MEDICATION_REQUEST_ERROR', 500)
 
 
+def _medicine_load_options(fields=None):
+    """
+    根据要输出的字段生成查询加载选项
+
+    库存信息在列表查询中直接 JOIN 加载，避免逐行延迟查询；
+    未请求的长文本字段延迟加载（不会被访问，因此不产生额外查询）。
+    """
+    selected = Medicine.SERIALIZABLE_FIELDS if fields is None else fields
+    options = []
+    if 'inventory' in selected:
+        options.append(joinedload(Medicine.inventory))
+    for field in Medicine.HEAVY_FIELDS:
+        if field not in selected:
+            options.append(defer(getattr(Medicine, field)))
+    return options
+
+
+@pharmacy_bp.route('/medicine-categories', methods=['GET'])
+def get_medicine_category_list():
+    """获取药品分类列表（API，分类查询由 reference_cache 缓存）"""
+    try:
+        return success_response(sorted(get_medicine_categories()))
+    except Exception as e:
+        return error_response(f'获取药品分类失败：{str(e)}', 'GET_CATEGORIES_ERROR', 500)
+
+
 @pharmacy_bp.route('/medicines', methods=['GET'])
+@conditional.row_versions(Medicine, MedicineInventory)
 def get_medicines():
     """获取药品列表（API）"""
     try:
@@ -700,8 +749,21 @@ def get_medicines():
         search = request.args.get('search', '')
         category = request.args.get('category', '')
         status = request.args.get('status', '')
+        view = request.args.get('view', 'full')
+        fields_param = request.args.get('fields', '')
+
+        # 字段选择：fields=id,name,inventory 优先；view=list 为不含长文本字段的列表投影
+        if fields_param:
+            fields = [f.strip() for f in fields_param.split(',') if f.strip()]
+            unknown = [f for f in fields if f not in Medicine.SERIALIZABLE_FIELDS]
+            if unknown:
+                return error_response(f"未知字段：{', '.join(unknown)}", 'INVALID_FIELDS')
+        elif view == 'list':
+            fields = Medicine.LIST_FIELDS
+        else:
+            fields = None
 
-        query = Medicine.query
+        query = Medicine.query.options(*_medicine_load_options(fields))
 
         if search:
             query = query.filter(
@@ -718,7 +780,7 @@ def get_medicines():
             page=page, per_page=per_page, error_out=False
         )
 
-        medicines_data = [medicine.to_dict() for medicine in pagination.items]
+        medicines_data = [medicine.to_dict(fields=fields) for medicine in pagination.items]
 
         return success_response({
             'items': medicines_data,
@@ -819,6 +881,36 @@ def create_medicine():
         return error_response(f'创建药品失败：{str(e)}', 'CREATE_MEDICINE_ERROR', 500)
 
 
+@pharmacy_bp.route('/medicines/import', methods=['POST'])
+def import_medicines():
+    """批量导入药品目录（CSV / XLSX，按药品编号新增或更新）（API）"""
+    try:
+        from . import import_services
+
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            return error_response('请上传药品目录文件', 'MISSING_FILE')
+
+        update_existing = request.form.get('update_existing', 'true').lower() not in ('0', 'false', 'no')
+        chunk_size = request.form.get('chunk_size', import_services.DEFAULT_CHUNK_SIZE, type=int)
+
+        try:
+            rows = import_services.iter_file_rows(upload.stream, upload.filename)
+        except ValueError as e:
+            return error_response(str(e), 'UNSUPPORTED_FILE_TYPE')
+
+        report = import_services.import_medicines(rows, update_existing=update_existing, chunk_size=chunk_size)
+
+        return success_response(
+            report,
+            f"导入完成：新增 {report['created']} 条，更新 {report['updated']} 条，失败 {report['failed']} 条",
+            'MEDICINES_IMPORTED'
+        )
+    except Exception as e:
+        db.session.rollback()
+        return error_response(f'导入药品目录失败：{str(e)}', 'IMPORT_MEDICINES_ERROR', 500)
+
+
 @pharmacy_bp.route('/medicines/<int:medicine_id>', methods=['PUT'])
 def update_medicine(medicine_id):
     """更新药品信息（API）"""
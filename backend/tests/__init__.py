@@ -0,0 +1,7 @@
+"""
+自动化测试
+Tests
+
+运行方式（在项目根目录下）：
+    python -m pytest backend/tests -q
+"""
@@ -0,0 +1,110 @@
+"""
+测试夹具
+Test Fixtures
+
+每个测试使用独立的应用实例与内存 SQLite 数据库；模块级单例（限流计数、各类缓存）
+在每个测试开始前清空。TESTING 模式下 N+1 查询会抛出 NPlusOneDetected。
+测试代码只在 with app.app_context() 内访问数据库：若整个测试都处于同一个应用上下文中，
+测试客户端的请求会复用该上下文，g 中按请求缓存的数据（如当前用户身份）会在请求之间泄漏。
+"""
+import os
+import sys
+
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.app import create_app  # noqa: E402
+from backend.config import Config  # noqa: E402
+from backend.extensions import db  # noqa: E402
+from backend.migrations.runner import sqlite_index_names  # noqa: E402
+from backend.models import User  # noqa: E402
+
+PASSWORD = 'test-password'
+
+
+class UnitTestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    # 低成本哈希，加快测试
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+    # 同步写入 last_login，不启动后台线程
+    LAST_LOGIN_FLUSH_INTERVAL = 0
+
+
+def _unique_index_names():
+    """SQLite 的索引名在整个库内唯一：与迁移 000 一样为重名索引加表名前缀"""
+    import backend.modules.doctor.models_extended  # noqa: F401 注册扩展模型
+
+    for index, name in sqlite_index_names(db.metadata).items():
+        index.name = name
+
+
+def _reset_singletons():
+    from backend.utils.access_cache import access_cache
+    from backend.utils.db_router import sticky_clients
+    from backend.utils.rate_limiter import family_member_throttle, login_throttle
+    from backend.utils.reference_cache import reference_cache
+    from backend.utils.response_cache import response_cache
+
+    for throttle in (login_throttle, family_member_throttle):
+        throttle.backend.clear()
+    access_cache.clear()
+    reference_cache.clear()
+    response_cache.clear()
+    sticky_clients.clear()
+
+
+def create_test_app(config_class=UnitTestConfig):
+    """创建测试应用并建表（config_class 可传入 UnitTestConfig 的子类覆盖个别配置）"""
+    _unique_index_names()
+    app = create_app(config_class)
+    _reset_singletons()
+    with app.app_context():
+        # 只建默认库的表：启用过只读副本的应用会在 db.metadatas 中留下 'replica' 键
+        db.create_all(bind_key=None)
+    return app
+
+
+@pytest.fixture
+def app():
+    app = create_test_app()
+    yield app
+    with app.app_context():
+        db.drop_all(bind_key=None)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    """创建用户并返回用户ID：make_user('alice', role='admin')"""
+    def _make_user(username, role='user', password=PASSWORD, **fields):
+        with app.app_context():
+            user = User(username=username, email=f'{username}@example.com', role=role, **fields)
+            user.set_password(password)
+            db.session.add(user)
+            db.session.commit()
+            return user.id
+    return _make_user
+
+
+@pytest.fixture
+def login(client):
+    """登录并返回响应数据（access_token、refresh_token、user）"""
+    def _login(username, password=PASSWORD, **kwargs):
+        response = client.post('/api/auth/login', json={'username': username, 'password': password}, **kwargs)
+        assert response.status_code == 200, response.get_json()
+        return response.get_json()['data']
+    return _login
+
+
+def bearer(token):
+    """Authorization 请求头"""
+    return {'Authorization': f'Bearer {token}'}
@@ -0,0 +1,103 @@
+"""
+门户访问控制缓存的提交后失效
+"""
+from datetime import date
+
+import pytest
+from sqlalchemy import insert
+
+from backend.extensions import db
+from backend.models import Appointment, Doctor, MedicalRecord, Patient, User, patient_relations
+from backend.utils.access_cache import (
+    get_doctor_appointment_patient_ids, get_doctor_record_patient_ids, get_user_patient_ids
+)
+
+
+@pytest.fixture
+def ids(app, make_user):
+    """一个用户、两名医生、两个病人"""
+    user_id = make_user('user1')
+    with app.app_context():
+        doctors = [Doctor(doctor_no=f'D{i}', name=f'医生{i}') for i in range(2)]
+        patients = [Patient(patient_no=f'P{i}', name=f'病人{i}', gender='男') for i in range(2)]
+        db.session.add_all(doctors + patients)
+        db.session.commit()
+        return {'user': user_id, 'doctors': [d.id for d in doctors], 'patients': [p.id for p in patients]}
+
+
+def test_user_patients_are_cached_until_the_user_changes(app, ids):
+    first, second = ids['patients']
+    with app.app_context():
+        assert get_user_patient_ids(ids['user']) == frozenset()
+
+        # 绕过 ORM 直接写关联表：不触发失效，读到的仍是缓存
+        db.session.execute(insert(patient_relations).values(user_id=ids['user'], patient_id=first))
+        db.session.commit()
+        assert get_user_patient_ids(ids['user']) == frozenset()
+
+        # 通过 User.managed_patients 修改：提交后失效
+        user = db.session.get(User, ids['user'])
+        user.managed_patients.append(db.session.get(Patient, second))
+        db.session.commit()
+        assert get_user_patient_ids(ids['user']) == {first, second}
+
+
+def test_removing_a_family_member_invalidates(app, ids):
+    patient_id = ids['patients'][0]
+    with app.app_context():
+        user = db.session.get(User, ids['user'])
+        user.managed_patients.append(db.session.get(Patient, patient_id))
+        db.session.commit()
+        assert get_user_patient_ids(ids['user']) == {patient_id}
+
+        user.managed_patients.remove(db.session.get(Patient, patient_id))
+        db.session.commit()
+        assert get_user_patient_ids(ids['user']) == frozenset()
+
+
+def test_rolled_back_changes_do_not_invalidate(app, ids):
+    patient_id = ids['patients'][0]
+    with app.app_context():
+        assert get_user_patient_ids(ids['user']) == frozenset()
+        db.session.execute(insert(patient_relations).values(user_id=ids['user'], patient_id=patient_id))
+        db.session.commit()
+
+        user = db.session.get(User, ids['user'])
+        user.managed_patients.append(db.session.get(Patient, ids['patients'][1]))
+        db.session.flush()
+        db.session.rollback()
+
+        assert get_user_patient_ids(ids['user']) == frozenset()
+
+
+def test_reassigning_an_appointment_invalidates_both_doctors(app, ids):
+    old_doctor, new_doctor = ids['doctors']
+    patient_id = ids['patients'][0]
+    with app.app_context():
+        appointment = Appointment(appointment_no='A1', patient_id=patient_id, doctor_id=old_doctor,
+                                  appointment_date=date(2026, 1, 1))
+        db.session.add(appointment)
+        db.session.commit()
+        assert get_doctor_appointment_patient_ids(old_doctor) == {patient_id}
+        assert get_doctor_appointment_patient_ids(new_doctor) == frozenset()
+
+        appointment.doctor_id = new_doctor
+        db.session.commit()
+
+        assert get_doctor_appointment_patient_ids(old_doctor) == frozenset()
+        assert get_doctor_appointment_patient_ids(new_doctor) == {patient_id}
+
+
+def test_deleting_a_medical_record_invalidates(app, ids):
+    doctor_id = ids['doctors'][0]
+    patient_id = ids['patients'][0]
+    with app.app_context():
+        assert get_doctor_record_patient_ids(doctor_id) == frozenset()
+        record = MedicalRecord(patient_id=patient_id, doctor_id=doctor_id)
+        db.session.add(record)
+        db.session.commit()
+        assert get_doctor_record_patient_ids(doctor_id) == {patient_id}
+
+        db.session.delete(record)
+        db.session.commit()
+        assert get_doctor_record_patient_ids(doctor_id) == frozenset()
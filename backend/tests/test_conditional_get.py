@@ -0,0 +1,134 @@
+"""
+条件请求（ETag / 304）与响应压缩
+"""
+import gzip
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from backend.extensions import db
+from backend.models import Medicine, MedicineInventory
+from backend.tests.conftest import bearer
+
+
+MEDICINES_URL = '/api/pharmacy/medicines'
+
+
+@pytest.fixture
+def medicines(app):
+    """更新时间早于 RECENT_WRITE_SECONDS 的药品与库存（走行版本预检）"""
+    earlier = datetime.utcnow() - timedelta(minutes=5)
+    with app.app_context():
+        items = [Medicine(medicine_no=f'M{i}', name=f'药品{i}', price=1, updated_at=earlier) for i in range(3)]
+        db.session.add_all(items)
+        db.session.flush()
+        db.session.add_all(MedicineInventory(medicine_id=m.id, quantity=10, updated_at=earlier) for m in items)
+        db.session.commit()
+        return [m.id for m in items]
+
+
+@pytest.fixture
+def statements(app):
+    """记录执行的 SQL 语句数"""
+    executed = []
+
+    def count(*args):
+        executed.append(args[2])
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', count)
+    yield executed
+    event.remove(engine, 'before_cursor_execute', count)
+
+
+def test_row_version_etag_headers(client, medicines):
+    response = client.get(MEDICINES_URL)
+
+    assert response.status_code == 200
+    etag, weak = response.get_etag()
+    assert etag and weak
+    assert response.last_modified is not None
+    assert response.cache_control.private and response.cache_control.no_cache
+
+
+def test_matching_row_version_returns_304_without_running_the_view(client, medicines, statements):
+    etag = client.get(MEDICINES_URL).headers['ETag']
+    statements.clear()
+
+    response = client.get(MEDICINES_URL, headers={'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+    # 只执行行版本聚合查询
+    assert len(statements) == 1
+
+
+def test_row_version_etag_depends_on_query_string(client, medicines):
+    etag = client.get(MEDICINES_URL).headers['ETag']
+
+    response = client.get(MEDICINES_URL, query_string={'page': 2}, headers={'If-None-Match': etag})
+
+    assert response.status_code == 200
+
+
+def test_deleting_a_row_changes_the_etag(app, client, medicines):
+    etag = client.get(MEDICINES_URL).headers['ETag']
+    with app.app_context():
+        # 删除不会改变最大 updated_at，行数变化仍使 ETag 失效
+        MedicineInventory.query.filter_by(medicine_id=medicines[-1]).delete()
+        db.session.delete(db.session.get(Medicine, medicines[-1]))
+        db.session.commit()
+
+    response = client.get(MEDICINES_URL, headers={'If-None-Match': etag})
+
+    assert response.status_code == 200
+    assert len(response.get_json()['data']['items']) == 2
+
+
+def test_recent_write_falls_back_to_body_etag(app, client, medicines):
+    etag = client.get(MEDICINES_URL).headers['ETag']
+    with app.app_context():
+        db.session.get(Medicine, medicines[0]).price = 2
+        db.session.commit()
+
+    changed = client.get(MEDICINES_URL, headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+    # 同一秒内的修改：按响应体计算的 ETag 仍可返回 304
+    repeated = client.get(MEDICINES_URL, headers={'If-None-Match': changed.headers['ETag']})
+    assert repeated.status_code == 304
+
+
+def test_body_etag_for_other_json_responses(client, make_user, login):
+    make_user('user1')
+    headers = bearer(login('user1')['access_token'])
+    first = client.get('/api/auth/me', headers=headers)
+
+    response = client.get('/api/auth/me', headers={**headers, 'If-None-Match': first.headers['ETag']})
+
+    assert first.get_etag()[1] is True
+    assert response.status_code == 304
+
+
+def test_conditional_get_can_be_disabled(app, client, medicines):
+    app.config['CONDITIONAL_GET_ENABLED'] = False
+
+    response = client.get(MEDICINES_URL)
+
+    assert response.status_code == 200
+    assert 'ETag' not in response.headers
+
+
+def test_large_json_is_gzipped_with_a_weak_etag(client, medicines):
+    plain = client.get(MEDICINES_URL)
+    response = client.get(MEDICINES_URL, headers={'Accept-Encoding': 'gzip'})
+
+    assert len(plain.data) >= 1024
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.vary
+    assert gzip.decompress(response.data) == plain.data
+    assert response.get_etag()[1] is True
@@ -0,0 +1,161 @@
+"""
+读写分离路由（主库与只读副本为两个 SQLite 文件）
+"""
+import time
+
+import pytest
+from flask import request
+from sqlalchemy import text
+
+from backend.extensions import db
+from backend.models import Medicine
+from backend.tests.conftest import UnitTestConfig, create_test_app
+from backend.utils import db_router
+
+
+STICKY_SECONDS = 5
+PRIMARY = ['primary']
+REPLICA = ['replica']
+
+
+def _names():
+    return sorted(name for name, in db.session.query(Medicine.name))
+
+
+def _add_probe_routes(app):
+    """按返回的药品名称判断查询落在哪个库"""
+
+    @app.route('/_probe', methods=['GET', 'POST'])
+    def probe():
+        if request.method == 'POST':
+            db.session.add(Medicine(medicine_no='W1', name='written', price=1))
+            db.session.commit()
+        return {'names': _names()}
+
+    @app.route('/_probe/for-update')
+    def probe_for_update():
+        return {'names': sorted(name for name, in db.session.query(Medicine.name).with_for_update())}
+
+    @app.route('/_probe/raw')
+    def probe_raw():
+        return {'names': sorted(name for name, in db.session.execute(text('SELECT name FROM medicines')))}
+
+    @app.route('/_probe/primary-only')
+    @db_router.primary_only
+    def probe_primary_only():
+        return {'names': _names()}
+
+    @app.route('/_probe/primary-block')
+    def probe_primary_block():
+        with db_router.primary():
+            inside = _names()
+        return {'names': inside, 'after': _names()}
+
+
+def _make_app(tmp_path, replica=True):
+    class RoutedConfig(UnitTestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'primary.db'}"
+        SQLALCHEMY_REPLICA_URI = f"sqlite:///{tmp_path / 'replica.db'}" if replica else None
+        REPLICA_STICKY_SECONDS = STICKY_SECONDS
+
+    app = create_test_app(RoutedConfig)
+    _add_probe_routes(app)
+    with app.app_context():
+        db.session.add(Medicine(medicine_no='P1', name='primary', price=1))
+        db.session.commit()
+        replica_engine = db.engines.get(db_router.REPLICA_BIND_KEY)
+        if replica_engine is not None:
+            # 副本的表结构与数据单独初始化：内容不同，便于区分读取落在哪个库
+            db.metadata.create_all(replica_engine)
+            with replica_engine.begin() as connection:
+                connection.execute(Medicine.__table__.insert().values(medicine_no='R1', name='replica', price=1))
+    return app
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = _make_app(tmp_path)
+    yield app
+    with app.app_context():
+        db.drop_all(bind_key=None)
+        db.engine.dispose()
+        db.engines[db_router.REPLICA_BIND_KEY].dispose()
+
+
+def _get(client, path='/_probe', **kwargs):
+    return client.get(path, **kwargs).get_json()['names']
+
+
+def test_get_reads_the_replica(client):
+    assert _get(client) == REPLICA
+
+
+def test_post_writes_the_primary_and_reads_after_the_write_stay_there(app, client):
+    response = client.post('/_probe')
+
+    assert response.get_json()['names'] == ['primary', 'written']
+    assert db_router.STICKY_COOKIE in response.headers.get('Set-Cookie', '')
+
+
+def test_reads_stick_to_the_primary_via_cookie(app, client):
+    client.post('/_probe')
+
+    # 同一客户端（带 db_primary_until Cookie）在粘滞期内读主库
+    assert _get(client) == ['primary', 'written']
+    # 其他客户端仍读副本
+    assert _get(app.test_client()) == REPLICA
+
+
+def test_reads_stick_to_the_primary_via_authorization(app):
+    headers = {'Authorization': 'Bearer token-a'}
+    app.test_client().post('/_probe', headers=headers)
+
+    # 新的客户端（没有 Cookie，如另一个标签页中的 API 调用）按 Authorization 摘要识别
+    assert _get(app.test_client(), headers=headers) == ['primary', 'written']
+    assert _get(app.test_client(), headers={'Authorization': 'Bearer token-b'}) == REPLICA
+
+
+def test_stickiness_expires(app, client, monkeypatch):
+    headers = {'Authorization': 'Bearer token-a'}
+    client.post('/_probe', headers=headers)
+    later = time.time() + STICKY_SECONDS + 1
+    monkeypatch.setattr(db_router.time, 'time', lambda: later)
+
+    assert _get(client, headers=headers) == REPLICA
+
+
+@pytest.mark.parametrize('path', ['/_probe/for-update', '/_probe/raw'])
+def test_locking_reads_and_raw_sql_are_treated_as_writes(client, path):
+    assert _get(client, path) == PRIMARY
+    # 可能写入，之后的读取同样读主库
+    assert _get(client) == PRIMARY
+
+
+def test_primary_only_view_uses_the_primary(client):
+    assert _get(client, '/_probe/primary-only') == PRIMARY
+
+
+def test_primary_block_only_affects_reads_inside_it(client):
+    data = client.get('/_probe/primary-block').get_json()
+
+    assert data['names'] == PRIMARY
+    assert data['after'] == REPLICA
+
+
+def test_primary_reads_do_not_make_the_client_sticky(client):
+    _get(client, '/_probe/primary-only')
+
+    assert _get(client) == REPLICA
+
+
+def test_without_a_replica_everything_uses_the_primary(tmp_path):
+    app = _make_app(tmp_path, replica=False)
+    client = app.test_client()
+
+    assert db_router.REPLICA_BIND_KEY not in (app.config.get('SQLALCHEMY_BINDS') or {})
+    assert _get(client) == PRIMARY
+    assert client.post('/_probe').get_json()['names'] == ['primary', 'written']
+    assert db_router.STICKY_COOKIE not in client.post('/_probe/raw').headers.get('Set-Cookie', '')
+    with app.app_context():
+        db.drop_all(bind_key=None)
+        db.engine.dispose()
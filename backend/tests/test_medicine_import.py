@@ -0,0 +1,55 @@
+"""
+药品目录导入：CSV编码识别
+"""
+import io
+
+import pytest
+
+from backend.extensions import db
+from backend.models import Medicine
+
+
+IMPORT_URL = '/api/pharmacy/medicines/import'
+HEADER = '药品编号,药品名称,药品分类,单价,库存数量\n'
+
+
+def _csv(rows):
+    return HEADER + ''.join(f'M{i:05d},药品{i},抗生素,1.5,10\n' for i in range(rows))
+
+
+def _upload(client, data: bytes, **form):
+    return client.post(IMPORT_URL, data={'file': (io.BytesIO(data), 'medicines.csv'), **form},
+                       content_type='multipart/form-data')
+
+
+def _names(app):
+    with app.app_context():
+        return {name for name, in db.session.query(Medicine.name)}
+
+
+@pytest.mark.parametrize('encoding', ['utf-8', 'utf-8-sig', 'gbk', 'gb18030'])
+def test_csv_encodings_are_detected(app, client, encoding):
+    response = _upload(client, _csv(3).encode(encoding))
+
+    assert response.status_code == 200
+    assert response.get_json()['data']['created'] == 3
+    assert _names(app) == {'药品0', '药品1', '药品2'}
+
+
+def test_gbk_file_larger_than_the_read_buffer(app, client):
+    # 远大于 TextIOWrapper 读缓冲区且分多个批次写入
+    response = _upload(client, _csv(3000).encode('gbk'), chunk_size='500')
+
+    assert response.status_code == 200
+    assert response.get_json()['data']['created'] == 3000
+
+
+def test_undecodable_file_is_rejected_before_any_chunk_is_written(app, client):
+    # 前面的行都是合法的UTF-8，非法字节出现在文件末尾
+    data = _csv(3000).encode('utf-8') + b'M99999,\xff\x80,x,1,1\n'
+
+    response = _upload(client, data, chunk_size='500')
+
+    assert response.status_code == 400
+    assert 'UTF-8' in response.get_json()['message']
+    assert _names(app) == set()
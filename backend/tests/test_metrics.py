@@ -0,0 +1,49 @@
+"""
+/metrics 接口的访问控制
+"""
+import pytest
+
+from backend.extensions import db
+from backend.tests.conftest import UnitTestConfig, create_test_app
+
+
+def _client(config_class):
+    app = create_test_app(config_class)
+    yield app.test_client()
+    with app.app_context():
+        db.drop_all(bind_key=None)
+
+
+@pytest.fixture
+def required_without_token():
+    class Config(UnitTestConfig):
+        METRICS_REQUIRE_TOKEN = True
+        METRICS_TOKEN = None
+    yield from _client(Config)
+
+
+@pytest.fixture
+def with_token():
+    class Config(UnitTestConfig):
+        METRICS_REQUIRE_TOKEN = True
+        METRICS_TOKEN = 'scrape-token'
+    yield from _client(Config)
+
+
+def test_metrics_is_not_exposed_when_a_token_is_required_but_unset(required_without_token):
+    assert required_without_token.get('/metrics').status_code == 404
+
+
+def test_metrics_requires_the_bearer_token(with_token):
+    assert with_token.get('/metrics').status_code == 401
+    assert with_token.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+
+    response = with_token.get('/metrics', headers={'Authorization': 'Bearer scrape-token'})
+    assert response.status_code == 200
+    assert b'hms_http_request_duration_seconds' in response.data
+
+
+def test_production_requires_a_metrics_token():
+    from backend.config import ProductionConfig
+
+    assert ProductionConfig.METRICS_REQUIRE_TOKEN is True
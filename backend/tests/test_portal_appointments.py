@@ -0,0 +1,48 @@
+"""
+病人端：可管理病人的预约列表
+"""
+from datetime import datetime, timedelta
+
+from backend.extensions import db
+from backend.models import Appointment, Doctor, Patient, User
+from backend.tests.conftest import bearer
+
+
+def _setup(app, user_id, count):
+    with app.app_context():
+        doctor = Doctor(doctor_no='D1', name='张医生')
+        patient = Patient(patient_no='P1', name='病人', gender='男')
+        db.session.add_all([doctor, patient])
+        db.session.flush()
+        db.session.get(User, user_id).managed_patients.append(patient)
+        start = datetime(2026, 1, 1, 9)
+        db.session.add_all(
+            Appointment(appointment_no=f'A{i}', patient_id=patient.id, doctor_id=doctor.id,
+                        appointment_date=start + timedelta(days=i))
+            for i in range(count)
+        )
+        db.session.commit()
+
+
+def test_paginated_appointments_use_the_items_key(app, client, make_user, login):
+    user_id = make_user('user1')
+    _setup(app, user_id, 3)
+    headers = bearer(login('user1')['access_token'])
+
+    data = client.get('/api/patient/portal/appointments', query_string={'page': 1, 'per_page': 2},
+                      headers=headers).get_json()['data']
+
+    assert len(data['items']) == 2
+    assert data['total'] == 3
+    assert data['pages'] == 2
+    assert data['items'][0]['patient_name'] == '病人'
+
+
+def test_without_page_all_appointments_are_returned(app, client, make_user, login):
+    user_id = make_user('user1')
+    _setup(app, user_id, 3)
+    headers = bearer(login('user1')['access_token'])
+
+    data = client.get('/api/patient/portal/appointments', headers=headers).get_json()['data']
+
+    assert len(data) == 3
@@ -0,0 +1,157 @@
+"""
+请求级当前用户（Principal）
+"""
+from datetime import datetime
+
+import pytest
+from flask_jwt_extended import create_access_token, verify_jwt_in_request
+
+from backend.extensions import db
+from backend.models import Appointment, Doctor, DoctorUserLink, MedicalRecord, Patient, PatientUserLink, User
+from backend.tests.conftest import bearer
+from backend.utils import principal as principal_module
+from backend.utils.principal import get_current_principal, get_principal
+
+
+def _patient(patient_no):
+    patient = Patient(patient_no=patient_no, name=f'病人{patient_no}', gender='男')
+    db.session.add(patient)
+    db.session.flush()
+    return patient
+
+
+@pytest.fixture
+def current(app):
+    """在携带指定令牌的请求上下文中返回当前 Principal"""
+    def _current(token):
+        with app.test_request_context(headers=bearer(token)):
+            verify_jwt_in_request()
+            return get_current_principal()
+    return _current
+
+
+def test_patient_user_principal_comes_from_claims(app, make_user, login, current):
+    user_id = make_user('user1')
+    with app.app_context():
+        own = _patient('P1')
+        db.session.add(PatientUserLink(user_id=user_id, patient_id=own.id))
+        db.session.commit()
+        own_id = own.id
+
+    principal = current(login('user1')['access_token'])
+
+    assert (principal.user_id, principal.role, principal.patient_id) == (user_id, 'user', own_id)
+    assert principal.doctor_id is None
+    # 用户对象在首次访问 .user 时才加载
+    assert principal._user is None
+
+
+def test_family_members_are_managed(app, make_user, login):
+    user_id = make_user('user1')
+    with app.app_context():
+        own, relative, stranger = _patient('P1'), _patient('P2'), _patient('P3')
+        user = db.session.get(User, user_id)
+        user.managed_patients.extend([own, relative])
+        db.session.commit()
+        ids = own.id, relative.id, stranger.id
+    token = login('user1')['access_token']
+
+    with app.test_request_context(headers=bearer(token)):
+        verify_jwt_in_request()
+        principal = get_current_principal()
+
+        assert principal.managed_patient_ids == {ids[0], ids[1]}
+        assert principal.can_manage(ids[1])
+        # 路由参数与 JSON 中的字符串ID同样可以判断
+        assert principal.can_manage(str(ids[1]))
+        assert not principal.can_manage(ids[2])
+        assert not principal.can_manage('abc')
+        assert not principal.can_manage(None)
+
+
+def test_doctor_principal_checks_appointments_and_records(app, make_user, login):
+    user_id = make_user('doctor1', role='doctor')
+    with app.app_context():
+        doctor = Doctor(doctor_no='D1', name='张医生')
+        db.session.add(doctor)
+        db.session.flush()
+        db.session.add(DoctorUserLink(user_id=user_id, doctor_id=doctor.id))
+        booked, treated, other = _patient('P1'), _patient('P2'), _patient('P3')
+        db.session.add_all([
+            Appointment(appointment_no='A1', patient_id=booked.id, doctor_id=doctor.id,
+                        appointment_date=datetime(2026, 1, 1, 9)),
+            MedicalRecord(patient_id=treated.id, doctor_id=doctor.id),
+        ])
+        db.session.commit()
+        doctor_id, ids = doctor.id, (booked.id, treated.id, other.id)
+    token = login('doctor1')['access_token']
+
+    with app.test_request_context(headers=bearer(token)):
+        verify_jwt_in_request()
+        principal = get_current_principal()
+
+        assert principal.doctor_id == doctor_id
+        assert principal.has_appointment_with(ids[0]) and not principal.has_record_with(ids[0])
+        assert principal.has_record_with(ids[1]) and not principal.has_appointment_with(ids[1])
+        assert not principal.has_appointment_with(ids[2]) and not principal.has_record_with(ids[2])
+
+
+def test_non_doctor_has_no_doctor_relations(app, make_user, login, current):
+    make_user('user1')
+
+    principal = current(login('user1')['access_token'])
+
+    assert principal.has_appointment_with(1) is False
+    assert principal.has_record_with(1) is False
+
+
+def test_principal_is_loaded_once_per_request(app, make_user, monkeypatch):
+    user_id = make_user('user1')
+    calls = []
+    load = principal_module.load_principal
+
+    def counting_load(uid):
+        calls.append(uid)
+        return load(uid)
+
+    monkeypatch.setattr(principal_module, 'load_principal', counting_load)
+
+    with app.test_request_context():
+        first = get_principal(user_id)
+        # JWT 中的 sub 为字符串，同样命中缓存
+        assert get_principal(str(user_id)) is first
+        assert first.user.username == 'user1'
+    assert calls == [user_id]
+
+    with app.test_request_context():
+        assert get_principal(user_id) is not first
+    assert calls == [user_id, user_id]
+
+
+def test_current_principal_is_cached_for_the_request(app, make_user, login):
+    make_user('user1')
+    token = login('user1')['access_token']
+
+    with app.test_request_context(headers=bearer(token)):
+        verify_jwt_in_request()
+        assert get_current_principal() is get_current_principal()
+
+
+def test_token_without_version_falls_back_to_the_database(app, make_user):
+    user_id = make_user('nurse1', role='nurse')
+
+    with app.test_request_context():
+        token = create_access_token(identity=str(user_id))
+    with app.test_request_context(headers=bearer(token)):
+        verify_jwt_in_request()
+        principal = get_current_principal()
+
+        assert principal.role == 'nurse'
+        # 回退路径查询时已一并取出用户对象
+        assert principal._user is not None
+
+
+def test_unknown_user_has_no_principal(app):
+    with app.test_request_context():
+        assert get_principal(999) is None
+        assert get_principal('not-an-id') is None
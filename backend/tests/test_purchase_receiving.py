@@ -0,0 +1,158 @@
+"""
+采购收货：批量入库与幂等重试
+"""
+import pytest
+
+from backend.extensions import db
+from backend.models import Medicine, MedicineInventory, MedicinePurchase, PurchaseReceipt
+
+
+@pytest.fixture
+def purchases(app):
+    """两种药品、三张待收货采购单（药品A两张各10盒，药品B一张5盒），药品A已有库存3盒"""
+    with app.app_context():
+        medicine_a = Medicine(medicine_no='MA', name='药品A', price=1)
+        medicine_b = Medicine(medicine_no='MB', name='药品B', price=2)
+        db.session.add_all([medicine_a, medicine_b])
+        db.session.flush()
+        db.session.add(MedicineInventory(medicine_id=medicine_a.id, quantity=3))
+        orders = [
+            MedicinePurchase(purchase_no=f'PO-T{i}', medicine_id=medicine.id, quantity=quantity,
+                             unit_price=1, total_price=quantity)
+            for i, (medicine, quantity) in enumerate([(medicine_a, 10), (medicine_a, 10), (medicine_b, 5)])
+        ]
+        db.session.add_all(orders)
+        db.session.commit()
+        return {'a': medicine_a.id, 'b': medicine_b.id, 'ids': [o.id for o in orders]}
+
+
+def _items(ids, batch_no='B1'):
+    return [
+        {'purchase_id': pid, 'batch_no': batch_no, 'production_date': '2026-01-01', 'expiry_date': '2028-01-01'}
+        for pid in ids
+    ]
+
+
+def _stock(app, medicine_id):
+    with app.app_context():
+        return db.session.query(MedicineInventory.quantity).filter_by(medicine_id=medicine_id).scalar()
+
+
+def _statuses(app):
+    with app.app_context():
+        return {status for status, in db.session.query(MedicinePurchase.status)}
+
+
+def _receipt_count(app):
+    with app.app_context():
+        return PurchaseReceipt.query.count()
+
+
+def test_bulk_receive_aggregates_inventory_per_medicine(app, client, purchases):
+    response = client.post('/api/pharmacy/purchase-orders/receive', json={'items': _items(purchases['ids'])})
+
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert data['received'] == 3
+    assert data['replayed'] is False
+    assert _stock(app, purchases['a']) == 23
+    # 没有库存记录的药品新建一条
+    assert _stock(app, purchases['b']) == 5
+    assert _statuses(app) == {'completed'}
+
+
+def test_retry_with_same_idempotency_key_replays_first_result(app, client, purchases):
+    body = {'items': _items(purchases['ids']), 'idempotency_key': 'arrival-1'}
+    first = client.post('/api/pharmacy/purchase-orders/receive', json=body)
+    retry = client.post('/api/pharmacy/purchase-orders/receive', json=body)
+
+    assert first.status_code == retry.status_code == 200
+    replayed = retry.get_json()['data']
+    assert replayed['replayed'] is True
+    assert replayed['inventory'] == first.get_json()['data']['inventory']
+    # 不会重复入库
+    assert _stock(app, purchases['a']) == 23
+    assert _receipt_count(app) == 1
+
+
+def test_idempotency_key_from_header(app, client, purchases):
+    body = {'items': _items(purchases['ids'][:1])}
+    headers = {'Idempotency-Key': 'arrival-2'}
+    client.post('/api/pharmacy/purchase-orders/receive', json=body, headers=headers)
+    retry = client.post('/api/pharmacy/purchase-orders/receive', json=body, headers=headers)
+
+    assert retry.get_json()['data']['replayed'] is True
+    assert _stock(app, purchases['a']) == 13
+
+
+def test_reusing_key_with_different_items_is_a_conflict(app, client, purchases):
+    client.post('/api/pharmacy/purchase-orders/receive',
+                json={'items': _items(purchases['ids'][:1]), 'idempotency_key': 'arrival-3'})
+    response = client.post('/api/pharmacy/purchase-orders/receive',
+                           json={'items': _items(purchases['ids'][:1], batch_no='B2'), 'idempotency_key': 'arrival-3'})
+
+    assert response.status_code == 409
+    assert response.get_json()['code'] == 'IDEMPOTENCY_KEY_CONFLICT'
+    assert _stock(app, purchases['a']) == 13
+
+
+def test_receiving_again_without_key_is_rejected(app, client, purchases):
+    body = {'items': _items(purchases['ids'][:1])}
+    client.post('/api/pharmacy/purchase-orders/receive', json=body)
+    response = client.post('/api/pharmacy/purchase-orders/receive', json=body)
+
+    assert response.status_code == 400
+    assert response.get_json()['code'] == 'INVALID_PURCHASE_STATUS'
+    assert _stock(app, purchases['a']) == 13
+
+
+def test_batch_is_all_or_nothing(app, client, purchases):
+    missing_id = max(purchases['ids']) + 100
+    response = client.post('/api/pharmacy/purchase-orders/receive',
+                           json={'items': _items(purchases['ids'] + [missing_id])})
+
+    assert response.status_code == 404
+    assert response.get_json()['code'] == 'PURCHASE_NOT_FOUND'
+    assert _stock(app, purchases['a']) == 3
+    assert _statuses(app) == {'pending'}
+
+
+def test_duplicate_purchase_in_one_request_is_rejected(app, client, purchases):
+    pid = purchases['ids'][0]
+    response = client.post('/api/pharmacy/purchase-orders/receive', json={'items': _items([pid, pid])})
+
+    assert response.status_code == 400
+    assert response.get_json()['code'] == 'DUPLICATE_PURCHASE_ID'
+
+
+def test_single_receive_requires_dates(app, client, purchases):
+    response = client.post(f"/api/pharmacy/purchase-orders/{purchases['ids'][0]}/receive", json={'batch_no': 'B1'})
+
+    assert response.status_code == 400
+    assert response.get_json()['code'] == 'MISSING_DATE_FIELD'
+
+
+def test_numeric_batch_no_is_stored_as_text(app, client, purchases):
+    items = [{**_items(purchases['ids'][:1])[0], 'batch_no': 12345}]
+
+    response = client.post('/api/pharmacy/purchase-orders/receive', json={'items': items})
+
+    assert response.status_code == 200
+    with app.app_context():
+        assert db.session.get(MedicinePurchase, purchases['ids'][0]).batch_no == '12345'
+
+
+@pytest.mark.parametrize('field, value, code', [
+    ('batch_no', ['B1'], 'INVALID_BATCH_NO'),
+    ('batch_no', 'B' * 51, 'INVALID_BATCH_NO'),
+    ('production_date', 20260101, 'INVALID_DATE_FORMAT'),
+    ('expiry_date', {'year': 2028}, 'INVALID_DATE_FORMAT'),
+])
+def test_malformed_item_fields_are_rejected(app, client, purchases, field, value, code):
+    items = [{**_items(purchases['ids'][:1])[0], field: value}]
+
+    response = client.post('/api/pharmacy/purchase-orders/receive', json={'items': items})
+
+    assert response.status_code == 400
+    assert response.get_json()['code'] == code
+    assert _stock(app, purchases['a']) == 3
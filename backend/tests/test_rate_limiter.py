@@ -0,0 +1,156 @@
+"""
+登录与添加家庭成员的失败次数限流
+"""
+import pytest
+
+from backend.extensions import db
+from backend.tests.conftest import PASSWORD, UnitTestConfig, bearer, create_test_app
+from backend.utils.rate_limiter import LocalRateLimitBackend, SlidingWindowLimiter
+
+
+WINDOW = 60
+
+
+@pytest.fixture
+def limiter():
+    return SlidingWindowLimiter('test', limit=5, window=WINDOW, backend=LocalRateLimitBackend())
+
+
+def _fail_login(client, username, ip=None):
+    headers = {'X-Forwarded-For': ip} if ip else {}
+    return client.post('/api/auth/login', json={'username': username, 'password': 'wrong'}, headers=headers)
+
+
+def test_limit_is_reached_within_one_window(limiter):
+    start = 10 * WINDOW
+    for i in range(4):
+        limiter.hit('k', now=start + i)
+    assert limiter.retry_after('k', now=start + 5) == 0
+
+    limiter.hit('k', now=start + 5)
+    # 当前桶已满：需等到下一个窗口
+    assert limiter.retry_after('k', now=start + 5) == WINDOW - 5
+
+
+def test_previous_window_is_weighted_by_remaining_overlap(limiter):
+    start = 10 * WINDOW
+    for _ in range(5):
+        limiter.hit('k', now=start + WINDOW - 1)
+    limiter.hit('k', now=start + WINDOW + 1)
+
+    # 刚进入下一个窗口时，上一个桶几乎全额计入：5 * 59/60 + 1 超限
+    assert limiter.retry_after('k', now=start + WINDOW + 1) > 0
+    # 上一个桶的权重线性衰减：经过 1/5 窗口后估算值降到 5 次以下
+    assert limiter.retry_after('k', now=start + WINDOW + WINDOW // 5 + 1) == 0
+    # 两个窗口之后完全清零
+    assert limiter.retry_after('k', now=start + 3 * WINDOW) == 0
+
+
+def test_retry_after_matches_the_decay(limiter):
+    start = 10 * WINDOW
+    for _ in range(5):
+        limiter.hit('k', now=start + WINDOW - 1)
+    limiter.hit('k', now=start + WINDOW + 1)
+
+    now = start + WINDOW + 1
+    wait = limiter.retry_after('k', now=now)
+    assert limiter.retry_after('k', now=now + wait - 1) > 0
+    assert limiter.retry_after('k', now=now + wait + 1) == 0
+
+
+def test_reset_clears_both_buckets(limiter):
+    start = 10 * WINDOW
+    for _ in range(5):
+        limiter.hit('k', now=start + WINDOW - 1)
+    limiter.hit('k', now=start + WINDOW + 1)
+    limiter.reset('k', now=start + WINDOW + 1)
+
+    assert limiter.retry_after('k', now=start + WINDOW + 1) == 0
+
+
+def test_login_is_throttled_per_username_before_checking_the_password(client, make_user):
+    make_user('user1')
+    for _ in range(UnitTestConfig.LOGIN_RATE_LIMIT_PER_USERNAME):
+        assert _fail_login(client, 'user1').status_code == 401
+
+    response = client.post('/api/auth/login', json={'username': 'user1', 'password': PASSWORD})
+
+    assert response.status_code == 429
+    assert response.get_json()['code'] == 'TOO_MANY_ATTEMPTS'
+    assert int(response.headers['Retry-After']) > 0
+
+
+def test_successful_login_resets_the_username_counter(client, make_user, login):
+    make_user('user1')
+    for _ in range(UnitTestConfig.LOGIN_RATE_LIMIT_PER_USERNAME - 1):
+        _fail_login(client, 'user1')
+    login('user1')
+
+    for _ in range(UnitTestConfig.LOGIN_RATE_LIMIT_PER_USERNAME - 1):
+        assert _fail_login(client, 'user1').status_code == 401
+    login('user1')
+
+
+def test_login_is_throttled_per_ip_across_usernames(client, make_user):
+    make_user('user1')
+    for i in range(UnitTestConfig.LOGIN_RATE_LIMIT_PER_IP):
+        _fail_login(client, f'nobody{i}')
+
+    response = client.post('/api/auth/login', json={'username': 'user1', 'password': PASSWORD})
+
+    assert response.status_code == 429
+
+
+def test_forwarded_for_is_ignored_without_a_trusted_proxy(client, make_user):
+    make_user('user1')
+    # 未配置代理层数时，客户端无法通过伪造 X-Forwarded-For 绕过按 IP 限流
+    for i in range(UnitTestConfig.LOGIN_RATE_LIMIT_PER_IP):
+        _fail_login(client, f'nobody{i}', ip=f'10.0.0.{i}')
+
+    response = client.post('/api/auth/login', json={'username': 'user1', 'password': PASSWORD},
+                           headers={'X-Forwarded-For': '10.0.1.1'})
+
+    assert response.status_code == 429
+
+
+class ProxiedConfig(UnitTestConfig):
+    PROXY_FIX_X_FOR = 1
+
+
+class TestBehindProxy:
+    @pytest.fixture
+    def app(self):
+        app = create_test_app(ProxiedConfig)
+        yield app
+        with app.app_context():
+            db.drop_all(bind_key=None)
+
+    def test_each_client_ip_has_its_own_bucket(self, client, make_user):
+        make_user('user1')
+        for i in range(ProxiedConfig.LOGIN_RATE_LIMIT_PER_IP):
+            _fail_login(client, f'nobody{i}', ip='10.0.0.1')
+
+        blocked = client.post('/api/auth/login', json={'username': 'user1', 'password': PASSWORD},
+                              headers={'X-Forwarded-For': '10.0.0.1'})
+        allowed = client.post('/api/auth/login', json={'username': 'user1', 'password': PASSWORD},
+                              headers={'X-Forwarded-For': '10.0.0.2'})
+
+        assert blocked.status_code == 429
+        assert allowed.status_code == 200
+
+
+def test_add_family_member_is_throttled_per_username(client, make_user, login):
+    make_user('user1')
+    make_user('relative')
+    token = login('user1')['access_token']
+    body = {'username': 'relative', 'password': 'wrong'}
+
+    for _ in range(UnitTestConfig.FAMILY_MEMBER_RATE_LIMIT_PER_USERNAME):
+        assert client.post('/api/patient/portal/family-members/add', json=body,
+                           headers=bearer(token)).status_code == 400
+
+    response = client.post('/api/patient/portal/family-members/add',
+                           json={'username': 'relative', 'password': PASSWORD}, headers=bearer(token))
+
+    assert response.status_code == 429
+    assert 'Retry-After' in response.headers
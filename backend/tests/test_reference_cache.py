@@ -0,0 +1,47 @@
+"""
+参考数据缓存：共享值不可变、提交后失效
+"""
+import pytest
+
+from backend.extensions import db
+from backend.models import Doctor
+from backend.utils.reference_cache import get_doctor_departments, get_purchase_stats
+
+
+def _add_doctor(app, doctor_no, department):
+    with app.app_context():
+        db.session.add(Doctor(doctor_no=doctor_no, name='张医生', department=department))
+        db.session.commit()
+
+
+def test_cached_lists_cannot_be_modified_by_callers(app):
+    _add_doctor(app, 'D1', '内科')
+
+    with app.app_context():
+        departments = get_doctor_departments()
+        assert departments == ('内科',)
+        with pytest.raises(AttributeError):
+            departments.append('外科')
+        assert get_doctor_departments() is departments
+
+
+def test_cached_stats_are_read_only(app):
+    with app.app_context():
+        stats = get_purchase_stats()
+        with pytest.raises(TypeError):
+            stats['by_status']['pending'] = 99
+        assert stats['pending_count'] == 0
+
+
+def test_commit_invalidates_cached_departments(app, client):
+    _add_doctor(app, 'D1', '内科')
+    with app.app_context():
+        assert get_doctor_departments() == ('内科',)
+
+    _add_doctor(app, 'D2', '放射科')
+
+    with app.app_context():
+        assert sorted(get_doctor_departments()) == ['内科', '放射科']
+    names = [d['name'] for d in client.get('/api/doctor/departments').get_json()['data']]
+    assert names.count('放射科') == 1
+
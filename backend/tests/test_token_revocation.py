@@ -0,0 +1,128 @@
+"""
+令牌撤销列表与退出登录
+"""
+from datetime import datetime, timedelta
+
+from backend.extensions import db
+from backend.models import RevokedToken, User
+from backend.tests.conftest import bearer
+from backend.utils.token_revocation import BloomFilter, TokenRevocationList
+
+
+def _code(response):
+    return response.status_code, response.get_json()['code']
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    items = [f'jti-{i}' for i in range(1000)]
+    for item in items:
+        bloom.add(item)
+
+    assert all(item in bloom for item in items)
+    false_positives = sum(f'other-{i}' in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def test_logout_revokes_only_the_current_token(client, make_user, login):
+    make_user('user1')
+    first = login('user1')
+    second = login('user1')
+
+    assert client.post('/api/auth/logout', headers=bearer(first['access_token'])).status_code == 200
+
+    assert _code(client.get('/api/auth/me', headers=bearer(first['access_token']))) == (401, 'TOKEN_REVOKED')
+    assert client.get('/api/auth/me', headers=bearer(second['access_token'])).status_code == 200
+
+
+def test_logout_revokes_the_refresh_token_too(app, client, make_user, login):
+    make_user('user1')
+    tokens = login('user1')
+
+    response = client.post('/api/auth/logout', json={'refresh_token': tokens['refresh_token']},
+                           headers=bearer(tokens['access_token']))
+    assert response.status_code == 200
+
+    assert _code(client.post('/api/auth/refresh', headers=bearer(tokens['refresh_token']))) == (401, 'TOKEN_REVOKED')
+    with app.app_context():
+        assert {t for t, in db.session.query(RevokedToken.token_type)} == {'access', 'refresh'}
+
+
+def test_logout_rejects_another_users_refresh_token(client, make_user, login):
+    make_user('user1')
+    make_user('user2')
+    mine = login('user1')
+    theirs = login('user2')
+
+    response = client.post('/api/auth/logout', json={'refresh_token': theirs['refresh_token']},
+                           headers=bearer(mine['access_token']))
+
+    assert _code(response) == (400, 'INVALID_TOKEN')
+    assert client.post('/api/auth/refresh', headers=bearer(theirs['refresh_token'])).status_code == 200
+
+
+def test_revocations_from_other_processes_are_synced(app):
+    revocations = TokenRevocationList()
+    revocations.sync_interval = 0
+    expires_at = datetime.utcnow() + timedelta(hours=1)
+
+    with app.app_context():
+        assert revocations.is_revoked('remote-jti') is False
+        # 其他工作进程写入的撤销记录：本进程的布隆过滤器中没有
+        db.session.add(RevokedToken(jti='remote-jti', expires_at=expires_at))
+        db.session.commit()
+
+        assert revocations.is_revoked('remote-jti') is True
+
+
+def test_bloom_false_positive_falls_back_to_database(app):
+    revocations = TokenRevocationList()
+    revocations.sync_interval = 3600
+
+    with app.app_context():
+        revocations.is_revoked('warm-up')
+        # 模拟布隆过滤器误判：过滤器中有、共享存储与数据库中都没有
+        revocations._bloom.add('innocent-jti')
+
+        assert revocations.is_revoked('innocent-jti') is False
+        assert revocations.stats['db_lookups'] == 1
+
+
+def test_rebuild_is_read_only(app):
+    revocations = TokenRevocationList()
+    now = datetime.utcnow()
+
+    with app.app_context():
+        db.session.add_all([
+            RevokedToken(jti='expired-jti', expires_at=now - timedelta(minutes=1)),
+            RevokedToken(jti='live-jti', expires_at=now + timedelta(hours=1)),
+        ])
+        db.session.commit()
+        # 请求中尚未提交的修改：令牌检查触发的重建不能提交或回滚它
+        db.session.add(User(username='pending', email='pending@example.com'))
+
+        revocations._maybe_sync()
+
+        assert revocations.is_revoked('live-jti') is True
+        assert revocations.is_revoked('expired-jti') is False
+        assert len(db.session.new) == 1
+        db.session.rollback()
+        assert User.query.filter_by(username='pending').count() == 0
+        assert RevokedToken.query.count() == 2
+
+
+def test_purge_command_deletes_expired_records(app):
+    now = datetime.utcnow()
+    with app.app_context():
+        db.session.add_all([
+            RevokedToken(jti='expired-jti', expires_at=now - timedelta(minutes=1)),
+            RevokedToken(jti='live-jti', expires_at=now + timedelta(hours=1)),
+        ])
+        db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=['purge-revoked-tokens'])
+
+    assert result.exit_code == 0
+    assert '1' in result.output
+    with app.app_context():
+        assert [jti for jti, in db.session.query(RevokedToken.jti)] == ['live-jti']
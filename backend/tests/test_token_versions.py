@@ -0,0 +1,160 @@
+"""
+JWT 身份声明与令牌版本
+"""
+import pytest
+from flask_jwt_extended import decode_token
+
+from backend.extensions import db
+from backend.models import Doctor, DoctorUserLink
+from backend.tests.conftest import bearer
+
+
+DOCTOR_INFO = {'name': '张医生', 'gender': '男', 'department': '内科', 'title': '主治医师', 'phone': '13800000000'}
+
+
+@pytest.fixture
+def admin_headers(make_user, login):
+    make_user('admin1', role='admin')
+    return bearer(login('admin1')['access_token'])
+
+
+def _outdated(response):
+    return response.status_code == 401 and response.get_json()['code'] == 'TOKEN_OUTDATED'
+
+
+def _link_doctor(app, user_id, doctor_no):
+    with app.app_context():
+        doctor = Doctor(doctor_no=doctor_no, name='张医生')
+        db.session.add(doctor)
+        db.session.flush()
+        link = DoctorUserLink(user_id=user_id, doctor_id=doctor.id)
+        db.session.add(link)
+        db.session.commit()
+        return doctor.id, link.id
+
+
+def test_login_token_carries_identity_claims(app, make_user, login):
+    user_id = make_user('doctor1', role='doctor', department='内科')
+    doctor_id, _ = _link_doctor(app, user_id, 'D001')
+
+    with app.app_context():
+        claims = decode_token(login('doctor1')['access_token'])
+
+    assert claims['role'] == 'doctor'
+    assert claims['department'] == '内科'
+    assert claims['doctor_id'] == doctor_id
+    assert claims['patient_id'] is None
+    assert claims['pv'] == 0
+
+
+@pytest.mark.parametrize('change', [{'role': 'nurse'}, {'is_active': False}])
+def test_admin_role_or_status_change_invalidates_tokens(client, make_user, login, admin_headers, change):
+    user_id = make_user('staff1', role='doctor')
+    tokens = login('staff1')
+
+    response = client.put(f'/api/auth/users/{user_id}', json=change, headers=admin_headers)
+    assert response.status_code == 200
+
+    assert _outdated(client.get('/api/auth/me', headers=bearer(tokens['access_token'])))
+    assert _outdated(client.post('/api/auth/refresh', headers=bearer(tokens['refresh_token'])))
+
+
+def test_bulk_role_change_invalidates_tokens(client, make_user, login, admin_headers):
+    user_ids = [make_user(f'bulk{i}', role='user') for i in range(3)]
+    tokens = [login(f'bulk{i}')['access_token'] for i in range(3)]
+
+    response = client.post('/api/auth/users/bulk/role',
+                           json={'user_ids': user_ids[:2], 'role': 'nurse'}, headers=admin_headers)
+    assert response.status_code == 200
+
+    assert _outdated(client.get('/api/auth/me', headers=bearer(tokens[0])))
+    assert _outdated(client.get('/api/auth/me', headers=bearer(tokens[1])))
+    assert client.get('/api/auth/me', headers=bearer(tokens[2])).status_code == 200
+
+
+def test_admin_revoke_tokens_forces_logout(client, make_user, login, admin_headers):
+    user_id = make_user('user1')
+    token = login('user1')['access_token']
+
+    assert client.post(f'/api/auth/users/{user_id}/revoke-tokens', headers=admin_headers).status_code == 200
+
+    assert _outdated(client.get('/api/auth/me', headers=bearer(token)))
+    # 重新登录后的令牌携带新版本
+    assert client.get('/api/auth/me', headers=bearer(login('user1')['access_token'])).status_code == 200
+
+
+def test_deleting_a_doctor_link_invalidates_tokens(app, client, make_user, login):
+    user_id = make_user('doctor2', role='doctor')
+    _, link_id = _link_doctor(app, user_id, 'D002')
+    token = login('doctor2')['access_token']
+
+    with app.app_context():
+        db.session.delete(db.session.get(DoctorUserLink, link_id))
+        db.session.commit()
+
+    assert _outdated(client.get('/api/auth/me', headers=bearer(token)))
+
+
+@pytest.mark.parametrize('field', ['user_id', 'doctor_id'])
+def test_reassigning_a_doctor_link_invalidates_the_original_user(app, client, make_user, login, field):
+    user_id = make_user('doctor2', role='doctor')
+    other_user_id = make_user('doctor3', role='doctor')
+    _, link_id = _link_doctor(app, user_id, 'D002')
+    token = login('doctor2')['access_token']
+
+    with app.app_context():
+        other_doctor = Doctor(doctor_no='D003', name='李医生')
+        db.session.add(other_doctor)
+        db.session.commit()
+        # 提交后实例已过期：修改前的值需在赋值时加载
+        link = db.session.get(DoctorUserLink, link_id)
+        db.session.commit()
+        setattr(link, field, other_user_id if field == 'user_id' else other_doctor.id)
+        db.session.commit()
+
+    assert _outdated(client.get('/api/auth/me', headers=bearer(token)))
+
+
+def test_self_service_department_change_keeps_session(app, client, make_user, login):
+    make_user('doctor3', role='doctor', department='内科')
+    token = login('doctor3')['access_token']
+
+    response = client.put('/api/auth/update-profile', json={'department': '外科'}, headers=bearer(token))
+    assert response.status_code == 200
+
+    assert client.get('/api/auth/me', headers=bearer(token)).status_code == 200
+    data = response.get_json()['data']
+    with app.app_context():
+        assert decode_token(data['access_token'])['department'] == '外科'
+    assert client.post('/api/auth/refresh', headers=bearer(data['refresh_token'])).status_code == 200
+
+
+def test_complete_doctor_info_keeps_session_and_reissues_claims(app, client, make_user, login):
+    make_user('doctor4', role='doctor')
+    token = login('doctor4')['access_token']
+
+    response = client.post('/api/auth/complete-doctor-info', json=DOCTOR_INFO, headers=bearer(token))
+    assert response.status_code == 200
+
+    assert client.get('/api/auth/me', headers=bearer(token)).status_code == 200
+    data = response.get_json()['data']
+    with app.app_context():
+        assert decode_token(data['access_token'])['doctor_id'] == data['id']
+    check = client.get('/api/auth/check-doctor-info', headers=bearer(data['access_token'])).get_json()['data']
+    assert check['has_doctor_info'] is True
+
+
+def test_refresh_reloads_links_and_keeps_version(app, client, make_user, login):
+    user_id = make_user('doctor5', role='doctor')
+    tokens = login('doctor5')
+    # 登录后才建立的关联：刷新时从数据库重新读取
+    doctor_id, _ = _link_doctor(app, user_id, 'D005')
+
+    refreshed = client.post('/api/auth/refresh', headers=bearer(tokens['refresh_token']))
+
+    assert refreshed.status_code == 200
+    with app.app_context():
+        claims = decode_token(refreshed.get_json()['data']['access_token'])
+        assert claims['pv'] == decode_token(tokens['refresh_token'])['pv']
+    assert claims['doctor_id'] == doctor_id
+    assert int(claims['sub']) == user_id
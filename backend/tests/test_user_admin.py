@@ -0,0 +1,198 @@
+"""
+管理员用户列表（键集分页）与批量操作
+"""
+import base64
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.extensions import db
+from backend.models import User
+from backend.tests.conftest import bearer
+
+
+BASE_TIME = datetime(2026, 1, 1, 8, 0, 0)
+
+
+@pytest.fixture
+def admin(make_user, login):
+    admin_id = make_user('admin1', role='admin', created_at=BASE_TIME - timedelta(days=1))
+    return admin_id, bearer(login('admin1')['access_token'])
+
+
+@pytest.fixture
+def users(make_user):
+    """七个用户，其中三个创建时间相同（验证同一时间的记录按 id 排序、翻页不重不漏）"""
+    times = [BASE_TIME, BASE_TIME, BASE_TIME, BASE_TIME + timedelta(hours=1),
+             BASE_TIME + timedelta(hours=2), BASE_TIME + timedelta(hours=2), BASE_TIME + timedelta(hours=3)]
+    roles = ['user', 'nurse', 'user', 'doctor', 'user', 'nurse', 'user']
+    return [
+        make_user(f'user{i}', role=role, created_at=created_at)
+        for i, (created_at, role) in enumerate(zip(times, roles))
+    ]
+
+
+def _pages(client, headers, **params):
+    ids, cursor = [], ''
+    while True:
+        response = client.get('/api/auth/users', query_string={**params, 'cursor': cursor}, headers=headers)
+        assert response.status_code == 200
+        data = response.get_json()['data']
+        ids.extend(item['id'] for item in data['list'])
+        if not data['has_more']:
+            assert data['next_cursor'] is None
+            return ids
+        cursor = data['next_cursor']
+
+
+def _expected_order(app, role=None):
+    with app.app_context():
+        query = User.query
+        if role:
+            query = query.filter_by(role=role)
+        return [user.id for user in query.order_by(User.created_at.desc(), User.id.desc())]
+
+
+def test_keyset_pages_cover_every_user_once_in_order(app, client, admin, users):
+    _, headers = admin
+
+    ids = _pages(client, headers, per_page=2)
+
+    assert ids == _expected_order(app)
+    assert len(ids) == len(users) + 1
+
+
+def test_keyset_pagination_with_role_filter(app, client, admin, users):
+    _, headers = admin
+
+    ids = _pages(client, headers, per_page=1, role='user')
+
+    assert ids == _expected_order(app, role='user')
+    assert len(ids) == 4
+
+
+def test_keyset_page_omits_password_hash(client, admin, users):
+    _, headers = admin
+
+    data = client.get('/api/auth/users', query_string={'cursor': '', 'per_page': 3},
+                      headers=headers).get_json()['data']
+
+    assert len(data['list']) == 3
+    assert data['has_more'] is True
+    assert all('password_hash' not in item for item in data['list'])
+
+
+def test_invalid_cursor_is_rejected(client, admin):
+    _, headers = admin
+
+    response = client.get('/api/auth/users', query_string={'cursor': 'not-a-cursor'}, headers=headers)
+
+    assert response.status_code == 400
+    assert response.get_json()['code'] == 'INVALID_CURSOR'
+
+
+def test_cursor_without_timestamp_is_rejected(client, admin):
+    _, headers = admin
+    # created_at 非空后不再有空时间的游标
+    cursor = base64.urlsafe_b64encode(b'|5').decode('ascii')
+
+    response = client.get('/api/auth/users', query_string={'cursor': cursor}, headers=headers)
+
+    assert response.status_code == 400
+    assert response.get_json()['code'] == 'INVALID_CURSOR'
+
+
+def test_offset_pagination_still_reports_total(client, admin, users):
+    _, headers = admin
+
+    data = client.get('/api/auth/users', query_string={'page': 2, 'per_page': 3},
+                      headers=headers).get_json()['data']
+
+    assert data['total'] == len(users) + 1
+    assert data['pages'] == 3
+    assert len(data['list']) == 3
+
+
+def test_bulk_deactivate_updates_only_changed_users(app, client, admin, users):
+    _, headers = admin
+    with app.app_context():
+        db.session.get(User, users[0]).is_active = False
+        db.session.commit()
+    missing_id = max(users) + 100
+
+    response = client.post('/api/auth/users/bulk/deactivate',
+                           json={'user_ids': users[:3] + [missing_id]}, headers=headers)
+
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert data['requested'] == 4
+    assert data['updated_ids'] == users[1:3]
+    assert data['not_found'] == [missing_id]
+    with app.app_context():
+        assert {u.id for u in User.query.filter_by(is_active=False)} == set(users[:3])
+
+
+def test_bulk_activate(app, client, admin, users):
+    _, headers = admin
+    client.post('/api/auth/users/bulk/deactivate', json={'user_ids': users}, headers=headers)
+
+    response = client.post('/api/auth/users/bulk/activate', json={'user_ids': users[:2]}, headers=headers)
+
+    assert response.get_json()['data']['updated'] == 2
+    with app.app_context():
+        assert {u.id for u in User.query.filter_by(is_active=True)} == {admin[0], *users[:2]}
+
+
+def test_bulk_role_change(app, client, admin, users):
+    _, headers = admin
+
+    response = client.post('/api/auth/users/bulk/role',
+                           json={'user_ids': users[:2], 'role': 'doctor'}, headers=headers)
+
+    assert response.status_code == 200
+    with app.app_context():
+        assert {db.session.get(User, uid).role for uid in users[:2]} == {'doctor'}
+
+
+@pytest.mark.parametrize('path, body, code', [
+    ('/api/auth/users/bulk/role', {'user_ids': [1], 'role': 'superuser'}, 'INVALID_ROLE'),
+    ('/api/auth/users/bulk/activate', {'user_ids': []}, 'INVALID_DATA'),
+    ('/api/auth/users/bulk/activate', {'user_ids': ['abc']}, 'INVALID_DATA'),
+])
+def test_bulk_update_validates_input(client, admin, path, body, code):
+    _, headers = admin
+
+    response = client.post(path, json=body, headers=headers)
+
+    assert response.status_code == 400
+    assert response.get_json()['code'] == code
+
+
+def test_admin_cannot_bulk_update_own_account(app, client, admin, users):
+    admin_id, headers = admin
+
+    response = client.post('/api/auth/users/bulk/deactivate',
+                           json={'user_ids': [admin_id, users[0]]}, headers=headers)
+
+    assert response.status_code == 400
+    with app.app_context():
+        assert User.query.filter_by(is_active=False).count() == 0
+
+
+@pytest.mark.parametrize('role', ['doctor', 'nurse', 'user'])
+@pytest.mark.parametrize('method, path', [
+    ('get', '/api/auth/users'),
+    ('post', '/api/auth/users/bulk/activate'),
+    ('post', '/api/auth/users/bulk/deactivate'),
+    ('post', '/api/auth/users/bulk/role'),
+])
+def test_user_admin_endpoints_are_admin_only(app, client, make_user, login, role, method, path):
+    user_id = make_user('staff1', role=role)
+    headers = bearer(login('staff1')['access_token'])
+
+    response = getattr(client, method)(path, json={'user_ids': [user_id], 'role': 'admin'}, headers=headers)
+
+    assert response.status_code == 403
+    assert response.get_json()['code'] == 'FORBIDDEN'
+    with app.app_context():
+        assert db.session.get(User, user_id).role == role
@@ -0,0 +1,5 @@
+"""
+通用工具包
+Shared Utilities
+供各业务模块共用的基础组件
+"""
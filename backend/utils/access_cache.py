@@ -0,0 +1,104 @@
+"""
+访问控制缓存
+Access Control Cache
+
+门户权限判断所需的病人ID集合按用户/医生缓存，权限检查变为一次集合查找：
+- 用户 -> 可管理的病人ID（patient_relations：自己和家人）
+- 医生 -> 有预约记录的病人ID、有病历记录的病人ID
+
+失效：
+- 添加/移除家庭成员、注册时关联档案都会修改 User.managed_patients，
+  User 对象在提交后触发对应用户缓存失效
+- 新增、修改、删除预约或病历后，按记录的 doctor_id（含修改前的值）使医生缓存失效
+- ACCESS_CACHE_TTL 兜底多进程部署下其他进程的缓存
+"""
+from typing import FrozenSet, Iterable, List
+
+from sqlalchemy import inspect
+
+from backend.utils.reference_cache import ReferenceCache
+
+
+DEFAULT_TTL = 60
+DEFAULT_MAX_ENTRIES = 20000
+
+access_cache = ReferenceCache(ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES, config_prefix='ACCESS_CACHE')
+
+
+def user_patients_key(user_id) -> str:
+    return f'user_patients:{user_id}'
+
+
+def doctor_appointment_patients_key(doctor_id) -> str:
+    return f'doctor_appointment_patients:{doctor_id}'
+
+
+def doctor_record_patients_key(doctor_id) -> str:
+    return f'doctor_record_patients:{doctor_id}'
+
+
+def _doctor_ids(obj) -> Iterable[int]:
+    """记录当前及修改前的 doctor_id"""
+    history = inspect(obj).attrs.doctor_id.history
+    ids = set(history.added or ()) | set(history.unchanged or ()) | set(history.deleted or ())
+    return [i for i in ids if i is not None]
+
+
+def _user_keys(user) -> List[str]:
+    return [user_patients_key(user.id)] if user.id is not None else []
+
+
+def _appointment_keys(appointment) -> List[str]:
+    return [doctor_appointment_patients_key(i) for i in _doctor_ids(appointment)]
+
+
+def _record_keys(record) -> List[str]:
+    return [doctor_record_patients_key(i) for i in _doctor_ids(record)]
+
+
+access_cache.register('User', _user_keys)
+access_cache.register('Appointment', _appointment_keys)
+access_cache.register('MedicalRecord', _record_keys)
+
+
+# ----- 加载函数 -----
+
+def get_user_patient_ids(user_id: int) -> FrozenSet[int]:
+    """用户可管理的病人ID集合"""
+    def load():
+        from backend.extensions import db
+        from backend.models import patient_relations
+        rows = db.session.query(patient_relations.c.patient_id).filter(
+            patient_relations.c.user_id == user_id
+        ).all()
+        return frozenset(r[0] for r in rows)
+    return access_cache.get_or_load(user_patients_key(user_id), load)
+
+
+def get_doctor_appointment_patient_ids(doctor_id: int) -> FrozenSet[int]:
+    """与医生有预约记录的病人ID集合"""
+    def load():
+        from backend.extensions import db
+        from backend.models import Appointment
+        rows = db.session.query(Appointment.patient_id).filter(
+            Appointment.doctor_id == doctor_id
+        ).distinct().all()
+        return frozenset(r[0] for r in rows)
+    return access_cache.get_or_load(doctor_appointment_patients_key(doctor_id), load)
+
+
+def get_doctor_record_patient_ids(doctor_id: int) -> FrozenSet[int]:
+    """与医生有病历记录的病人ID集合"""
+    def load():
+        from backend.extensions import db
+        from backend.models import MedicalRecord
+        rows = db.session.query(MedicalRecord.patient_id).filter(
+            MedicalRecord.doctor_id == doctor_id
+        ).distinct().all()
+        return frozenset(r[0] for r in rows)
+    return access_cache.get_or_load(doctor_record_patients_key(doctor_id), load)
+
+
+def invalidate_user(user_id: int):
+    """使用户的可管理病人缓存失效"""
+    access_cache.invalidate(user_patients_key(user_id))
@@ -0,0 +1,84 @@
+"""
+响应压缩
+Response Compression
+
+排班总览、药品列表（含说明书等长文本）、病历列表等响应体很大，JSON 文本压缩率通常在 80% 以上。
+init_app 注册 after_request 钩子，对满足以下条件的响应压缩：
+- 客户端 Accept-Encoding 支持 br（已安装 brotli 时优先）或 gzip
+- 文本类响应（JSON、HTML、CSS、JS 等），且响应体不小于 COMPRESS_MIN_SIZE 字节
+- 非流式、非文件直传响应，且尚未设置 Content-Encoding
+压缩后的响应 ETag 改为弱 ETag（内容编码不同，字节不再相同），并添加 Vary: Accept-Encoding。
+配置项：COMPRESS_ENABLED、COMPRESS_MIN_SIZE、COMPRESS_LEVEL（gzip 1-9）、COMPRESS_BROTLI_QUALITY（0-11）。
+"""
+import gzip
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli 为可选依赖
+    brotli = None
+
+
+COMPRESSIBLE_MIMETYPES = frozenset((
+    'application/json',
+    'application/javascript',
+    'text/javascript',
+    'text/html',
+    'text/css',
+    'text/plain',
+    'text/csv',
+    'image/svg+xml',
+))
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_LEVEL = 6
+DEFAULT_BROTLI_QUALITY = 4
+
+
+def _choose_encoding(accept_encodings):
+    if brotli is not None and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress(data: bytes, encoding: str, config) -> bytes:
+    """按指定编码压缩"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=config.get('COMPRESS_BROTLI_QUALITY', DEFAULT_BROTLI_QUALITY))
+    # mtime=0：相同内容压缩结果相同
+    return gzip.compress(data, compresslevel=config.get('COMPRESS_LEVEL', DEFAULT_LEVEL), mtime=0)
+
+
+def compress_response(response):
+    """after_request 钩子：按客户端支持的编码压缩响应"""
+    config = current_app.config
+    if not config.get('COMPRESS_ENABLED', True):
+        return response
+    if (response.direct_passthrough or response.is_streamed
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or not 200 <= response.status_code < 300 or response.status_code == 204
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    data = response.get_data()
+    if len(data) < config.get('COMPRESS_MIN_SIZE', DEFAULT_MIN_SIZE):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = _choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    response.set_data(compress(data, encoding, config))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_app(app):
+    """注册压缩钩子"""
+    app.after_request(compress_response)
@@ -0,0 +1,122 @@
+"""
+条件请求（ETag / Last-Modified）
+Conditional GET
+
+前端轮询列表接口时，数据没有变化也会完整重新下载。两种方式为 GET 响应加上 ETag：
+- 行版本：@row_versions(Medicine, MedicineInventory) 在执行视图前用一条聚合查询取出
+  相关表的行数、最大 ID 与最大 updated_at，与请求路径一起计算 ETag；
+  与客户端 If-None-Match 一致时直接返回 304，不执行视图查询、不序列化。
+  适用于响应只依赖所列表数据的接口（相关表都需有 updated_at 列）
+- 响应摘要：其他 GET 的 JSON 响应在 after_request 中按响应体计算 ETag，
+  命中时返回 304（节省传输，但仍会执行视图）
+两种 ETag 都是弱 ETag，并设置 Cache-Control: private, no-cache，浏览器每次都会带条件请求重新验证。
+行版本 ETag 同时返回 Last-Modified（最大 updated_at），但只按 ETag 判断是否返回 304：
+删除行不会改变最大 updated_at。最近 RECENT_WRITE_SECONDS 秒内有修改时不使用行版本 ETag，
+避免 MySQL DATETIME 只精确到秒导致同一秒内的两次修改得到相同的 ETag。
+配置项：CONDITIONAL_GET_ENABLED。
+"""
+import hashlib
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+from typing import Iterable, Optional, Tuple
+
+from flask import current_app, make_response, request
+from sqlalchemy import func, select
+
+from backend.extensions import db
+
+
+RECENT_WRITE_SECONDS = 2
+CONDITIONAL_METHODS = ('GET', 'HEAD')
+
+
+def _digest(*parts) -> str:
+    hasher = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        hasher.update(repr(part).encode('utf-8'))
+        hasher.update(b'\x00')
+    return hasher.hexdigest()
+
+
+def _no_cache(response):
+    if 'Cache-Control' not in response.headers:
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+
+
+def table_state(models: Iterable) -> Tuple[Tuple, Optional[datetime]]:
+    """
+    一条查询取出各表的行数、最大 ID 与最大 updated_at
+
+    Returns:
+        Tuple: (各表状态, 所有表中最新的 updated_at)
+    """
+    columns = []
+    for model in models:
+        columns.extend((
+            select(func.count()).select_from(model.__table__).scalar_subquery(),
+            select(func.max(model.id)).scalar_subquery(),
+            select(func.max(model.updated_at)).scalar_subquery(),
+        ))
+    row = tuple(db.session.execute(select(*columns)).one())
+    latest = max((v for v in row[2::3] if v is not None), default=None)
+    return row, latest
+
+
+def _not_modified(etag: str, last_modified: Optional[datetime]):
+    response = current_app.response_class(status=304)
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified.replace(tzinfo=timezone.utc)
+    _no_cache(response)
+    return response
+
+
+def row_versions(*models):
+    """
+    视图装饰器：按相关表的行版本计算 ETag，客户端数据未变化时直接返回 304
+
+    Args:
+        *models: 响应所依赖的模型（需有 id 与 updated_at 列）
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if request.method not in CONDITIONAL_METHODS or not current_app.config.get('CONDITIONAL_GET_ENABLED', True):
+                return fn(*args, **kwargs)
+
+            state, latest = table_state(models)
+            if latest is not None and datetime.utcnow() - latest < timedelta(seconds=RECENT_WRITE_SECONDS):
+                return fn(*args, **kwargs)
+
+            etag = _digest(request.full_path, current_app.config.get('SYSTEM_VERSION'), state)
+            if request.if_none_match.contains_weak(etag):
+                return _not_modified(etag, latest)
+
+            response = make_response(fn(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag, weak=True)
+                if latest is not None:
+                    response.last_modified = latest.replace(tzinfo=timezone.utc)
+                _no_cache(response)
+            return response
+        return wrapper
+    return decorator
+
+
+def etag_response(response):
+    """after_request 钩子：为未设置 ETag 的 GET JSON 响应按响应体计算 ETag"""
+    if (request.method not in CONDITIONAL_METHODS or response.status_code != 200
+            or response.mimetype != 'application/json' or response.direct_passthrough
+            or response.is_streamed or 'ETag' in response.headers
+            or not current_app.config.get('CONDITIONAL_GET_ENABLED', True)):
+        return response
+
+    response.set_etag(hashlib.blake2b(response.get_data(), digest_size=16).hexdigest(), weak=True)
+    _no_cache(response)
+    return response.make_conditional(request)
+
+
+def init_app(app):
+    """注册响应摘要 ETag 钩子（需在压缩钩子之后注册，以便先于压缩执行）"""
+    app.after_request(etag_response)
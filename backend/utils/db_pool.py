@@ -0,0 +1,189 @@
+"""
+数据库连接池配置与指标
+Database Connection Pool
+
+Flask-SQLAlchemy 3 只读取 SQLALCHEMY_ENGINE_OPTIONS，旧的 SQLALCHEMY_POOL_SIZE 等配置项
+已被忽略。engine_options() 根据各环境配置类中的 DB_POOL_* 项生成连接池参数：
+- DB_POOL_SIZE / DB_POOL_MAX_OVERFLOW / DB_POOL_TIMEOUT / DB_POOL_RECYCLE
+- DB_POOL_PRE_PING：每次取出连接时先 ping 一次（多一次网络往返）；
+  关闭时只依赖 DB_POOL_RECYCLE 在服务端 wait_timeout 之前回收连接
+
+连接池使用 InstrumentedQueuePool 记录取连接次数、超时次数与取连接耗时直方图
+（含排队等待、pre-ping 与新建连接的时间），供管理员接口查看。
+SQLite 内存库等不使用 QueuePool 的连接不做调整。
+"""
+import bisect
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+
+# 取连接耗时直方图分桶上界（毫秒）
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+class PoolMetrics:
+    """连接池指标"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.errors = 0
+            self.max_checked_out = 0
+            self.wait_total_ms = 0.0
+            self.wait_max_ms = 0.0
+            self._buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def observe(self, wait_ms: float, checked_out: int):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total_ms += wait_ms
+            self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+            self.max_checked_out = max(self.max_checked_out, checked_out)
+            self._buckets[bisect.bisect_left(WAIT_BUCKETS_MS, wait_ms)] += 1
+
+    def failed(self, timeout: bool):
+        with self._lock:
+            if timeout:
+                self.timeouts += 1
+            else:
+                self.errors += 1
+
+    def histogram(self) -> List[Dict]:
+        """累计直方图（le 为毫秒上界）"""
+        with self._lock:
+            buckets = list(self._buckets)
+        result, cumulative = [], 0
+        for bound, count in zip(list(WAIT_BUCKETS_MS) + ['+Inf'], buckets):
+            cumulative += count
+            result.append({'le': bound, 'count': cumulative})
+        return result
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            data = {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'errors': self.errors,
+                'max_checked_out': self.max_checked_out,
+                'wait_avg_ms': round(self.wait_total_ms / self.checkouts, 3) if self.checkouts else 0.0,
+                'wait_max_ms': round(self.wait_max_ms, 3),
+            }
+        data['wait_histogram_ms'] = self.histogram()
+        return data
+
+
+_metrics: Dict[str, PoolMetrics] = {}
+_metrics_lock = threading.Lock()
+
+
+def get_pool_metrics(name: str = 'default') -> PoolMetrics:
+    """按名称获取连接池指标（每个进程、每个连接池一份）"""
+    with _metrics_lock:
+        if name not in _metrics:
+            _metrics[name] = PoolMetrics(name)
+        return _metrics[name]
+
+
+class InstrumentedQueuePool(QueuePool):
+    """记录取连接耗时的 QueuePool（通过 instrumented_pool_class 生成带指标名的子类）"""
+
+    metrics: PoolMetrics = get_pool_metrics()
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.metrics.failed(timeout=True)
+            raise
+        except Exception:
+            self.metrics.failed(timeout=False)
+            raise
+        self.metrics.observe((time.perf_counter() - start) * 1000, self.checkedout())
+        return connection
+
+
+def instrumented_pool_class(name: str = 'default'):
+    """生成使用指定指标的连接池类（recreate() 时沿用同一个类）"""
+    return type(f'InstrumentedQueuePool_{name}', (InstrumentedQueuePool,), {
+        'metrics': get_pool_metrics(name)
+    })
+
+
+def _uses_queue_pool(database_uri: Optional[str]) -> bool:
+    if not database_uri:
+        return False
+    url = make_url(database_uri)
+    if url.get_backend_name() == 'sqlite':
+        # 内存库由 Flask-SQLAlchemy 使用 StaticPool，不支持连接池参数
+        return bool(url.database) and url.database != ':memory:' and 'mode=memory' not in str(url)
+    return True
+
+
+def engine_options(config, database_uri: Optional[str] = None, name: str = 'default') -> Dict:
+    """
+    根据 DB_POOL_* 配置生成引擎参数
+
+    Args:
+        config: app.config
+        database_uri: 数据库连接串，默认为 SQLALCHEMY_DATABASE_URI
+        name: 连接池指标名称
+
+    Returns:
+        Dict: 在 SQLALCHEMY_ENGINE_OPTIONS 基础上补充的连接池参数
+    """
+    database_uri = database_uri or config.get('SQLALCHEMY_DATABASE_URI')
+    options = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    if not _uses_queue_pool(database_uri):
+        return options
+    options.setdefault('poolclass', instrumented_pool_class(name))
+    options.setdefault('pool_size', config.get('DB_POOL_SIZE', 10))
+    options.setdefault('max_overflow', config.get('DB_POOL_MAX_OVERFLOW', 10))
+    options.setdefault('pool_timeout', config.get('DB_POOL_TIMEOUT', 30))
+    options.setdefault('pool_recycle', config.get('DB_POOL_RECYCLE', 3600))
+    options.setdefault('pool_pre_ping', config.get('DB_POOL_PRE_PING', True))
+    return options
+
+
+def init_app(app):
+    """在 db.init_app 之前调用，将连接池参数写入 SQLALCHEMY_ENGINE_OPTIONS"""
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+
+
+def pool_status(engine) -> Dict:
+    """
+    连接池当前状态与累计指标
+
+    Args:
+        engine: SQLAlchemy 引擎
+
+    Returns:
+        Dict: 连接池配置、当前占用与取连接耗时指标
+    """
+    pool = engine.pool
+    data = {'pool_class': type(pool).__name__, 'url': engine.url.render_as_string(hide_password=True)}
+    if isinstance(pool, QueuePool):
+        data.update({
+            'size': pool.size(),
+            'max_overflow': pool._max_overflow,
+            'timeout': pool.timeout(),
+            'pre_ping': pool._pre_ping,
+            'recycle': pool._recycle,
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin(),
+            'overflow': pool.overflow(),
+        })
+    if isinstance(pool, InstrumentedQueuePool):
+        data['metrics'] = pool.metrics.snapshot()
+    return data
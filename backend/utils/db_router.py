@@ -0,0 +1,186 @@
+"""
+读写分离路由
+Read-Replica Routing
+
+配置 SQLALCHEMY_REPLICA_URI 后，只读请求（GET/HEAD/OPTIONS）的查询发往只读副本，
+其他请求及所有写操作发往主库：
+- 副本作为 Flask-SQLAlchemy 的 'replica' bind 创建引擎（连接池参数同主库，指标单独统计）
+- RoutingSession.get_bind 按请求方法选择引擎；flush、INSERT/UPDATE/DELETE、SELECT ... FOR UPDATE
+  与原生 SQL 一律走主库
+- 请求内一旦发生写操作，该请求后续的读也走主库
+- 读己之写：发生写操作的请求结束后 REPLICA_STICKY_SECONDS 秒内，同一客户端的请求都读主库。
+  客户端按 Authorization 头（进程内记录）和 db_primary_until Cookie（跨进程）识别
+- 缓存加载、令牌撤销检查等需要最新数据的读取可用 primary() 临时切换到主库；
+  整个视图都需要读主库时使用 @primary_only
+未配置副本或不在请求上下文中（命令行、后台线程）时全部走主库。
+"""
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, Optional
+
+from flask import g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql.elements import TextClause
+
+from backend.utils import db_pool
+
+
+REPLICA_BIND_KEY = 'replica'
+READ_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS'))
+STICKY_COOKIE = 'db_primary_until'
+DEFAULT_STICKY_SECONDS = 5
+MAX_STICKY_CLIENTS = 10000
+
+
+class _StickyClients:
+    """进程内的读主库客户端记录（Authorization 摘要 -> 截止时间）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._until: Dict[str, float] = {}
+
+    def mark(self, key: str, until: float):
+        with self._lock:
+            if len(self._until) >= MAX_STICKY_CLIENTS:
+                now = time.time()
+                self._until = {k: v for k, v in self._until.items() if v > now}
+            self._until[key] = until
+
+    def is_sticky(self, key: str) -> bool:
+        until = self._until.get(key)
+        return until is not None and until > time.time()
+
+    def clear(self):
+        with self._lock:
+            self._until.clear()
+
+
+sticky_clients = _StickyClients()
+
+
+def _client_key() -> Optional[str]:
+    authorization = request.headers.get('Authorization')
+    if not authorization:
+        return None
+    return hashlib.sha1(authorization.encode('utf-8')).hexdigest()
+
+
+def _is_sticky() -> bool:
+    try:
+        if float(request.cookies.get(STICKY_COOKIE, 0)) > time.time():
+            return True
+    except ValueError:
+        pass
+    key = _client_key()
+    return key is not None and sticky_clients.is_sticky(key)
+
+
+def mark_write():
+    """记录当前请求发生了写操作（后续读取走主库）"""
+    if has_request_context():
+        g._db_wrote = True
+
+
+def _is_write(clause) -> bool:
+    if clause is None:
+        return False
+    if isinstance(clause, TextClause) or getattr(clause, 'is_dml', False):
+        return True
+    return getattr(clause, '_for_update_arg', None) is not None
+
+
+def _wants_replica() -> bool:
+    if not has_request_context() or request.method not in READ_METHODS:
+        return False
+    if g.get('_db_wrote') or g.get('_db_use_primary'):
+        return False
+    if '_db_sticky' not in g:
+        g._db_sticky = _is_sticky()
+    return not g._db_sticky
+
+
+@contextmanager
+def primary(sticky: bool = True):
+    """
+    临时将当前请求的读取切换到主库
+
+    Args:
+        sticky: 为 False 时其中的写操作（如过期数据清理等维护操作）不影响请求后续的路由与读己之写
+    """
+    if not has_request_context():
+        yield
+        return
+    previous = g.get('_db_use_primary', False)
+    wrote = g.get('_db_wrote', False)
+    g._db_use_primary = True
+    try:
+        yield
+    finally:
+        g._db_use_primary = previous
+        if not sticky:
+            g._db_wrote = wrote
+
+
+def primary_only(fn):
+    """视图装饰器：整个请求读主库"""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        g._db_use_primary = True
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+class RoutingSession(Session):
+    """按请求方法在主库与只读副本之间选择引擎的会话"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None:
+            return engine
+        engines = self._db.engines
+        replica = engines.get(REPLICA_BIND_KEY)
+        if replica is None or engine is not engines.get(None):
+            return engine
+        if self._flushing or _is_write(clause):
+            mark_write()
+            return engine
+        return replica if _wants_replica() else engine
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_flush(session, flush_context):
+    mark_write()
+
+
+def init_app(app):
+    """
+    配置只读副本（在 db.init_app 之前调用）
+
+    读取 SQLALCHEMY_REPLICA_URI、REPLICA_STICKY_SECONDS；未配置副本时不做任何事
+    """
+    replica_uri = app.config.get('SQLALCHEMY_REPLICA_URI')
+    if not replica_uri:
+        return
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    binds[REPLICA_BIND_KEY] = {
+        'url': replica_uri,
+        **db_pool.engine_options(app.config, replica_uri, name=REPLICA_BIND_KEY)
+    }
+    app.config['SQLALCHEMY_BINDS'] = binds
+    sticky_seconds = app.config.get('REPLICA_STICKY_SECONDS', DEFAULT_STICKY_SECONDS)
+
+    @app.after_request
+    def _remember_write(response):
+        if g.get('_db_wrote') and sticky_seconds > 0:
+            until = time.time() + sticky_seconds
+            key = _client_key()
+            if key:
+                sticky_clients.mark(key, until)
+            response.set_cookie(
+                STICKY_COOKIE, f'{until:.3f}', max_age=sticky_seconds, httponly=True, samesite='Lax'
+            )
+        return response
@@ -0,0 +1,496 @@
+"""
+运行指标
+Prometheus Metrics
+
+GET /metrics 以 Prometheus 文本格式（text/plain; version=0.0.4）输出：
+- hms_http_request_duration_seconds：按方法与路由模板统计的请求耗时直方图
+- hms_http_responses_total：按方法、路由模板与状态码统计的响应数
+- hms_db_pool_*：连接池占用、取连接次数与超时次数（见 utils/db_pool.py）
+- hms_medication_requests_pending：待审核的用药申请数（抓取时查询，缓存 METRICS_DB_GAUGE_TTL 秒）
+- hms_appointments_booked_total：新建预约数，每分钟预约量为 rate(...[5m]) * 60
+- hms_login_attempts_total：按结果（success / failure / throttled）统计的登录次数
+
+热路径开销：计数器与直方图按线程分片，每个线程只写自己的字典，不加锁；
+抓取时再汇总各线程的分片。每个请求只增加两次字典更新与一次 bisect。
+多进程部署（gunicorn）时每次抓取只会落到一个工作进程上，设置 METRICS_SHARED_DIR 后
+各进程每 METRICS_DUMP_INTERVAL 秒把自己的计数写入该目录下的 <pid>.json，
+抓取时与其他进程（包括已退出的进程）的文件合并；连接池等进程级指标附带 pid 标签，
+只输出最近仍在更新的进程。目录需在服务启动时新建（gunicorn.conf.py 已处理）。
+配置项：METRICS_ENABLED、METRICS_TOKEN（设置后需携带 Authorization: Bearer <token>）、
+METRICS_REQUIRE_TOKEN（为 True 且未设置 METRICS_TOKEN 时不注册 /metrics，生产环境默认开启）、
+METRICS_SHARED_DIR、METRICS_DUMP_INTERVAL、METRICS_DB_GAUGE_TTL。
+"""
+import bisect
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+logger = logging.getLogger(__name__)
+
+# 请求耗时直方图分桶上界（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DEFAULT_DUMP_INTERVAL = 5
+DEFAULT_DB_GAUGE_TTL = 15
+
+_G_KEY = '_metrics_start'
+_SESSION_BOOKED_KEY = 'metrics_appointments_booked'
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = '') -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _format_value(value) -> str:
+    if isinstance(value, float):
+        return repr(value) if value != int(value) else str(int(value))
+    return str(value)
+
+
+class Metric:
+    """指标基类：按线程分片写入，抓取时汇总
+
+    Args:
+        name: 指标名
+        documentation: 说明
+        labelnames: 标签名
+    """
+
+    type = 'untyped'
+    # 计数器与直方图跨进程求和；per_process 的指标按进程分别输出
+    summable = True
+    per_process = False
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._local = threading.local()
+        self._shards: List[Dict] = []
+        self._shards_lock = threading.Lock()
+        self._labelsets = set()
+
+    def _shard(self) -> Dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+            return shard
+
+    def preregister(self, *labelsets: Labels):
+        """预先登记标签组合，未出现过的组合也以 0 输出"""
+        self._labelsets.update(labelsets)
+
+    def collect(self) -> Dict[Labels, object]:
+        raise NotImplementedError
+
+    def merge(self, target: Dict[Labels, object], samples: Dict[Labels, object]):
+        raise NotImplementedError
+
+    def render(self, samples: Dict[Labels, object], labelnames: Tuple[str, ...]) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """单调递增计数器"""
+
+    type = 'counter'
+
+    def inc(self, labels: Labels = (), amount: float = 1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def collect(self) -> Dict[Labels, object]:
+        result = {labels: 0 for labels in self._labelsets}
+        for shard in list(self._shards):
+            for labels, value in shard.copy().items():
+                result[labels] = result.get(labels, 0) + value
+        return result
+
+    def merge(self, target, samples):
+        for labels, value in samples.items():
+            target[labels] = target.get(labels, 0) + value
+
+    def render(self, samples, labelnames):
+        return [f'{self.name}{_format_labels(labelnames, labels)} {_format_value(value)}'
+                for labels, value in sorted(samples.items())]
+
+
+class Histogram(Metric):
+    """直方图：每个标签组合一行 [各分桶计数..., +Inf 计数, 总和]"""
+
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def _empty(self) -> List:
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    def observe(self, labels: Labels, value: float):
+        shard = self._shard()
+        row = shard.get(labels)
+        if row is None:
+            row = shard[labels] = self._empty()
+        row[bisect.bisect_left(self.buckets, value)] += 1
+        row[-1] += value
+
+    def collect(self) -> Dict[Labels, object]:
+        result = {labels: self._empty() for labels in self._labelsets}
+        for shard in list(self._shards):
+            self.merge(result, shard.copy())
+        return result
+
+    def merge(self, target, samples):
+        for labels, row in samples.items():
+            total = target.get(labels)
+            if total is None:
+                target[labels] = list(row)
+            else:
+                for i, value in enumerate(row):
+                    total[i] += value
+
+    def render(self, samples, labelnames):
+        lines = []
+        for labels, row in sorted(samples.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), row):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{bound}"'
+                lines.append(f'{self.name}_bucket{_format_labels(labelnames, labels, le)} {cumulative}')
+            label_text = _format_labels(labelnames, labels)
+            lines.append(f'{self.name}_sum{label_text} {_format_value(row[-1])}')
+            lines.append(f'{self.name}_count{label_text} {cumulative}')
+        return lines
+
+
+class CallbackMetric(Counter):
+    """抓取时通过回调取值的指标
+
+    Args:
+        callback: 返回 {标签值元组: 数值} 的函数
+        type: gauge 或 counter
+        per_process: 值属于当前进程（如连接池）；多进程时各进程分别输出并附带 pid 标签，
+            否则只由处理抓取请求的进程取值（如数据库中的待办数量）
+    """
+
+    summable = False
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...],
+                 callback: Callable[[], Dict[Labels, float]], type: str = 'gauge',
+                 per_process: bool = False):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+        self.type = type
+        self.per_process = per_process
+
+    def collect(self) -> Dict[Labels, object]:
+        try:
+            return dict(self.callback())
+        except Exception as e:
+            logger.warning("指标 %s 取值失败: %s", self.name, e)
+            return {}
+
+
+class MetricsRegistry:
+    """指标注册表与多进程合并"""
+
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        self.shared_dir: Optional[str] = None
+        self.dump_interval = DEFAULT_DUMP_INTERVAL
+        self._dumper_pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name: str, documentation: str, labelnames: Tuple[str, ...],
+                 callback: Callable[[], Dict[Labels, float]], type: str = 'gauge',
+                 per_process: bool = False) -> CallbackMetric:
+        return self.register(CallbackMetric(name, documentation, labelnames, callback, type, per_process))
+
+    # ----- 多进程 -----
+
+    def _dumped(self) -> List[Metric]:
+        return [m for m in self.metrics if m.summable or m.per_process]
+
+    def dump(self):
+        """把当前进程的计数写入共享目录（原子替换）"""
+        if not self.shared_dir:
+            return
+        data = {
+            metric.name: [[list(labels), value] for labels, value in metric.collect().items()]
+            for metric in self._dumped()
+        }
+        path = os.path.join(self.shared_dir, f'{os.getpid()}.json')
+        tmp_path = f'{path}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("写入指标快照失败: %s", e)
+
+    def ensure_dumper(self, app):
+        """在当前进程中启动定时写入快照的后台线程（fork 之后的进程各自启动一次）"""
+        pid = os.getpid()
+        if not self.shared_dir or self._dumper_pid == pid:
+            return
+        with self._lock:
+            if self._dumper_pid == pid:
+                return
+            self._dumper_pid = pid
+            os.makedirs(self.shared_dir, exist_ok=True)
+            thread = threading.Thread(target=self._run_dumper, args=(app,), name='metrics-dumper', daemon=True)
+            thread.start()
+
+    def _run_dumper(self, app):
+        while True:
+            time.sleep(self.dump_interval)
+            # 连接池指标需要应用上下文（db.engines）
+            with app.app_context():
+                self.dump()
+
+    def _other_processes(self) -> Iterable[Tuple[str, bool, Dict]]:
+        own = f'{os.getpid()}.json'
+        stale_before = time.time() - self.dump_interval * 3
+        try:
+            names = os.listdir(self.shared_dir)
+        except OSError:
+            return
+        for name in names:
+            if not name.endswith('.json') or name == own:
+                continue
+            path = os.path.join(self.shared_dir, name)
+            try:
+                alive = os.path.getmtime(path) >= stale_before
+                with open(path, encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            yield name[:-len('.json')], alive, data
+
+    # ----- 输出 -----
+
+    def render(self) -> str:
+        collected = {}
+        pid = str(os.getpid())
+        for metric in self.metrics:
+            samples = metric.collect()
+            if self.shared_dir and metric.per_process:
+                samples = {labels + (pid,): value for labels, value in samples.items()}
+            collected[metric.name] = samples
+
+        if self.shared_dir:
+            by_name = {metric.name: metric for metric in self.metrics}
+            for other_pid, alive, data in self._other_processes():
+                for name, items in data.items():
+                    metric = by_name.get(name)
+                    if metric is None:
+                        continue
+                    samples = {tuple(labels): value for labels, value in items}
+                    if metric.per_process:
+                        if alive:
+                            collected[name].update({labels + (other_pid,): value for labels, value in samples.items()})
+                    else:
+                        metric.merge(collected[name], samples)
+
+        lines = []
+        for metric in self.metrics:
+            labelnames = metric.labelnames
+            if self.shared_dir and metric.per_process:
+                labelnames += ('pid',)
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(metric.render(collected[metric.name], labelnames))
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+http_request_duration = registry.histogram(
+    'hms_http_request_duration_seconds', '请求处理耗时（秒）', ('method', 'route'))
+http_responses = registry.counter(
+    'hms_http_responses_total', '响应数', ('method', 'route', 'status'))
+appointments_booked = registry.counter(
+    'hms_appointments_booked_total', '新建预约数')
+login_attempts = registry.counter(
+    'hms_login_attempts_total', '登录次数', ('result',))
+login_attempts.preregister(('success',), ('failure',), ('throttled',))
+
+
+# ----- 连接池与业务指标 -----
+
+def _pools() -> Dict[str, object]:
+    from backend.extensions import db
+    return {name or 'default': engine.pool for name, engine in db.engines.items()}
+
+
+def _pool_values(getter: Callable) -> Dict[Labels, float]:
+    from sqlalchemy.pool import QueuePool
+    return {(name,): getter(pool) for name, pool in _pools().items() if isinstance(pool, QueuePool)}
+
+
+def _pool_metric_values(attr: str) -> Dict[Labels, float]:
+    from backend.utils.db_pool import InstrumentedQueuePool
+    return {(name,): getattr(pool.metrics, attr) for name, pool in _pools().items()
+            if isinstance(pool, InstrumentedQueuePool)}
+
+
+registry.callback('hms_db_pool_size', '连接池大小', ('pool',),
+                  lambda: _pool_values(lambda pool: pool.size()), per_process=True)
+registry.callback('hms_db_pool_checked_out', '已取出的连接数', ('pool',),
+                  lambda: _pool_values(lambda pool: pool.checkedout()), per_process=True)
+registry.callback('hms_db_pool_overflow', '溢出连接数', ('pool',),
+                  lambda: _pool_values(lambda pool: pool.overflow()), per_process=True)
+registry.callback('hms_db_pool_checkouts_total', '取连接次数', ('pool',),
+                  lambda: _pool_metric_values('checkouts'), type='counter', per_process=True)
+registry.callback('hms_db_pool_timeouts_total', '取连接超时次数', ('pool',),
+                  lambda: _pool_metric_values('timeouts'), type='counter', per_process=True)
+
+
+class _CachedQuery:
+    """抓取时执行的数据库查询，结果缓存 ttl 秒"""
+
+    def __init__(self, query: Callable[[], float]):
+        self.query = query
+        self.ttl = DEFAULT_DB_GAUGE_TTL
+        self._value: Optional[float] = None
+        self._expires_at = 0.0
+
+    def __call__(self) -> Dict[Labels, float]:
+        now = time.monotonic()
+        if self._value is None or now >= self._expires_at:
+            self._value = self.query()
+            self._expires_at = now + self.ttl
+        return {(): self._value}
+
+
+def _pending_medication_requests() -> int:
+    from backend.extensions import db
+    from backend.models import MedicationRequest
+    return db.session.query(db.func.count(MedicationRequest.id)).filter(
+        MedicationRequest.status == 'PENDING'
+    ).scalar() or 0
+
+
+pending_medication_requests = _CachedQuery(_pending_medication_requests)
+registry.callback('hms_medication_requests_pending', '待审核的用药申请数', (), pending_medication_requests)
+
+
+# ----- 请求钩子与会话事件 -----
+
+def _start_request():
+    g.setdefault(_G_KEY, time.perf_counter())
+    registry.ensure_dumper(current_app._get_current_object())
+
+
+def _finish_request(response):
+    start = g.pop(_G_KEY, None)
+    if start is None:
+        return response
+    route = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+    http_request_duration.observe((request.method, route), time.perf_counter() - start)
+    http_responses.inc((request.method, route, str(response.status_code)))
+    return response
+
+
+def _after_flush(session, flush_context):
+    from backend.models import Appointment
+    booked = sum(1 for obj in session.new if isinstance(obj, Appointment))
+    if booked:
+        session.info[_SESSION_BOOKED_KEY] = session.info.get(_SESSION_BOOKED_KEY, 0) + booked
+
+
+def _after_commit(session):
+    booked = session.info.pop(_SESSION_BOOKED_KEY, 0)
+    if booked:
+        appointments_booked.inc((), booked)
+
+
+def _after_rollback(session, previous_transaction):
+    session.info.pop(_SESSION_BOOKED_KEY, None)
+
+
+def metrics_view():
+    """Prometheus 抓取接口"""
+    token = current_app.config.get('METRICS_TOKEN')
+    if token:
+        supplied = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(supplied.encode('utf-8'), f'Bearer {token}'.encode('utf-8')):
+            return current_app.response_class('unauthorized\n', status=401, mimetype='text/plain')
+    if not _routes_registered:
+        _preregister_routes(current_app)
+    return current_app.response_class(registry.render(), content_type=CONTENT_TYPE)
+
+
+_routes_registered = False
+
+
+def _preregister_routes(app):
+    """登记所有路由的标签组合，尚未被请求过的路由也以 0 输出"""
+    global _routes_registered
+    labelsets = [
+        (method, rule.rule)
+        for rule in app.url_map.iter_rules()
+        for method in sorted(rule.methods - {'HEAD', 'OPTIONS'})
+    ]
+    http_request_duration.preregister(*labelsets)
+    _routes_registered = True
+
+
+_listening = False
+
+
+def init_app(app):
+    """读取配置，注册请求钩子、会话事件与 /metrics 路由"""
+    global _listening
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    registry.shared_dir = app.config.get('METRICS_SHARED_DIR') or None
+    registry.dump_interval = app.config.get('METRICS_DUMP_INTERVAL', DEFAULT_DUMP_INTERVAL)
+    pending_medication_requests.ttl = app.config.get('METRICS_DB_GAUGE_TTL', DEFAULT_DB_GAUGE_TTL)
+    if not _listening:
+        event.listen(Session, 'after_flush', _after_flush)
+        event.listen(Session, 'after_commit', _after_commit)
+        event.listen(Session, 'after_soft_rollback', _after_rollback)
+        _listening = True
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    if app.config.get('METRICS_REQUIRE_TOKEN') and not app.config.get('METRICS_TOKEN'):
+        # 指标包含路由表、各接口流量与业务计数，不能公开访问
+        logger.warning("未设置 METRICS_TOKEN，/metrics 接口未启用")
+        return
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
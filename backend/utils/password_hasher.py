@@ -0,0 +1,164 @@
+"""
+密码哈希执行池
+Password Hashing Pool
+
+密码哈希（scrypt / pbkdf2）是刻意设计的高 CPU 开销操作。所有哈希与校验统一提交到
+一个有界线程池执行（hashlib 计算期间会释放 GIL，线程可以真正并行）：
+- 并发数由 PASSWORD_HASH_WORKERS 限制，登录高峰时不会占满所有 CPU 拖慢其他接口
+- 排队数超过 PASSWORD_HASH_QUEUE_SIZE 时立即拒绝（PasswordHasherBusy），而不是无限堆积
+- 哈希参数由 PASSWORD_HASH_METHOD 配置，可按环境设置；强度低于当前配置的旧哈希可通过
+  needs_rehash 判断并在登录成功后透明升级（只升级不降级：开发环境使用较低成本的参数时，
+  不会把已有的高强度哈希改写为低强度哈希）
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+DEFAULT_WORKERS = 4
+DEFAULT_QUEUE_SIZE = 32
+
+# 算法强度排序（越大越强）
+_ALGORITHM_RANK = {'pbkdf2': 0, 'scrypt': 1}
+
+
+def _method_strength(method: str) -> Optional[Tuple[int, int]]:
+    """
+    哈希参数的强度：(算法排序, 计算成本)
+
+    scrypt 的成本取 n * r * p，pbkdf2 取迭代次数；无法识别的参数返回 None。
+    """
+    algorithm, *params = method.split(':')
+    try:
+        if algorithm == 'scrypt':
+            n, r, p = (list(map(int, params)) + [2 ** 15, 8, 1][len(params):])[:3]
+            return _ALGORITHM_RANK[algorithm], n * r * p
+        if algorithm == 'pbkdf2':
+            iterations = int(params[1]) if len(params) > 1 else DEFAULT_PBKDF2_ITERATIONS
+            return _ALGORITHM_RANK[algorithm], iterations
+    except (TypeError, ValueError):
+        return None
+    return None
+
+
+class PasswordHasherBusy(RuntimeError):
+    """哈希队列已满"""
+
+
+class PasswordHasher:
+    """有界密码哈希执行池"""
+
+    def __init__(self, method: str = DEFAULT_METHOD, workers: int = DEFAULT_WORKERS,
+                 queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.method = method
+        self.workers = workers
+        self.queue_size = queue_size
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._lock = threading.Lock()
+        self._metrics = {
+            'submitted': 0,
+            'completed': 0,
+            'rejected': 0,
+            'failed': 0,
+            'in_flight': 0,
+            'max_in_flight': 0,
+            'total_seconds': 0.0
+        }
+
+    def init_app(self, app):
+        """按应用配置重建执行池"""
+        self.configure(
+            method=app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD),
+            workers=app.config.get('PASSWORD_HASH_WORKERS', DEFAULT_WORKERS),
+            queue_size=app.config.get('PASSWORD_HASH_QUEUE_SIZE', DEFAULT_QUEUE_SIZE)
+        )
+
+    def configure(self, method: str, workers: int, queue_size: int):
+        with self._lock:
+            if (method, workers, queue_size) == (self.method, self.workers, self.queue_size):
+                return
+            old, self._executor = self._executor, None
+            self.method = method
+            self.workers = max(1, workers)
+            self.queue_size = max(0, queue_size)
+            self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+        if old is not None:
+            old.shutdown(wait=False)
+
+    def hash(self, password: str) -> str:
+        """使用当前配置的参数生成密码哈希"""
+        return self._submit(generate_password_hash, password, method=self.method)
+
+    def verify(self, password_hash: str, password: str) -> bool:
+        """校验密码"""
+        return self._submit(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """哈希是否由弱于当前配置的参数生成（只升级，不降级）"""
+        if not password_hash or '$' not in password_hash:
+            return True
+        method = password_hash.split('$', 1)[0]
+        if method == self.method:
+            return False
+        current, existing = _method_strength(self.method), _method_strength(method)
+        if existing is None:
+            return True
+        if current is None:
+            return False
+        return existing < current
+
+    def stats(self) -> Dict:
+        """执行池指标"""
+        with self._lock:
+            data = dict(self._metrics)
+        data['avg_ms'] = round(data['total_seconds'] / data['completed'] * 1000, 2) if data['completed'] else 0.0
+        data['total_seconds'] = round(data['total_seconds'], 3)
+        data['queued'] = max(0, data['in_flight'] - self.workers)
+        data.update({'method': self.method, 'workers': self.workers, 'queue_size': self.queue_size})
+        return data
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix='password-hash'
+                )
+            return self._executor
+
+    def _submit(self, fn, *args, **kwargs):
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            with self._lock:
+                self._metrics['rejected'] += 1
+            raise PasswordHasherBusy('密码校验请求过多，请稍后重试')
+
+        with self._lock:
+            self._metrics['submitted'] += 1
+            self._metrics['in_flight'] += 1
+            self._metrics['max_in_flight'] = max(self._metrics['max_in_flight'], self._metrics['in_flight'])
+
+        start = time.perf_counter()
+        succeeded = False
+        try:
+            result = self._get_executor().submit(fn, *args, **kwargs).result()
+            succeeded = True
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            slots.release()
+            with self._lock:
+                self._metrics['in_flight'] -= 1
+                # 平均耗时只统计成功的调用
+                if succeeded:
+                    self._metrics['completed'] += 1
+                    self._metrics['total_seconds'] += elapsed
+                else:
+                    self._metrics['failed'] += 1
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,149 @@
+"""
+请求级当前用户
+Request-Scoped Principal
+
+路由与门户服务经常在一次请求内多次按 JWT 身份查询同一个用户及其关联信息。
+Principal 在每个请求中按用户只加载一次并缓存在 flask.g 上：
+- 携带令牌版本号的访问令牌直接由 JWT 声明构造（角色、关联的病人档案ID、关联的医生ID），
+  不查询数据库；用户对象在首次访问 .user 时才加载
+- 旧令牌或刷新令牌回退为一次联表查询取出用户及关联ID
+- 可管理的病人ID、医生接诊过的病人ID 来自跨请求的访问控制缓存（access_cache），
+  关联关系变更提交后自动失效
+"""
+from typing import Dict, FrozenSet, Optional
+
+from flask import g
+from flask_jwt_extended import get_jwt, get_jwt_identity
+
+from backend.extensions import db
+from backend.models import DoctorUserLink, PatientUserLink, User
+from backend.utils.access_cache import (
+    get_doctor_appointment_patient_ids,
+    get_doctor_record_patient_ids,
+    get_user_patient_ids,
+)
+from backend.utils.token_versions import CLAIM_DOCTOR_ID, CLAIM_PATIENT_ID, CLAIM_VERSION
+
+
+class Principal:
+    """当前请求中的用户身份"""
+
+    def __init__(self, user_id: int, role: Optional[str], patient_id: Optional[int] = None,
+                 doctor_id: Optional[int] = None, user: Optional[User] = None):
+        self.user_id = user_id
+        self.role = role
+        self.patient_id = patient_id
+        self.doctor_id = doctor_id
+        self._user = user
+
+    def __repr__(self):
+        return f'<Principal user_id={self.user_id} role={self.role}>'
+
+    @property
+    def user(self) -> Optional[User]:
+        """用户对象（按需加载）"""
+        if self._user is None:
+            self._user = db.session.get(User, self.user_id)
+        return self._user
+
+    @property
+    def managed_patient_ids(self) -> FrozenSet[int]:
+        """可管理的病人ID集合（自己和家人）"""
+        return get_user_patient_ids(self.user_id)
+
+    def can_manage(self, patient_id) -> bool:
+        """是否可管理指定病人"""
+        patient_id = _normalize_id(patient_id)
+        return patient_id is not None and patient_id in self.managed_patient_ids
+
+    def has_appointment_with(self, patient_id) -> bool:
+        """（医生）是否与指定病人有预约记录"""
+        patient_id = _normalize_id(patient_id)
+        if not self.doctor_id or patient_id is None:
+            return False
+        return patient_id in get_doctor_appointment_patient_ids(self.doctor_id)
+
+    def has_record_with(self, patient_id) -> bool:
+        """（医生）是否为指定病人写过病历"""
+        patient_id = _normalize_id(patient_id)
+        if not self.doctor_id or patient_id is None:
+            return False
+        return patient_id in get_doctor_record_patient_ids(self.doctor_id)
+
+
+def _normalize_id(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def load_principal(user_id) -> Optional[Principal]:
+    """
+    从数据库加载用户身份（不使用缓存）
+
+    Args:
+        user_id: 用户ID
+
+    Returns:
+        Principal，用户不存在时返回 None
+    """
+    user_id = _normalize_id(user_id)
+    if user_id is None:
+        return None
+    row = db.session.query(
+        User, PatientUserLink.patient_id, DoctorUserLink.doctor_id
+    ).outerjoin(
+        PatientUserLink, PatientUserLink.user_id == User.id
+    ).outerjoin(
+        DoctorUserLink, DoctorUserLink.user_id == User.id
+    ).filter(User.id == user_id).first()
+    if row is None:
+        return None
+    user = row[0]
+    return Principal(user.id, user.role, patient_id=row[1], doctor_id=row[2], user=user)
+
+
+def get_principal(user_id) -> Optional[Principal]:
+    """
+    获取指定用户的身份，同一请求内只查询一次
+
+    Args:
+        user_id: 用户ID（JWT 中的字符串形式亦可）
+
+    Returns:
+        Principal，用户不存在时返回 None
+    """
+    user_id = _normalize_id(user_id)
+    if user_id is None:
+        return None
+    cache: Dict[int, Optional[Principal]] = g.setdefault('_principals', {})
+    if user_id not in cache:
+        cache[user_id] = load_principal(user_id)
+    return cache[user_id]
+
+
+def get_current_principal() -> Optional[Principal]:
+    """当前 JWT 用户的身份（需在 jwt_required 保护的视图中调用）"""
+    claims = get_jwt()
+    if claims.get('type') != 'access' or CLAIM_VERSION not in claims:
+        return get_principal(get_jwt_identity())
+
+    user_id = _normalize_id(claims.get('sub'))
+    if user_id is None:
+        return None
+    cache: Dict[int, Optional[Principal]] = g.setdefault('_principals', {})
+    if user_id not in cache:
+        cache[user_id] = Principal(
+            user_id,
+            claims.get('role'),
+            patient_id=claims.get(CLAIM_PATIENT_ID),
+            doctor_id=claims.get(CLAIM_DOCTOR_ID)
+        )
+    return cache[user_id]
+
+
+def get_current_user() -> Optional[User]:
+    """当前 JWT 用户对象"""
+    principal = get_current_principal()
+    return principal.user if principal else None
@@ -0,0 +1,270 @@
+"""
+性能剖析
+Profiling
+
+排班总览等接口在生产环境变慢时，需要看到时间花在哪里。提供两种方式（结果仅管理员可查看）：
+
+1. 单请求 cProfile
+   - 管理员请求携带 X-Profile: 1 头时剖析该请求
+   - PROFILE_SAMPLE_RATE > 0 时按该比例随机剖析所有请求（可用 PROFILE_PATH_PREFIX 限定路径）
+   剖析结果以 pstats 格式保存到 PROFILE_DIR（多个工作进程共享），只保留最近 PROFILE_KEEP 份；
+   响应带 X-Profile-Id 头，通过 /api/auth/profiler/requests/<id> 查看报告或下载 .prof 文件
+   （可用 snakeviz 等工具打开）。
+   开销：被剖析的请求 CPU 耗时通常增加 1.5~3 倍（函数调用越密集越明显）；
+   未被剖析的请求只多一次随机数与请求头判断。
+
+2. 统计采样
+   sample() 在当前请求线程中每 interval 秒调用一次 sys._current_frames()，
+   记录本进程其他线程的调用栈，持续 seconds 秒后按 flamegraph.pl / speedscope 可读取的
+   折叠栈格式（"外层;内层 次数"）返回。默认只采集正在处理请求的线程。
+   开销：每次采样需在持有 GIL 时遍历各线程的栈（函数名按代码对象缓存），
+   60 层左右的调用栈约每线程 10 微秒；默认 10ms 间隔、8 个线程时约占 1% CPU。
+   采样期间占用一个请求线程（gthread 工作模式下不影响其他请求；sync 模式下该工作进程暂停接收请求），
+   且只能看到处理该请求的工作进程。
+
+配置项：PROFILER_ENABLED、PROFILE_SAMPLE_RATE、PROFILE_PATH_PREFIX、PROFILE_DIR、PROFILE_KEEP。
+"""
+import cProfile
+import io
+import itertools
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+from flask import g, request
+
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+DEFAULT_KEEP = 50
+DEFAULT_SAMPLE_INTERVAL = 0.01
+MAX_SAMPLE_SECONDS = 60
+
+_G_KEY = '_profile'
+_ID_PATTERN = re.compile(r'^[0-9]+-[0-9]+-[0-9]+$')
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class SamplerBusy(Exception):
+    """已有采样在进行"""
+
+
+# ----- 单请求 cProfile -----
+
+class RequestProfiler:
+    """按请求头或采样比例剖析请求，结果保存为 pstats 文件"""
+
+    def __init__(self):
+        self.enabled = True
+        self.sample_rate = 0.0
+        self.path_prefix = ''
+        self.directory = os.path.join(tempfile.gettempdir(), 'hospital-api-profiles')
+        self.keep = DEFAULT_KEEP
+        self._counter = itertools.count(1)
+        # 正在处理请求的线程（供采样时过滤空闲线程）
+        self.active_threads: Dict[int, str] = {}
+
+    def init_app(self, app):
+        """读取配置并注册请求钩子"""
+        self.enabled = app.config.get('PROFILER_ENABLED', self.enabled)
+        self.sample_rate = app.config.get('PROFILE_SAMPLE_RATE', self.sample_rate)
+        self.path_prefix = app.config.get('PROFILE_PATH_PREFIX', self.path_prefix) or ''
+        self.directory = app.config.get('PROFILE_DIR') or self.directory
+        self.keep = app.config.get('PROFILE_KEEP', self.keep)
+        if not self.enabled:
+            return
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.teardown_request(self._teardown_request)
+
+    def _requested_by_admin(self) -> bool:
+        if request.headers.get(PROFILE_HEADER) not in ('1', 'true'):
+            return False
+        from flask_jwt_extended import get_jwt, verify_jwt_in_request
+        try:
+            verify_jwt_in_request(optional=True)
+            return get_jwt().get('role') == 'admin'
+        except Exception:
+            return False
+
+    def _should_profile(self) -> bool:
+        if self._requested_by_admin():
+            return True
+        return (self.sample_rate > 0 and request.path.startswith(self.path_prefix)
+                and random.random() < self.sample_rate)
+
+    def _start_request(self):
+        self.active_threads[threading.get_ident()] = f'{request.method} {request.path}'
+        if not self._should_profile():
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # 同一时刻只能有一个剖析器（Python 3.12+ 全进程只允许一个）
+            return
+        g.setdefault(_G_KEY, (profile, time.perf_counter()))
+
+    def _finish_request(self, response):
+        entry = g.pop(_G_KEY, None)
+        if entry is None:
+            return response
+        profile, started = entry
+        profile.disable()
+        profile_id = self._save(profile, {
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'status': response.status_code,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+            'pid': os.getpid(),
+            'created_at': time.time(),
+        })
+        if profile_id:
+            response.headers['X-Profile-Id'] = profile_id
+        return response
+
+    def _teardown_request(self, exc):
+        self.active_threads.pop(threading.get_ident(), None)
+        entry = g.pop(_G_KEY, None)
+        if entry is not None:
+            entry[0].disable()
+
+    def _save(self, profile: cProfile.Profile, meta: Dict) -> Optional[str]:
+        profile_id = f'{int(time.time() * 1000)}-{os.getpid()}-{next(self._counter)}'
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            profile.dump_stats(os.path.join(self.directory, f'{profile_id}.prof'))
+            with open(os.path.join(self.directory, f'{profile_id}.json'), 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            self._trim()
+        except OSError as e:
+            logger.warning("保存剖析结果失败: %s", e)
+            return None
+        return profile_id
+
+    def _ids(self) -> List[str]:
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        ids = [name[:-len('.json')] for name in names if name.endswith('.json')]
+        ids = [i for i in ids if _ID_PATTERN.match(i)]
+        return sorted(ids, key=lambda i: tuple(int(part) for part in i.split('-')), reverse=True)
+
+    def _trim(self):
+        for profile_id in self._ids()[self.keep:]:
+            for suffix in ('.json', '.prof'):
+                try:
+                    os.remove(os.path.join(self.directory, profile_id + suffix))
+                except OSError:
+                    pass
+
+    def list(self) -> List[Dict]:
+        """最近的剖析结果（新的在前）"""
+        result = []
+        for profile_id in self._ids():
+            try:
+                with open(os.path.join(self.directory, f'{profile_id}.json'), encoding='utf-8') as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            result.append({'id': profile_id, **meta})
+        return result
+
+    def path(self, profile_id: str) -> Optional[str]:
+        """pstats 文件路径（不存在时返回 None）"""
+        if not _ID_PATTERN.match(profile_id or ''):
+            return None
+        path = os.path.join(self.directory, f'{profile_id}.prof')
+        return path if os.path.exists(path) else None
+
+    def report(self, profile_id: str, sort: str = 'cumulative', limit: int = 40) -> Optional[str]:
+        """文本报告：按 sort 排序的前 limit 个函数"""
+        path = self.path(profile_id)
+        if path is None:
+            return None
+        stream = io.StringIO()
+        stats = pstats.Stats(path, stream=stream)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+
+request_profiler = RequestProfiler()
+
+
+# ----- 统计采样 -----
+
+_sampler_lock = threading.Lock()
+
+
+def _code_label(code) -> str:
+    filename = code.co_filename
+    if filename.startswith(_PROJECT_ROOT):
+        filename = os.path.relpath(filename, _PROJECT_ROOT)
+    else:
+        filename = os.path.basename(filename)
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'
+
+
+def _folded_stack(frame, labels_cache: Dict) -> str:
+    labels = []
+    while frame is not None:
+        code = frame.f_code
+        label = labels_cache.get(code)
+        if label is None:
+            label = labels_cache[code] = _code_label(code)
+        labels.append(label)
+        frame = frame.f_back
+    labels.reverse()
+    return ';'.join(labels)
+
+
+def sample(seconds: float, interval: float = DEFAULT_SAMPLE_INTERVAL, all_threads: bool = False) -> Dict:
+    """
+    采集本进程各线程的调用栈
+
+    Args:
+        seconds: 采样时长（秒，最多 MAX_SAMPLE_SECONDS）
+        interval: 采样间隔（秒）
+        all_threads: 为 False 时只采集正在处理请求的线程
+
+    Returns:
+        Dict: folded（折叠栈文本）、samples（采样次数）、duration（实际耗时）
+
+    Raises:
+        SamplerBusy: 已有采样在进行
+    """
+    seconds = min(max(seconds, interval), MAX_SAMPLE_SECONDS)
+    if not _sampler_lock.acquire(blocking=False):
+        raise SamplerBusy('已有采样在进行，请稍后再试')
+    try:
+        own = threading.get_ident()
+        stacks = Counter()
+        labels_cache = {}
+        rounds = 0
+        started = time.perf_counter()
+        deadline = started + seconds
+        while time.perf_counter() < deadline:
+            active = request_profiler.active_threads
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (not all_threads and ident not in active):
+                    continue
+                stacks[_folded_stack(frame, labels_cache)] += 1
+            rounds += 1
+            time.sleep(interval)
+        duration = time.perf_counter() - started
+    finally:
+        _sampler_lock.release()
+
+    folded = '\n'.join(f'{stack} {count}' for stack, count in stacks.most_common())
+    return {'folded': folded + '\n' if folded else '', 'samples': rounds, 'duration': duration}
@@ -0,0 +1,197 @@
+"""
+请求级 SQL 统计
+Per-request SQL Instrumentation
+
+监听所有引擎的 before_cursor_execute / after_cursor_execute 事件，按请求记录：
+- 查询次数与数据库总耗时
+- 按语句（参数化后的 SQL 文本）分组的执行次数、耗时与不同参数组合数
+
+after_request 中：
+- 添加 Server-Timing 头（db：数据库耗时与查询次数；app：请求总耗时），可在浏览器开发者工具中查看
+- 请求耗时超过 SLOW_REQUEST_MS 时记录慢请求日志（含执行次数最多的语句）
+- N+1 检测：同一条 SELECT 以不同参数执行超过 N_PLUS_ONE_THRESHOLD 次时视为 N+1，
+  测试模式（TESTING）下抛出 NPlusOneDetected，其他环境记录警告日志；
+  日志中附带首次超限时的调用位置
+请求上下文之外的查询（后台线程、命令行脚本）不统计。
+配置项：QUERY_STATS_ENABLED、SERVER_TIMING_ENABLED、SLOW_REQUEST_MS、
+N_PLUS_ONE_THRESHOLD、N_PLUS_ONE_RAISE（None 表示仅测试模式抛出）。
+"""
+import logging
+import os
+import time
+import traceback
+from typing import Dict, List, Optional, Set
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SLOW_REQUEST_MS = 1000
+DEFAULT_N_PLUS_ONE_THRESHOLD = 10
+
+_G_KEY = '_query_stats'
+_CONN_START_KEY = 'query_stats_start'
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_UTILS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class NPlusOneDetected(Exception):
+    """检测到 N+1 查询"""
+
+
+class StatementStats:
+    """单条语句在一次请求中的执行统计"""
+
+    __slots__ = ('count', 'duration', 'params', 'location')
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.params: Set[int] = set()
+        self.location: Optional[str] = None
+
+
+class QueryStats:
+    """一次请求的 SQL 统计"""
+
+    def __init__(self, threshold: int):
+        self.started = time.perf_counter()
+        self.threshold = threshold
+        self.count = 0
+        self.duration = 0.0
+        self.statements: Dict[str, StatementStats] = {}
+
+    def record(self, statement: str, parameters, duration: float):
+        self.count += 1
+        self.duration += duration
+        stats = self.statements.get(statement)
+        if stats is None:
+            stats = self.statements[statement] = StatementStats()
+        stats.count += 1
+        stats.duration += duration
+        if stats.location is None and _is_select(statement):
+            try:
+                stats.params.add(hash(repr(parameters)))
+            except Exception:
+                pass
+            if len(stats.params) > self.threshold:
+                stats.location = _call_site()
+
+    def repeated(self, limit: int = 3) -> List[Dict]:
+        """执行次数最多的语句"""
+        items = sorted(self.statements.items(), key=lambda item: item[1].count, reverse=True)
+        return [
+            {'statement': _shorten(statement), 'count': stats.count, 'ms': round(stats.duration * 1000, 2)}
+            for statement, stats in items[:limit] if stats.count > 1
+        ]
+
+    def n_plus_one(self) -> List[Dict]:
+        """以不同参数执行超过阈值次数的 SELECT 语句"""
+        return [
+            {'statement': _shorten(statement), 'count': stats.count, 'location': stats.location}
+            for statement, stats in self.statements.items() if stats.location is not None
+        ]
+
+
+def _is_select(statement: str) -> bool:
+    return statement.lstrip()[:6].upper() == 'SELECT'
+
+
+def _shorten(statement: str, limit: int = 200) -> str:
+    statement = ' '.join(statement.split())
+    return statement if len(statement) <= limit else statement[:limit] + '...'
+
+
+def _call_site() -> Optional[str]:
+    """项目代码中触发查询的最内层调用位置（跳过 utils 与第三方库）"""
+    for frame in reversed(traceback.extract_stack()):
+        filename = os.path.abspath(frame.filename)
+        if filename.startswith(_BACKEND_DIR) and not filename.startswith(_UTILS_DIR):
+            return f'{os.path.relpath(filename, _BACKEND_DIR)}:{frame.lineno} in {frame.name}'
+    return None
+
+
+def current_stats() -> Optional[QueryStats]:
+    """当前请求的 SQL 统计（请求上下文之外返回 None）"""
+    if not has_request_context():
+        return None
+    return g.get(_G_KEY)
+
+
+# ----- 引擎事件 -----
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(_CONN_START_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get(_CONN_START_KEY)
+    if not starts:
+        return
+    duration = time.perf_counter() - starts.pop()
+    stats = current_stats()
+    if stats is not None:
+        stats.record(statement, parameters, duration)
+
+
+def _handle_error(context):
+    # 执行失败时不会触发 after_cursor_execute，弹出对应的开始时间
+    starts = context.connection.info.get(_CONN_START_KEY) if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+
+# ----- 请求钩子 -----
+
+def _start_request():
+    config = current_app.config
+    if config.get('QUERY_STATS_ENABLED', True):
+        g.setdefault(_G_KEY, QueryStats(config.get('N_PLUS_ONE_THRESHOLD', DEFAULT_N_PLUS_ONE_THRESHOLD)))
+
+
+def _finish_request(response):
+    stats: Optional[QueryStats] = g.pop(_G_KEY, None)
+    if stats is None:
+        return response
+    config = current_app.config
+    elapsed_ms = (time.perf_counter() - stats.started) * 1000
+    db_ms = stats.duration * 1000
+
+    if config.get('SERVER_TIMING_ENABLED', True):
+        response.headers.add('Server-Timing', f'db;dur={db_ms:.2f};desc="{stats.count} queries"')
+        response.headers.add('Server-Timing', f'app;dur={elapsed_ms:.2f}')
+
+    if elapsed_ms >= config.get('SLOW_REQUEST_MS', DEFAULT_SLOW_REQUEST_MS):
+        logger.warning(
+            "慢请求: %s %s %s 耗时 %.1fms，%d 次查询共 %.1fms，重复语句: %s",
+            request.method, request.full_path, response.status_code,
+            elapsed_ms, stats.count, db_ms, stats.repeated()
+        )
+
+    suspects = stats.n_plus_one()
+    if suspects:
+        should_raise = config.get('N_PLUS_ONE_RAISE')
+        if should_raise is None:
+            should_raise = current_app.testing
+        if should_raise:
+            raise NPlusOneDetected(f"疑似 N+1 查询: {request.method} {request.path} {suspects}")
+        logger.warning("疑似 N+1 查询: %s %s %s", request.method, request.path, suspects)
+    return response
+
+
+_listening = False
+
+
+def init_app(app):
+    """注册引擎事件监听与请求钩子（应在其他 after_request 钩子之前注册，以便最后执行）"""
+    global _listening
+    if not _listening:
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+        _listening = True
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
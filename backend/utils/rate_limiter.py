@@ -0,0 +1,199 @@
+"""
+登录限流
+Login Rate Limiting
+
+登录、添加家庭成员都需要校验密码，而密码哈希是刻意设计得很慢的计算。
+撞库攻击时每次尝试都会占用一次完整的哈希计算，因此在校验密码之前先按
+IP 和用户名检查近期失败次数，超限的请求直接返回 429，不再进行哈希计算。
+
+- 滑动窗口计数：按固定窗口分桶计数，用上一个桶按时间比例加权估算滑动窗口内的次数，
+  每个键只需两个计数器
+- 只统计失败的尝试；登录成功后清除该用户名的计数
+- 计数存储可替换：默认 LocalRateLimitBackend 为进程内实现，
+  多进程部署可替换为基于 Redis INCR/EXPIRE 等共享存储的实现
+"""
+import math
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+
+DEFAULT_MAX_KEYS = 100000
+
+
+class RateLimitExceeded(Exception):
+    """尝试次数超限"""
+
+    def __init__(self, retry_after: int):
+        self.retry_after = retry_after
+        super().__init__(f'尝试过于频繁，请 {retry_after} 秒后再试')
+
+
+class RateLimitBackend:
+    """计数存储接口"""
+
+    def get(self, key: str) -> int:
+        raise NotImplementedError
+
+    def incr(self, key: str, ttl: float) -> int:
+        raise NotImplementedError
+
+    def delete(self, *keys: str):
+        raise NotImplementedError
+
+
+class LocalRateLimitBackend(RateLimitBackend):
+    """进程内计数存储（共享存储替身）"""
+
+    def __init__(self, max_keys: int = DEFAULT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._data: Dict[str, Tuple[int, float]] = {}
+
+    def get(self, key: str) -> int:
+        entry = self._data.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            return 0
+        return entry[0]
+
+    def incr(self, key: str, ttl: float) -> int:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] <= now:
+                if len(self._data) >= self.max_keys:
+                    self._prune(now)
+                count, expires_at = 1, now + ttl
+            else:
+                count, expires_at = entry[0] + 1, entry[1]
+            self._data[key] = (count, expires_at)
+            return count
+
+    def delete(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def _prune(self, now: float):
+        self._data = {k: v for k, v in self._data.items() if v[1] > now}
+        # 仍然超限时丢弃最早写入的一半
+        if len(self._data) >= self.max_keys:
+            keys = list(self._data)
+            for key in keys[:len(keys) // 2]:
+                del self._data[key]
+
+
+class SlidingWindowLimiter:
+    """滑动窗口计数限流"""
+
+    def __init__(self, name: str, limit: int, window: float, backend: RateLimitBackend):
+        self.name = name
+        self.limit = limit
+        self.window = window
+        self.backend = backend
+
+    def _bucket_keys(self, key: str, now: float) -> Tuple[str, str, float]:
+        bucket = int(now // self.window)
+        elapsed = (now % self.window) / self.window
+        return f'{self.name}:{key}:{bucket}', f'{self.name}:{key}:{bucket - 1}', elapsed
+
+    def retry_after(self, key: str, now: Optional[float] = None) -> int:
+        """
+        距离允许下一次尝试的秒数
+
+        Returns:
+            int: 0 表示未超限
+        """
+        if self.limit <= 0:
+            return 0
+        now = time.time() if now is None else now
+        current_key, previous_key, elapsed = self._bucket_keys(key, now)
+        current = self.backend.get(current_key)
+        previous = self.backend.get(previous_key)
+        if previous * (1 - elapsed) + current < self.limit:
+            return 0
+        if current >= self.limit:
+            # 当前桶已满，需等到下一个窗口且上一桶的权重衰减足够
+            return max(1, math.ceil(self.window * (1 - elapsed)))
+        # 上一个桶的权重随时间线性衰减，计算降到阈值以下所需时间
+        needed = 1 - (self.limit - current) / previous
+        return max(1, math.ceil((needed - elapsed) * self.window))
+
+    def hit(self, key: str, now: Optional[float] = None):
+        """记录一次尝试"""
+        now = time.time() if now is None else now
+        current_key, _, _ = self._bucket_keys(key, now)
+        self.backend.incr(current_key, self.window * 2)
+
+    def reset(self, key: str, now: Optional[float] = None):
+        """清除计数"""
+        now = time.time() if now is None else now
+        current_key, previous_key, _ = self._bucket_keys(key, now)
+        self.backend.delete(current_key, previous_key)
+
+
+class LoginThrottle:
+    """按 IP 与用户名限制密码校验失败次数"""
+
+    def __init__(self, name: str, ip_limit: int = 30, username_limit: int = 5,
+                 window: float = 300, backend: Optional[RateLimitBackend] = None,
+                 config_prefix: str = 'LOGIN_RATE_LIMIT'):
+        self.name = name
+        self.config_prefix = config_prefix
+        self.enabled = True
+        self.backend = backend or LocalRateLimitBackend()
+        self._configure(ip_limit, username_limit, window)
+
+    def _configure(self, ip_limit: int, username_limit: int, window: float):
+        self.ip_limiter = SlidingWindowLimiter(f'{self.name}:ip', ip_limit, window, self.backend)
+        self.username_limiter = SlidingWindowLimiter(f'{self.name}:user', username_limit, window, self.backend)
+
+    def init_app(self, app):
+        prefix = self.config_prefix
+        self.enabled = app.config.get(f'{prefix}_ENABLED', True)
+        self._configure(
+            app.config.get(f'{prefix}_PER_IP', self.ip_limiter.limit),
+            app.config.get(f'{prefix}_PER_USERNAME', self.username_limiter.limit),
+            app.config.get(f'{prefix}_WINDOW', self.ip_limiter.window)
+        )
+
+    @staticmethod
+    def _username_key(username: str) -> str:
+        return (username or '').strip().lower()
+
+    def check(self, ip: Optional[str], username: str):
+        """
+        校验密码前检查失败次数
+
+        Raises:
+            RateLimitExceeded: IP 或用户名的失败次数超限
+        """
+        if not self.enabled:
+            return
+        retry_after = max(
+            self.ip_limiter.retry_after(ip or 'unknown'),
+            self.username_limiter.retry_after(self._username_key(username))
+        )
+        if retry_after:
+            raise RateLimitExceeded(retry_after)
+
+    def record_failure(self, ip: Optional[str], username: str):
+        """记录一次失败的密码校验"""
+        if not self.enabled:
+            return
+        self.ip_limiter.hit(ip or 'unknown')
+        self.username_limiter.hit(self._username_key(username))
+
+    def record_success(self, username: str):
+        """密码校验成功，清除该用户名的失败计数"""
+        if not self.enabled:
+            return
+        self.username_limiter.reset(self._username_key(username))
+
+
+login_throttle = LoginThrottle('login')
+family_member_throttle = LoginThrottle('family_member', config_prefix='FAMILY_MEMBER_RATE_LIMIT')
@@ -0,0 +1,236 @@
+"""
+参考数据缓存
+Reference Data Cache
+
+缓存科室、职称、药品分类、采购状态统计等变化很少但几乎每个页面都会读取的数据，
+避免每次请求都执行 DISTINCT / COUNT 查询。
+
+失效机制：
+- 事件驱动：监听 SQLAlchemy 会话的 flush / commit 事件，
+  当事务中新增、修改或删除了相关模型并成功提交后，清除对应的缓存键
+- 显式失效：绕过会话单元的批量语句（insert()/update()）需调用 invalidate()
+- TTL 兜底：多进程部署时其他进程的缓存最多在 TTL 后刷新
+
+缓存的值由所有请求共享，加载函数返回不可变对象（tuple、只读映射），
+调用方需要修改时自行复制（如 list(get_doctor_titles())）。
+"""
+import threading
+import time
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Set, Tuple, Union
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from backend.utils import db_router
+
+
+# 缓存键
+MEDICINE_CATEGORIES = 'medicine_categories'
+DOCTOR_DEPARTMENTS = 'doctor_departments'
+DOCTOR_TITLES = 'doctor_titles'
+PURCHASE_STATS = 'purchase_stats'
+
+DEFAULT_TTL = 300
+
+_SESSION_DIRTY_KEY = 'reference_cache_dirty'
+
+# 失效规则：固定的缓存键，或根据被修改的对象计算缓存键的函数
+KeyRule = Union[str, Callable[[Any], Iterable[str]]]
+
+
+class ReferenceCache:
+    """进程内参考数据缓存（线程安全）
+
+    Args:
+        ttl: 缓存过期时间（秒）
+        max_entries: 最多缓存的键数，超出时淘汰最久未使用的键（None 表示不限制）
+        config_prefix: init_app 时读取的配置项前缀（<prefix>_TTL / <prefix>_MAX_ENTRIES）
+    """
+
+    def __init__(self, ttl: int = DEFAULT_TTL, max_entries: Optional[int] = None,
+                 config_prefix: str = 'REFERENCE_CACHE'):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.config_prefix = config_prefix
+        self._lock = threading.Lock()
+        self._store: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._loading: Dict[str, int] = {}
+        self._model_keys: Dict[str, List[KeyRule]] = {}
+        self._session_key = f'{_SESSION_DIRTY_KEY}:{config_prefix}'
+        self._listening = False
+
+    def init_app(self, app):
+        """读取配置并注册会话事件监听"""
+        self.ttl = app.config.get(f'{self.config_prefix}_TTL', self.ttl)
+        self.max_entries = app.config.get(f'{self.config_prefix}_MAX_ENTRIES', self.max_entries)
+        if not self._listening:
+            event.listen(Session, 'after_flush', self._after_flush)
+            event.listen(Session, 'after_commit', self._after_commit)
+            event.listen(Session, 'after_soft_rollback', self._after_rollback)
+            self._listening = True
+
+    def register(self, model_name: str, *rules: KeyRule):
+        """声明某个模型的数据变化会使哪些缓存键失效
+
+        Args:
+            model_name: 模型类名
+            rules: 缓存键，或接收被修改对象并返回缓存键列表的函数
+        """
+        self._model_keys.setdefault(model_name, []).extend(rules)
+
+    def get_or_load(self, key: str, loader: Callable[[], Any]) -> Any:
+        """
+        读取缓存，未命中或过期时调用 loader 加载
+
+        加载期间若该键被失效，则本次结果不写入缓存，避免写回旧数据。
+        loader 中的查询读主库，避免把只读副本上尚未同步的数据写入缓存。
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._store.get(key)
+            if entry and entry[0] > now:
+                self._store.move_to_end(key)
+                return entry[1]
+            version = self._versions.get(key, 0)
+            self._loading[key] = self._loading.get(key, 0) + 1
+
+        try:
+            with db_router.primary():
+                value = loader()
+        except Exception:
+            with self._lock:
+                self._finish_loading(key)
+            raise
+
+        with self._lock:
+            if self._versions.get(key, 0) == version:
+                self._store[key] = (time.monotonic() + self.ttl, value)
+                self._store.move_to_end(key)
+                if self.max_entries is not None:
+                    while len(self._store) > self.max_entries:
+                        self._store.popitem(last=False)
+            self._finish_loading(key)
+        return value
+
+    def invalidate(self, *keys: str):
+        """使指定缓存键失效"""
+        with self._lock:
+            for key in keys:
+                self._store.pop(key, None)
+                # 只有正在加载的键需要记录版本，防止加载结果写回旧数据
+                if key in self._loading:
+                    self._versions[key] = self._versions.get(key, 0) + 1
+
+    def clear(self):
+        """清空全部缓存"""
+        with self._lock:
+            self._store.clear()
+            for key in self._loading:
+                self._versions[key] = self._versions.get(key, 0) + 1
+
+    def _finish_loading(self, key: str):
+        count = self._loading.get(key, 0) - 1
+        if count > 0:
+            self._loading[key] = count
+        else:
+            self._loading.pop(key, None)
+            self._versions.pop(key, None)
+
+    # ----- 会话事件 -----
+
+    def _keys_for(self, objects: Iterable) -> Set[str]:
+        keys = set()
+        for obj in objects:
+            for rule in self._model_keys.get(type(obj).__name__, ()):
+                if callable(rule):
+                    keys.update(rule(obj))
+                else:
+                    keys.add(rule)
+        return keys
+
+    def _after_flush(self, session, flush_context):
+        keys = self._keys_for(session.new) | self._keys_for(session.dirty) | self._keys_for(session.deleted)
+        if keys:
+            session.info.setdefault(self._session_key, set()).update(keys)
+
+    def _after_commit(self, session):
+        keys: Optional[Set[str]] = session.info.pop(self._session_key, None)
+        if keys:
+            self.invalidate(*keys)
+
+    def _after_rollback(self, session, previous_transaction):
+        session.info.pop(self._session_key, None)
+
+
+reference_cache = ReferenceCache()
+
+reference_cache.register('Medicine', MEDICINE_CATEGORIES)
+reference_cache.register('Doctor', DOCTOR_DEPARTMENTS, DOCTOR_TITLES)
+reference_cache.register('MedicinePurchase', PURCHASE_STATS)
+
+
+# ----- 加载函数 -----
+
+def get_medicine_categories() -> Tuple[str, ...]:
+    """药品分类列表（去重、非空）"""
+    def load():
+        from backend.extensions import db
+        from backend.models import Medicine
+        rows = db.session.query(Medicine.category).filter(
+            Medicine.category.isnot(None),
+            Medicine.category != ''
+        ).distinct().all()
+        return tuple(r[0] for r in rows)
+    return reference_cache.get_or_load(MEDICINE_CATEGORIES, load)
+
+
+def get_doctor_departments() -> Tuple[str, ...]:
+    """医生表中出现过的科室列表（去重、非空）"""
+    def load():
+        from backend.extensions import db
+        from backend.models import Doctor
+        rows = db.session.query(Doctor.department).filter(
+            Doctor.department.isnot(None),
+            Doctor.department != ''
+        ).distinct().all()
+        return tuple(r[0] for r in rows)
+    return reference_cache.get_or_load(DOCTOR_DEPARTMENTS, load)
+
+
+def get_doctor_titles() -> Tuple[str, ...]:
+    """医生表中出现过的职称列表（去重、非空）"""
+    def load():
+        from backend.extensions import db
+        from backend.models import Doctor
+        rows = db.session.query(Doctor.title).filter(
+            Doctor.title.isnot(None),
+            Doctor.title != ''
+        ).distinct().all()
+        return tuple(r[0] for r in rows)
+    return reference_cache.get_or_load(DOCTOR_TITLES, load)
+
+
+def get_purchase_stats() -> Mapping:
+    """
+    采购单状态统计
+
+    Returns:
+        Mapping: total_purchases、pending_count 及按状态分组的 by_status（只读）
+    """
+    def load():
+        from sqlalchemy import func
+        from backend.extensions import db
+        from backend.models import MedicinePurchase
+        rows = db.session.query(
+            MedicinePurchase.status, func.count(MedicinePurchase.id)
+        ).group_by(MedicinePurchase.status).all()
+        by_status = {status: count for status, count in rows}
+        return MappingProxyType({
+            'total_purchases': sum(by_status.values()),
+            'pending_count': by_status.get('pending', 0),
+            'by_status': MappingProxyType(by_status)
+        })
+    return reference_cache.get_or_load(PURCHASE_STATS, load)
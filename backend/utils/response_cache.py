@@ -0,0 +1,227 @@
+"""
+接口响应缓存
+HTTP Response Cache
+
+按科室筛选的医生列表几乎每个页面都会请求，每次请求都要分页查询医生、统计患者数与排班数
+并序列化整个响应。科室、职称、药品分类等参考数据已由 reference_cache 在查询层缓存，
+不再重复缓存响应；reference_cache 覆盖不到的接口用 @response_cache.cached(DOCTORS)
+直接缓存 GET 请求的响应体：
+- 缓存键：请求路径 + 排序后的查询参数 + 各标签的当前版本
+- TTL 过期兜底，超出 max_entries 时淘汰最久未使用的条目
+- 标签失效：register() 声明模型与标签的对应关系，监听会话 flush / commit 事件，
+  相关模型的修改提交后使对应标签失效；绕过会话单元的批量语句需调用 invalidate_tags()
+- 标签失效通过递增标签版本实现，旧条目不再命中，由 LRU / TTL 自然淘汰。
+  缓存键在执行视图之前计算，执行期间标签失效时结果写入旧版本的键，不会被再次读取
+- 存储可替换：默认 LocalResponseCacheBackend 为进程内 LRU，多进程部署可替换为
+  基于 Redis GET/SETEX/INCR 等共享存储的实现，标签失效对所有进程同时生效
+只缓存 200 响应，并添加 X-Cache: HIT / MISS 头。
+配置项：RESPONSE_CACHE_ENABLED、RESPONSE_CACHE_TTL、RESPONSE_CACHE_MAX_ENTRIES。
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from flask import current_app, make_response, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from backend.utils import db_router
+
+
+# 缓存标签
+DOCTORS = 'doctors'
+
+DEFAULT_TTL = 300
+DEFAULT_MAX_ENTRIES = 1024
+CACHEABLE_METHODS = ('GET', 'HEAD')
+
+_SESSION_DIRTY_KEY = 'response_cache_dirty'
+
+
+class ResponseCacheBackend:
+    """响应缓存存储接口"""
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: float):
+        raise NotImplementedError
+
+    def tag_versions(self, tags: Sequence[str]) -> Tuple[int, ...]:
+        raise NotImplementedError
+
+    def bump_tags(self, *tags: str):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class LocalResponseCacheBackend(ResponseCacheBackend):
+    """进程内 LRU 存储（线程安全）
+
+    标签版本单独保存、不参与淘汰：版本被淘汰后归零会使旧条目重新命中。
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._store: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+        self._versions: Dict[str, int] = {}
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._store.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._store[key]
+                return None
+            self._store.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: Any, ttl: float):
+        with self._lock:
+            self._store[key] = (time.monotonic() + ttl, value)
+            self._store.move_to_end(key)
+            while len(self._store) > self.max_entries:
+                self._store.popitem(last=False)
+
+    def tag_versions(self, tags: Sequence[str]) -> Tuple[int, ...]:
+        return tuple(self._versions.get(tag, 0) for tag in tags)
+
+    def bump_tags(self, *tags: str):
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._store.clear()
+
+    def __len__(self):
+        return len(self._store)
+
+
+class ResponseCache:
+    """GET 接口响应缓存
+
+    Args:
+        ttl: 默认缓存过期时间（秒）
+        max_entries: 默认存储最多缓存的响应数
+        backend: 缓存存储，默认使用 LocalResponseCacheBackend
+    """
+
+    def __init__(self, ttl: int = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 backend: Optional[ResponseCacheBackend] = None):
+        self.ttl = ttl
+        self.enabled = True
+        self.backend = backend or LocalResponseCacheBackend(max_entries)
+        self._model_tags: Dict[str, List[str]] = {}
+        self._listening = False
+
+    def init_app(self, app):
+        """读取配置并注册会话事件监听"""
+        self.enabled = app.config.get('RESPONSE_CACHE_ENABLED', self.enabled)
+        self.ttl = app.config.get('RESPONSE_CACHE_TTL', self.ttl)
+        if isinstance(self.backend, LocalResponseCacheBackend):
+            self.backend.max_entries = app.config.get('RESPONSE_CACHE_MAX_ENTRIES', self.backend.max_entries)
+        if not self._listening:
+            event.listen(Session, 'after_flush', self._after_flush)
+            event.listen(Session, 'after_commit', self._after_commit)
+            event.listen(Session, 'after_soft_rollback', self._after_rollback)
+            self._listening = True
+
+    def register(self, model_name: str, *tags: str):
+        """声明某个模型的数据变化会使哪些标签失效
+
+        Args:
+            model_name: 模型类名
+            tags: 缓存标签
+        """
+        self._model_tags.setdefault(model_name, []).extend(tags)
+
+    def cached(self, *tags: str, ttl: Optional[int] = None):
+        """
+        视图装饰器：缓存 GET 请求的 200 响应
+
+        只适用于响应不依赖当前用户的接口（缓存键不包含身份信息）。
+
+        Args:
+            *tags: 响应所依赖数据的标签，任一标签失效后缓存不再命中
+            ttl: 过期时间（秒），默认使用 RESPONSE_CACHE_TTL
+        """
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                if request.method not in CACHEABLE_METHODS or not self.enabled:
+                    return fn(*args, **kwargs)
+
+                key = self._make_key(tags)
+                entry = self.backend.get(key)
+                if entry is not None:
+                    body, mimetype = entry
+                    response = current_app.response_class(body, mimetype=mimetype)
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                # 未命中时读主库，避免把只读副本上尚未同步的数据写入缓存
+                with db_router.primary(sticky=False):
+                    response = make_response(fn(*args, **kwargs))
+                if (response.status_code == 200 and not response.direct_passthrough
+                        and not response.is_streamed):
+                    self.backend.set(key, (response.get_data(), response.mimetype),
+                                     self.ttl if ttl is None else ttl)
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            return wrapper
+        return decorator
+
+    def invalidate_tags(self, *tags: str):
+        """使指定标签下的缓存失效"""
+        if tags:
+            self.backend.bump_tags(*tags)
+
+    def clear(self):
+        """清空全部缓存"""
+        self.backend.clear()
+
+    def _make_key(self, tags: Sequence[str]) -> str:
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(request.path.encode('utf-8'))
+        for name, value in sorted(request.args.items(multi=True)):
+            hasher.update(b'\x00' + name.encode('utf-8') + b'=' + value.encode('utf-8'))
+        versions = self.backend.tag_versions(tags)
+        return f"response:{hasher.hexdigest()}:{'.'.join(map(str, versions))}"
+
+    # ----- 会话事件 -----
+
+    def _tags_for(self, objects) -> Set[str]:
+        tags = set()
+        for obj in objects:
+            tags.update(self._model_tags.get(type(obj).__name__, ()))
+        return tags
+
+    def _after_flush(self, session, flush_context):
+        tags = self._tags_for(session.new) | self._tags_for(session.dirty) | self._tags_for(session.deleted)
+        if tags:
+            session.info.setdefault(_SESSION_DIRTY_KEY, set()).update(tags)
+
+    def _after_commit(self, session):
+        tags: Optional[Set[str]] = session.info.pop(_SESSION_DIRTY_KEY, None)
+        if tags:
+            self.invalidate_tags(*tags)
+
+    def _after_rollback(self, session, previous_transaction):
+        session.info.pop(_SESSION_DIRTY_KEY, None)
+
+
+response_cache = ResponseCache()
+
+# 医生列表包含患者数、排班数统计
+response_cache.register('Doctor', DOCTORS)
+response_cache.register('DoctorSchedule', DOCTORS)
+response_cache.register('MedicalRecord', DOCTORS)
@@ -0,0 +1,59 @@
+"""
+统一响应格式
+API Response Envelope
+
+各模块接口统一返回：
+    {"success": true, "message": "操作成功", "code": "SUCCESS", "data": ...}
+成功响应信封中 success/message/code 部分按取值缓存为已编码的字节串，
+每次响应只需序列化 data 并拼接，不再为信封构造字典再整体序列化
+（错误响应的 message 常含异常信息，不缓存）。
+调试模式下按 JSON provider 的设置缩进输出。
+"""
+from functools import lru_cache
+
+from flask import current_app
+
+from backend.utils.json_provider import dumps_bytes
+
+
+@lru_cache(maxsize=512)
+def _envelope_prefix(success: bool, message: str, code: str) -> bytes:
+    return b''.join((
+        b'{"success":', b'true' if success else b'false',
+        b',"message":', dumps_bytes(message),
+        b',"code":', dumps_bytes(code),
+        b',"data":'
+    ))
+
+
+def _envelope(success: bool, message, code, data, cache_prefix: bool = True):
+    provider = current_app.json
+    if getattr(provider, 'indent', None) is None or provider.indent():
+        return provider.response({'success': success, 'message': message, 'code': code, 'data': data})
+    if cache_prefix and isinstance(message, str) and isinstance(code, str):
+        body = _envelope_prefix(success, message, code) + dumps_bytes(data) + b'}'
+    else:
+        body = dumps_bytes({'success': success, 'message': message, 'code': code, 'data': data})
+    return current_app.response_class(body, mimetype='application/json')
+
+
+def success_response(data=None, message='操作成功', code='SUCCESS'):
+    """成功响应"""
+    return _envelope(True, message, code, data)
+
+
+def error_response(message='操作失败', code='ERROR', status_code=400):
+    """错误响应"""
+    return _envelope(False, message, code, None, cache_prefix=False), status_code
+
+
+def too_many_attempts_response(e):
+    """
+    尝试次数超限响应（附带 Retry-After）
+
+    Args:
+        e: RateLimitExceeded，retry_after 为距离允许下一次尝试的秒数
+    """
+    response, status_code = error_response(str(e), 'TOO_MANY_ATTEMPTS', 429)
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, status_code
@@ -0,0 +1,255 @@
+"""
+令牌撤销列表
+Token Revocation List
+
+登出或管理员强制下线时撤销具体令牌（按 jti）。每个请求都要判断令牌是否被撤销，
+绝大多数令牌并未撤销，因此采用三级结构：
+1. 进程内布隆过滤器：判定「未撤销」时不产生任何 I/O（绝大多数请求止步于此）
+2. 共享存储（RevocationStore）：布隆过滤器判定可能撤销时查询；默认的
+   LocalRevocationStore 是进程内替身，多进程部署可替换为 Redis 等共享实现
+3. 数据库 revoked_tokens 表：持久化来源，共享存储未命中时兜底查询
+
+其他进程写入的撤销记录由各进程每 TOKEN_REVOCATION_SYNC_INTERVAL 秒增量同步到
+本地布隆过滤器（一次按 revoked_at 的索引查询），每小时按未过期记录重建一次过滤器。
+同步与重建在令牌检查（请求处理）中触发，只读且使用独立连接，不影响请求的数据库会话。
+数据库中的过期记录由命令行清理：flask --app backend.app purge-revoked-tokens（可配置为定时任务）。
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import delete, select
+
+from backend.utils import db_router
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CAPACITY = 100000
+DEFAULT_ERROR_RATE = 0.001
+DEFAULT_SYNC_INTERVAL = 10
+REBUILD_INTERVAL = 3600
+# 同步窗口向前多取一段时间，容忍各节点时钟与事务提交延迟
+SYNC_OVERLAP = timedelta(seconds=30)
+
+
+class BloomFilter:
+    """布隆过滤器（bytearray 位图 + 双重哈希）"""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, error_rate: float = DEFAULT_ERROR_RATE):
+        capacity = max(1, capacity)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> Iterable[int]:
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str):
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class RevocationStore:
+    """共享撤销存储接口（jti -> 过期时间）"""
+
+    def add(self, jti: str, expires_at: datetime):
+        raise NotImplementedError
+
+    def contains(self, jti: str) -> bool:
+        raise NotImplementedError
+
+    def purge_expired(self, now: datetime):
+        """清理已过期的记录（支持自动过期的存储可不实现）"""
+
+
+class LocalRevocationStore(RevocationStore):
+    """进程内共享存储替身"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._items: Dict[str, datetime] = {}
+
+    def add(self, jti: str, expires_at: datetime):
+        with self._lock:
+            self._items[jti] = expires_at
+
+    def contains(self, jti: str) -> bool:
+        with self._lock:
+            return jti in self._items
+
+    def purge_expired(self, now: datetime):
+        with self._lock:
+            self._items = {k: v for k, v in self._items.items() if v > now}
+
+
+class TokenRevocationList:
+    """布隆过滤器 + 共享存储 + 数据库的令牌撤销列表"""
+
+    def __init__(self, store: Optional[RevocationStore] = None):
+        self.store = store or LocalRevocationStore()
+        self.capacity = DEFAULT_CAPACITY
+        self.error_rate = DEFAULT_ERROR_RATE
+        self.sync_interval = DEFAULT_SYNC_INTERVAL
+        self._lock = threading.Lock()
+        self._bloom = BloomFilter(self.capacity, self.error_rate)
+        self._synced_at: Optional[datetime] = None
+        self._next_sync = 0.0
+        self._next_rebuild = 0.0
+        self.stats = {'checks': 0, 'bloom_negative': 0, 'store_hits': 0, 'db_lookups': 0, 'db_hits': 0}
+
+    def init_app(self, app):
+        self.capacity = app.config.get('TOKEN_REVOCATION_BLOOM_CAPACITY', self.capacity)
+        self.error_rate = app.config.get('TOKEN_REVOCATION_BLOOM_ERROR_RATE', self.error_rate)
+        self.sync_interval = app.config.get('TOKEN_REVOCATION_SYNC_INTERVAL', self.sync_interval)
+        with self._lock:
+            self._bloom = BloomFilter(self.capacity, self.error_rate)
+            self._synced_at = None
+            self._next_sync = 0.0
+            self._next_rebuild = 0.0
+
+    def revoke(self, jti: str, expires_at: datetime, user_id: Optional[int] = None,
+               token_type: Optional[str] = None):
+        """
+        撤销令牌（写入当前数据库会话，由调用方提交）
+
+        Args:
+            jti: 令牌唯一标识
+            expires_at: 令牌过期时间（UTC），过期后记录可清理
+            user_id: 令牌所属用户
+            token_type: access / refresh
+        """
+        from backend.extensions import db
+        from backend.models import RevokedToken
+
+        if not db.session.query(RevokedToken.id).filter_by(jti=jti).first():
+            db.session.add(RevokedToken(
+                jti=jti, user_id=user_id, token_type=token_type, expires_at=expires_at
+            ))
+        self.store.add(jti, expires_at)
+        with self._lock:
+            self._bloom.add(jti)
+
+    def is_revoked(self, jti: str) -> bool:
+        """判断令牌是否已撤销（布隆过滤器判定未撤销时不产生 I/O）"""
+        self._maybe_sync()
+        self.stats['checks'] += 1
+        if jti not in self._bloom:
+            self.stats['bloom_negative'] += 1
+            return False
+        if self.store.contains(jti):
+            self.stats['store_hits'] += 1
+            return True
+
+        # 布隆过滤器误判或共享存储未同步：查询数据库
+        from backend.extensions import db
+        from backend.models import RevokedToken
+
+        self.stats['db_lookups'] += 1
+        with db_router.primary():
+            row = db.session.query(RevokedToken.expires_at).filter_by(jti=jti).first()
+        if row is None:
+            return False
+        self.store.add(jti, row[0])
+        self.stats['db_hits'] += 1
+        return True
+
+    def _maybe_sync(self):
+        now = time.monotonic()
+        if now < self._next_sync:
+            return
+        with self._lock:
+            if now < self._next_sync:
+                return
+            self._next_sync = now + self.sync_interval
+            rebuild = now >= self._next_rebuild
+            if rebuild:
+                self._next_rebuild = now + REBUILD_INTERVAL
+        try:
+            if rebuild:
+                self._rebuild()
+            else:
+                self._sync()
+        except Exception as e:
+            # 同步失败时保留现有过滤器，下个周期重试
+            logger.warning("令牌撤销列表同步失败: %s", e)
+
+    def _load(self, since: Optional[datetime]) -> Iterable[Tuple[str, datetime]]:
+        from backend.extensions import db
+        from backend.models import RevokedToken
+
+        # 独立连接读主库（撤销记录刚写入主库，副本可能尚未同步），不使用、也不提交请求的会话
+        query = select(RevokedToken.jti, RevokedToken.expires_at).where(
+            RevokedToken.expires_at > datetime.utcnow()
+        )
+        if since is not None:
+            query = query.where(RevokedToken.revoked_at >= since - SYNC_OVERLAP)
+        with db.engine.connect() as connection:
+            return connection.execute(query).all()
+
+    def _sync(self):
+        started = datetime.utcnow()
+        rows = self._load(self._synced_at)
+        with self._lock:
+            for jti, expires_at in rows:
+                self._bloom.add(jti)
+                self.store.add(jti, expires_at)
+            self._synced_at = started
+
+    def _rebuild(self):
+        """按未过期记录重建过滤器（只读，数据库中的过期记录由 purge_expired 清理）"""
+        started = datetime.utcnow()
+        rows = self._load(None)
+        bloom = BloomFilter(max(self.capacity, len(rows) * 2), self.error_rate)
+        for jti, _ in rows:
+            bloom.add(jti)
+        with self._lock:
+            self._bloom = bloom
+            self._synced_at = started
+        for jti, expires_at in rows:
+            self.store.add(jti, expires_at)
+        self.store.purge_expired(started)
+
+    def purge_expired(self) -> int:
+        """
+        删除数据库与共享存储中已过期的撤销记录（独立事务，不在请求中调用）
+
+        Returns:
+            int: 删除的数据库记录数
+        """
+        from backend.extensions import db
+        from backend.models import RevokedToken
+
+        now = datetime.utcnow()
+        with db.engine.begin() as connection:
+            result = connection.execute(delete(RevokedToken).where(RevokedToken.expires_at <= now))
+        self.store.purge_expired(now)
+        return result.rowcount
+
+
+revocation_list = TokenRevocationList()
+
+
+@click.command('purge-revoked-tokens')
+@with_appcontext
+def purge_revoked_tokens_command():
+    """清理已过期的令牌撤销记录"""
+    click.echo(f"✅ 删除了 {revocation_list.purge_expired()} 条过期的撤销记录")
@@ -0,0 +1,164 @@
+"""
+JWT 身份声明与令牌版本
+JWT Identity Claims and Token Versions
+
+访问令牌携带 role、department、doctor_id、patient_id 与令牌版本号 pv，
+路由可直接根据声明授权，无需再查询 DoctorUserLink / PatientUserLink。
+
+声明的时效由令牌版本保证：
+- 用户的角色、启用状态变化（管理员操作），或医生/病人关联被删除、改挂到其他用户时，
+  在同一事务内自动递增 user_token_versions 中该用户的版本，已签发的令牌随即失效
+- 只会扩大权限或不影响授权的变化（自助修改科室、新建关联）不递增版本，避免用户被迫重新登录；
+  这些接口在响应中返回按最新信息重新签发的访问令牌，刷新令牌时也会从数据库重新读取关联
+- 每次校验令牌时比对 pv 与当前版本（版本号走访问控制缓存，提交后立即失效，
+  其他进程最多在 ACCESS_CACHE_TTL 内感知），不一致则返回 401 TOKEN_OUTDATED
+- 未携带 pv 的旧令牌视为版本 0
+"""
+from typing import Dict, Iterable, Optional, Set
+
+from flask import jsonify
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from backend.extensions import jwt
+from backend.utils.access_cache import access_cache
+
+
+CLAIM_VERSION = 'pv'
+CLAIM_DOCTOR_ID = 'doctor_id'
+CLAIM_PATIENT_ID = 'patient_id'
+
+# 变化后需要使已签发令牌失效的用户字段（department 只用于展示，不参与授权）
+VERSIONED_USER_FIELDS = ('role', 'is_active')
+
+BUMP_BATCH_SIZE = 500
+
+
+def token_version_key(user_id) -> str:
+    return f'token_version:{user_id}'
+
+
+def get_token_version(user_id: int) -> int:
+    """用户当前的令牌版本（缓存）"""
+    def load():
+        from backend.extensions import db
+        from backend.models import UserTokenVersion
+        version = db.session.query(UserTokenVersion.version).filter(
+            UserTokenVersion.user_id == user_id
+        ).scalar()
+        return version or 0
+    return access_cache.get_or_load(token_version_key(user_id), load)
+
+
+def build_identity_claims(user, doctor_id: Optional[int] = None,
+                          patient_id: Optional[int] = None) -> Dict:
+    """
+    生成访问令牌的附加声明
+
+    Args:
+        user: 用户对象
+        doctor_id: 关联的医生ID
+        patient_id: 关联的病人档案ID
+
+    Returns:
+        Dict: role、department、doctor_id、patient_id、pv
+    """
+    return {
+        'role': user.role,
+        'department': user.department,
+        CLAIM_DOCTOR_ID: doctor_id,
+        CLAIM_PATIENT_ID: patient_id,
+        CLAIM_VERSION: get_token_version(user.id)
+    }
+
+
+def build_refresh_claims(user) -> Dict:
+    """刷新令牌的附加声明（只携带版本号）"""
+    return {CLAIM_VERSION: get_token_version(user.id)}
+
+
+def is_token_current(jwt_data: Dict) -> bool:
+    """令牌中的版本号是否与用户当前版本一致"""
+    try:
+        user_id = int(jwt_data.get('sub'))
+    except (TypeError, ValueError):
+        return False
+    return int(jwt_data.get(CLAIM_VERSION) or 0) == get_token_version(user_id)
+
+
+@jwt.token_verification_loader
+def _verify_token_version(jwt_header, jwt_data):
+    return is_token_current(jwt_data)
+
+
+@jwt.token_verification_failed_loader
+def _token_outdated(jwt_header, jwt_data):
+    return jsonify({
+        'success': False,
+        'message': '登录状态已失效（账号权限已变更），请重新登录',
+        'code': 'TOKEN_OUTDATED',
+        'data': None
+    }), 401
+
+
+# ----- 版本自动递增 -----
+
+def _changed_user_ids(session) -> Set[int]:
+    from backend.models import DoctorUserLink, PatientUserLink, User
+
+    user_ids = set()
+    # 新建关联只会补充令牌中缺少的 doctor_id / patient_id，不使旧令牌失效
+    for obj in session.deleted:
+        if isinstance(obj, (DoctorUserLink, PatientUserLink)) and obj.user_id is not None:
+            user_ids.add(obj.user_id)
+        elif isinstance(obj, User) and obj.id is not None:
+            user_ids.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, User) and obj.id is not None:
+            state = inspect(obj)
+            if any(state.attrs[f].history.has_changes() for f in VERSIONED_USER_FIELDS):
+                user_ids.add(obj.id)
+        elif isinstance(obj, (DoctorUserLink, PatientUserLink)):
+            # 关联改挂到其他用户或指向其他档案时，原用户令牌中的 ID 已不再有效
+            state = inspect(obj)
+            history = state.attrs.user_id.history
+            user_ids.update(i for i in history.deleted or () if i is not None)
+            target = 'doctor_id' if isinstance(obj, DoctorUserLink) else 'patient_id'
+            if state.attrs[target].history.deleted and obj.user_id is not None:
+                user_ids.add(obj.user_id)
+    return user_ids
+
+
+def bump_token_versions(session, user_ids: Iterable[int]):
+    """在当前事务内递增用户令牌版本（已有版本行按批次一次查询取出）"""
+    from backend.models import UserTokenVersion
+
+    user_ids = {int(i) for i in user_ids}
+    if not user_ids:
+        return
+    with session.no_autoflush:
+        rows = {
+            obj.user_id: obj for obj in session.new
+            if isinstance(obj, UserTokenVersion) and obj.user_id in user_ids
+        }
+        pending = sorted(user_ids - set(rows))
+        for start in range(0, len(pending), BUMP_BATCH_SIZE):
+            batch = pending[start:start + BUMP_BATCH_SIZE]
+            for row in session.query(UserTokenVersion).filter(UserTokenVersion.user_id.in_(batch)):
+                rows[row.user_id] = row
+        for user_id in user_ids:
+            row = rows.get(user_id)
+            if row is None:
+                session.add(UserTokenVersion(user_id=user_id, version=1))
+            else:
+                row.version = (row.version or 0) + 1
+
+
+@event.listens_for(Session, 'before_flush')
+def _bump_on_identity_change(session, flush_context, instances):
+    user_ids = _changed_user_ids(session)
+    if user_ids:
+        bump_token_versions(session, user_ids)
+
+
+access_cache.register('UserTokenVersion', lambda row: [token_version_key(row.user_id)])
@@ -0,0 +1,14 @@
+"""
+WSGI 入口
+WSGI Entry Point
+
+供生产环境 WSGI 服务器加载：
+    gunicorn -c backend/gunicorn.conf.py backend.wsgi:app
+配置类由 FLASK_ENV 选择，默认使用生产环境配置。
+"""
+import os
+
+from backend.app import create_app
+from backend.config import config
+
+app = create_app(config.get(os.environ.get('FLASK_ENV') or 'production', config['production']))
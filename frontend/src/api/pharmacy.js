@@ -8,6 +8,13 @@ export function getMedicineList(params) {
   })
 }
 
+export function getMedicineCategories() {
+  return request({
+    url: '/pharmacy/medicine-categories',
+    method: 'get'
+  })
+}
+
 export function getMedicineDetail(id) {
   return request({
     url: `/pharmacy/medicines/${id}`,
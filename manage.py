@@ -427,6 +427,118 @@ class ServiceManager:
         
         return True
     
+    def serve(self, argv):
+        """
+        以生产模式启动后端（前台运行）
+
+        Linux/macOS 使用 gunicorn 多进程（预加载应用后 fork 工作进程，配置见 backend/gunicorn.conf.py）；
+        Windows 不支持 fork，使用 waitress 单进程多线程
+        """
+        import argparse
+
+        parser = argparse.ArgumentParser(prog='python manage.py serve', description='以生产模式启动后端 API')
+        parser.add_argument('--bind', default=None, help='监听地址，默认 0.0.0.0:5000')
+        parser.add_argument('--workers', type=int, default=None, help='工作进程数，默认 CPU 核数 * 2 + 1')
+        parser.add_argument('--threads', type=int, default=None, help='每个工作进程的线程数，默认 4')
+        parser.add_argument('--daemon', action='store_true', help='后台运行（Linux/macOS）')
+        args = parser.parse_args(argv)
+
+        env = dict(os.environ)
+        env.setdefault('FLASK_ENV', 'production')
+        for name, value in (('WEB_BIND', args.bind), ('WEB_WORKERS', args.workers), ('WEB_THREADS', args.threads)):
+            if value is not None:
+                env[name] = str(value)
+
+        self.print_banner("生产模式启动")
+        if sys.platform == 'win32':
+            return self._serve_waitress(env)
+
+        # 使用 gunicorn 启动脚本而不是 python -m gunicorn：
+        # 平滑重启时 gunicorn 按原命令重新执行，-m 方式会让 gunicorn/http 包遮蔽标准库 http
+        import shutil
+        executable = shutil.which('gunicorn', path=os.path.dirname(sys.executable)) or shutil.which('gunicorn')
+        if not executable:
+            print("❌ 未安装 gunicorn，请运行: pip install -r backend/requirements.txt")
+            return False
+
+        cmd = [executable, '-c', str(self.backend_dir / 'gunicorn.conf.py'), 'backend.wsgi:app']
+        if args.daemon:
+            cmd.append('--daemon')
+        print(f"🚀 gunicorn 启动中（{env.get('WEB_BIND') or '0.0.0.0:5000'}）")
+        print("💡 平滑重启: python manage.py reload")
+        print()
+        sys.stdout.flush()
+        # 以 gunicorn 替换当前进程，信号直接发给 gunicorn 主进程
+        os.execve(executable, cmd, env)
+
+    def _serve_waitress(self, env):
+        """Windows 下使用 waitress 提供服务"""
+        try:
+            from waitress import serve
+        except ImportError:
+            print("❌ 未安装 waitress，请运行: pip install -r backend/requirements.txt")
+            return False
+
+        os.environ.update(env)
+        host, _, port = (env.get('WEB_BIND') or '0.0.0.0:5000').rpartition(':')
+        threads = int(env.get('WEB_THREADS') or 8)
+        from backend.wsgi import app
+
+        print(f"🚀 waitress 启动中（{host}:{port}，{threads} 个线程）")
+        serve(app, host=host, port=int(port), threads=threads)
+        return True
+
+    def reload_server(self):
+        """
+        平滑重启生产模式的后端（重新加载代码，处理中的请求不中断）
+
+        预加载模式下 HUP 只会从主进程中已加载的应用重新 fork 工作进程，不会加载新代码，
+        因此使用 USR2 启动新的主进程（重新导入代码），新工作进程就绪后再向旧主进程发送 TERM，
+        旧进程停止接受新连接、处理完当前请求后退出。新主进程启动失败时旧进程继续提供服务。
+        """
+        import signal
+
+        self.print_banner("平滑重启")
+        if sys.platform == 'win32':
+            print("❌ Windows 下不支持平滑重启，请使用 restart")
+            return False
+
+        pidfile = Path(os.environ.get('WEB_PIDFILE') or '.gunicorn.pid')
+        if not pidfile.exists():
+            print(f"❌ 未找到 {pidfile}，生产模式服务未运行")
+            return False
+        old_pid = int(pidfile.read_text().strip())
+
+        print(f"🔄 启动新的主进程（旧主进程 PID: {old_pid}）...")
+        os.kill(old_pid, signal.SIGUSR2)
+        # 新主进程先写入 <pidfile>.2，旧主进程退出后再改名为 pidfile
+        new_pidfile = Path(f"{pidfile}.2")
+        new_pid = None
+        deadline = time.time() + 60
+        while time.time() < deadline:
+            time.sleep(0.5)
+            try:
+                pid = int(new_pidfile.read_text().strip())
+            except (OSError, ValueError):
+                continue
+            if self._has_children(pid):
+                new_pid = pid
+                break
+        if new_pid is None:
+            print("❌ 新主进程未能就绪，旧进程继续提供服务（请查看错误日志）")
+            return False
+
+        print(f"    ✅ 新主进程已就绪 (PID: {new_pid})")
+        os.kill(old_pid, signal.SIGTERM)
+        print("    ✅ 旧主进程处理完当前请求后退出")
+        return True
+
+    @staticmethod
+    def _has_children(pid):
+        """进程是否已有子进程（gunicorn 主进程已 fork 出工作进程）"""
+        result = subprocess.run(['pgrep', '-P', str(pid)], capture_output=True, text=True)
+        return bool(result.stdout.strip())
+
     def diagnose(self):
         """诊断系统环境"""
         self.print_banner("环境诊断")
@@ -541,6 +653,8 @@ def print_usage():
     print("  restart  - 重启所有服务")
     print("  status   - 查看服务运行状态")
     print("  diagnose - 诊断系统环境（检查Python、数据库、Node.js等）")
+    print("  serve    - 以生产模式启动后端（gunicorn 多进程；Windows 下为 waitress）")
+    print("  reload   - 平滑重启生产模式的后端（重新加载代码，不中断请求）")
     print("  help     - 显示此帮助信息")
     print()
     print("示例:")
@@ -549,6 +663,7 @@ def print_usage():
     print("  python manage.py restart    # 重启服务")
     print("  python manage.py status     # 查看状态")
     print("  python manage.py diagnose   # 诊断环境")
+    print("  python manage.py serve --workers 4 --threads 4   # 生产模式启动后端")
     print()
     print("=" * 70)
 
@@ -604,6 +719,12 @@ def main():
                 input("\n按回车键退出...")
             except (KeyboardInterrupt, EOFError):
                 print("\n")
+        elif command == "serve":
+            if manager.serve(sys.argv[2:]) is False:
+                sys.exit(1)
+        elif command == "reload":
+            if not manager.reload_server():
+                sys.exit(1)
         elif command in ["help", "-h", "--help"]:
             print_usage()
             try:
@@ -0,0 +1,353 @@
+"""
+批量开通账号脚本
+Bulk User Provisioning
+
+从 CSV 文件批量创建用户账号，并按需关联病人档案、医生档案。
+新诊所上线时一次开通成千上万个账号，逐个创建需要为每个账号串行计算密码哈希、
+逐条插入用户与关联记录。本脚本：
+- 密码哈希在多进程中并行计算（--workers，默认 CPU 核数）
+- 用户、病人档案、关联记录按批（--batch-size）批量插入，每批一个事务
+- 结束时输出哈希与写库的耗时及吞吐量
+
+CSV 列（首行为表头）：
+    username, password               必填
+    role                              admin/doctor/nurse/user，默认 user
+    real_name, email, phone, department
+    doctor_no                         关联已有医生档案（按医生编号）
+    patient_no                        关联已有病人档案（按病人编号）
+    gender, age, id_card, address     未填 patient_no 且填写 gender 时为该用户新建病人档案
+
+运行方式（在项目根目录下）：
+    python provision_users.py accounts.csv [--batch-size 1000] [--workers 8] [--dry-run]
+"""
+import argparse
+import csv
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+ROLES = ('admin', 'doctor', 'nurse', 'user')
+LOOKUP_BATCH_SIZE = 500
+
+
+class ProvisionReport:
+    """开通结果统计"""
+
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.patients_created = 0
+        self.patient_links = 0
+        self.doctor_links = 0
+        self.skipped: List[str] = []
+        self.hash_seconds = 0.0
+        self.insert_seconds = 0.0
+        self.total_seconds = 0.0
+
+    def skip(self, line_no: int, username: str, reason: str):
+        self.skipped.append(f'第 {line_no} 行 {username or "(空)"}: {reason}')
+
+    def print(self):
+        print("=" * 70)
+        print(f"  读取行数:       {self.rows}")
+        print(f"  创建用户:       {self.created}")
+        print(f"  新建病人档案:   {self.patients_created}")
+        print(f"  关联病人档案:   {self.patient_links}")
+        print(f"  关联医生档案:   {self.doctor_links}")
+        print(f"  跳过:           {len(self.skipped)}")
+        if self.created:
+            print(f"  密码哈希耗时:   {self.hash_seconds:.2f}s  ({self.created / max(self.hash_seconds, 1e-9):.0f} 个/秒)")
+            print(f"  写库耗时:       {self.insert_seconds:.2f}s  ({self.created / max(self.insert_seconds, 1e-9):.0f} 个/秒)")
+        print(f"  总耗时:         {self.total_seconds:.2f}s  ({self.created / max(self.total_seconds, 1e-9):.0f} 个/秒)")
+        print("=" * 70)
+        for line in self.skipped[:50]:
+            print(f"  [SKIP] {line}")
+        if len(self.skipped) > 50:
+            print(f"  ... 另有 {len(self.skipped) - 50} 行被跳过")
+
+
+def read_rows(path: str) -> List[Dict]:
+    """读取 CSV（兼容带 BOM 的 UTF-8），返回带行号的字典列表"""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        rows = []
+        for line_no, row in enumerate(reader, start=2):
+            row = {(k or '').strip(): (v or '').strip() for k, v in row.items()}
+            row['_line'] = line_no
+            rows.append(row)
+        return rows
+
+
+def _chunks(items: List, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _existing(column, values) -> set:
+    """分批查询某列中已存在的值"""
+    from backend.extensions import db
+    found = set()
+    values = [v for v in values if v]
+    for batch in _chunks(values, LOOKUP_BATCH_SIZE):
+        found.update(r[0] for r in db.session.query(column).filter(column.in_(batch)))
+    return found
+
+
+def _lookup_ids(key_column, values) -> Dict[str, int]:
+    """分批按编号查询ID"""
+    from backend.extensions import db
+    model = key_column.class_
+    ids = {}
+    values = [v for v in values if v]
+    for batch in _chunks(values, LOOKUP_BATCH_SIZE):
+        for key, pk in db.session.query(key_column, model.id).filter(key_column.in_(batch)):
+            ids[key] = pk
+    return ids
+
+
+def validate_rows(rows: List[Dict], report: ProvisionReport) -> List[Dict]:
+    """
+    校验 CSV 行：必填项、角色、文件内重复、与数据库已有账号/关联冲突
+
+    Returns:
+        List[Dict]: 可以开通的行（补充 doctor_id / patient_id）
+    """
+    from backend.models import Doctor, DoctorUserLink, Patient, PatientUserLink, User
+
+    seen_usernames, seen_emails, seen_doctors, seen_patients = set(), set(), set(), set()
+    candidates = []
+    for row in rows:
+        username, line = row.get('username', ''), row['_line']
+        role = row.get('role') or 'user'
+        if not username or not row.get('password'):
+            report.skip(line, username, '用户名和密码不能为空')
+        elif role not in ROLES:
+            report.skip(line, username, f'无效的角色 {role}')
+        elif username in seen_usernames:
+            report.skip(line, username, '文件内用户名重复')
+        elif row.get('email') and row['email'] in seen_emails:
+            report.skip(line, username, '文件内邮箱重复')
+        elif row.get('doctor_no') and row['doctor_no'] in seen_doctors:
+            report.skip(line, username, '文件内医生编号重复')
+        elif row.get('patient_no') and row['patient_no'] in seen_patients:
+            report.skip(line, username, '文件内病人编号重复')
+        else:
+            row['role'] = role
+            seen_usernames.add(username)
+            seen_emails.add(row.get('email'))
+            seen_doctors.add(row.get('doctor_no'))
+            seen_patients.add(row.get('patient_no'))
+            candidates.append(row)
+
+    existing_usernames = _existing(User.username, [r['username'] for r in candidates])
+    existing_emails = _existing(User.email, [r.get('email') for r in candidates])
+    doctor_ids = _lookup_ids(Doctor.doctor_no, [r.get('doctor_no') for r in candidates])
+    patient_ids = _lookup_ids(Patient.patient_no, [r.get('patient_no') for r in candidates])
+    linked_doctors = _existing(DoctorUserLink.doctor_id, list(doctor_ids.values()))
+    linked_patients = _existing(PatientUserLink.patient_id, list(patient_ids.values()))
+
+    valid = []
+    for row in candidates:
+        username, line = row['username'], row['_line']
+        doctor_no, patient_no = row.get('doctor_no'), row.get('patient_no')
+        if username in existing_usernames:
+            report.skip(line, username, '用户名已存在')
+        elif row.get('email') and row['email'] in existing_emails:
+            report.skip(line, username, '邮箱已被使用')
+        elif doctor_no and doctor_no not in doctor_ids:
+            report.skip(line, username, f'医生编号 {doctor_no} 不存在')
+        elif doctor_no and doctor_ids[doctor_no] in linked_doctors:
+            report.skip(line, username, f'医生 {doctor_no} 已关联其他账号')
+        elif patient_no and patient_no not in patient_ids:
+            report.skip(line, username, f'病人编号 {patient_no} 不存在')
+        elif patient_no and patient_ids[patient_no] in linked_patients:
+            report.skip(line, username, f'病人 {patient_no} 已关联其他账号')
+        else:
+            row['doctor_id'] = doctor_ids.get(doctor_no)
+            row['patient_id'] = patient_ids.get(patient_no)
+            valid.append(row)
+    return valid
+
+
+def _int_or_none(value: str) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def insert_batch(rows: List[Dict], password_hashes: List[str], patient_nos: Iterator[str],
+                 report: ProvisionReport):
+    """
+    在一个事务内批量插入一批用户及其关联记录
+
+    Args:
+        rows: 已校验的 CSV 行
+        password_hashes: 与 rows 一一对应的密码哈希
+        patient_nos: 新建病人档案使用的编号序列
+        report: 统计结果
+    """
+    from sqlalchemy import insert
+
+    from backend.extensions import db
+    from backend.models import DoctorUserLink, Patient, PatientUserLink, User, patient_relations
+
+    try:
+        db.session.execute(insert(User), [{
+            'username': row['username'],
+            'password_hash': password_hash,
+            'role': row['role'],
+            'real_name': row.get('real_name') or None,
+            'email': row.get('email') or None,
+            'phone': row.get('phone') or None,
+            'department': row.get('department') or None,
+            'is_active': True
+        } for row, password_hash in zip(rows, password_hashes)])
+        user_ids = _lookup_ids(User.username, [row['username'] for row in rows])
+
+        # 需要新建病人档案的用户：预先分配病人编号
+        new_patients = {}
+        for row in rows:
+            if not row.get('patient_id') and row.get('gender'):
+                new_patients[row['username']] = next(patient_nos)
+        if new_patients:
+            by_username = {row['username']: row for row in rows}
+            db.session.execute(insert(Patient), [{
+                'patient_no': patient_no,
+                'name': by_username[username].get('real_name') or username,
+                'gender': by_username[username]['gender'],
+                'age': _int_or_none(by_username[username].get('age')),
+                'phone': by_username[username].get('phone') or None,
+                'id_card': by_username[username].get('id_card') or None,
+                'address': by_username[username].get('address') or None
+            } for username, patient_no in new_patients.items()])
+            new_ids = _lookup_ids(Patient.patient_no, list(new_patients.values()))
+            for username, patient_no in new_patients.items():
+                by_username[username]['patient_id'] = new_ids[patient_no]
+
+        patient_links = [
+            {'user_id': user_ids[row['username']], 'patient_id': row['patient_id']}
+            for row in rows if row.get('patient_id')
+        ]
+        doctor_links = [
+            {'user_id': user_ids[row['username']], 'doctor_id': row['doctor_id']}
+            for row in rows if row.get('doctor_id')
+        ]
+        if patient_links:
+            db.session.execute(insert(PatientUserLink), patient_links)
+            # 与注册流程一致：自己的档案同时加入可管理列表
+            db.session.execute(patient_relations.insert(), patient_links)
+        if doctor_links:
+            db.session.execute(insert(DoctorUserLink), doctor_links)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    report.created += len(rows)
+    report.patients_created += len(new_patients)
+    report.patient_links += len(patient_links)
+    report.doctor_links += len(doctor_links)
+
+
+def provision(app, rows: List[Dict], batch_size: int = 1000, workers: Optional[int] = None,
+              dry_run: bool = False) -> ProvisionReport:
+    """
+    批量开通账号
+
+    Args:
+        app: Flask 应用
+        rows: read_rows 返回的 CSV 行
+        batch_size: 每个事务插入的用户数
+        workers: 密码哈希进程数，0 表示在当前进程内串行计算
+        dry_run: 只校验不写库
+
+    Returns:
+        ProvisionReport
+    """
+    from backend.extensions import db
+    from backend.modules.patient.patient_services import generate_patient_no
+
+    report = ProvisionReport()
+    report.rows = len(rows)
+    started = time.perf_counter()
+
+    with app.app_context():
+        valid = validate_rows(rows, report)
+        if dry_run or not valid:
+            report.total_seconds = time.perf_counter() - started
+            return report
+
+        method = app.config.get('PASSWORD_HASH_METHOD', 'scrypt')
+        hash_one = partial(generate_password_hash, method=method)
+        first_patient_no = generate_patient_no()
+        patient_nos = (f'{first_patient_no[0]}{n:08d}' for n in itertools.count(int(first_patient_no[1:])))
+
+        if workers is None:
+            workers = os.cpu_count() or 1
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+        try:
+            for batch in _chunks(valid, batch_size):
+                passwords = [row['password'] for row in batch]
+                t0 = time.perf_counter()
+                if executor:
+                    chunksize = max(1, len(passwords) // (workers * 4))
+                    hashes = list(executor.map(hash_one, passwords, chunksize=chunksize))
+                else:
+                    hashes = [hash_one(p) for p in passwords]
+                t1 = time.perf_counter()
+                insert_batch(batch, hashes, patient_nos, report)
+                report.hash_seconds += t1 - t0
+                report.insert_seconds += time.perf_counter() - t1
+                print(f"  [INFO] 已开通 {report.created}/{len(valid)}")
+        finally:
+            if executor:
+                executor.shutdown()
+            db.session.remove()
+
+    report.total_seconds = time.perf_counter() - started
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='从 CSV 批量开通用户账号')
+    parser.add_argument('csv_file', help='CSV 文件路径')
+    parser.add_argument('--batch-size', type=int, default=1000, help='每个事务插入的用户数')
+    parser.add_argument('--workers', type=int, default=None, help='密码哈希进程数（0 为单进程）')
+    parser.add_argument('--dry-run', action='store_true', help='只校验，不写入数据库')
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    env_path = PROJECT_ROOT / '.env'
+    if env_path.exists():
+        load_dotenv(env_path)
+
+    from backend.app import create_app
+
+    rows = read_rows(args.csv_file)
+    print("=" * 70)
+    print(f"批量开通账号: {args.csv_file}（{len(rows)} 行）{' [仅校验]' if args.dry_run else ''}")
+    print("=" * 70)
+    report = provision(create_app(), rows, args.batch_size, args.workers, args.dry_run)
+    report.print()
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except Exception as e:
+        print(f"[ERROR] 批量开通账号失败: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
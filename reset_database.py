@@ -21,6 +21,7 @@ if env_path.exists():
 from app import create_app
 # noinspection PyUnresolvedReferences
 from backend.extensions import db
+from backend.migrations.runner import MigrationRunner
 
 def reset_database(auto_confirm=False):
     """重建数据库"""
@@ -44,13 +45,16 @@ def reset_database(auto_confirm=False):
     app = create_app()
 
     with app.app_context():
+        runner = MigrationRunner(db.engine)
+
         print("正在删除所有表...")
         db.drop_all()
+        runner.reset()
         print("✅ 所有表已删除")
 
         print()
-        print("正在创建新表...")
-        db.create_all()
+        print("正在执行数据库迁移...")
+        runner.upgrade()
         print("✅ 所有表已创建")
 
         print()